@@ -0,0 +1,239 @@
+"""
+In-Memory-API des Konverters (ohne Config-Klasse und ohne Dateien zwischen den Stufen).
+
+    from api import convert, ConvertOptions
+    result = convert(Path("input/Algorithmik.pptx"), ConvertOptions(use_llm=False))
+    result.latex, result.frames, result.media
+
+Jeder Aufruf arbeitet mit eigenen Einstellungen (kein Mutieren von
+Klassenattributen) und kann parallel aus mehreren Threads bzw. über
+convert_async aus mehreren asyncio-Tasks genutzt werden. Geteilt werden nur
+threadsichere Caches (Shape-Scan, LLM-Pool, Docling-Converter pro Thread).
+Artefakte, Medien und .tex werden nur mit `persist_dir` geschrieben.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+# Standardwerte wie in main.Config für alles, was die Generierung liest
+DEFAULT_SETTINGS = {
+    "AGENT_LLM_MODEL": "qwen3:8b",
+    "AGENT_MAX_RETRIES": 3,
+    "AGENT_OUTPUT_MODE": "latex",
+    "AGENT_WARMUP": True,
+    "AGENT_WARMUP_PREFIX": True,
+    "AGENT_KEEP_ALIVE": "30m",
+    "AGENT_STREAMING": True,
+    "AGENT_MAX_OUTPUT_CHARS": 12000,
+    "AGENT_REPETITION_WINDOW": 200,
+    "AGENT_REPETITION_LIMIT": 4,
+    "OLLAMA_HOST": None,
+    "OLLAMA_HOSTS": [],
+    "AGENT_REQUEST_TIMEOUT": 120.0,
+    "AGENT_CONCURRENCY": None,
+    "ROUTER_ENABLED": True,
+    "ROUTER_DETERMINISTIC_MAX_SCORE": 3,
+    "ROUTER_SMALL_MAX_SCORE": 6,
+    "AGENT_SMALL_LLM_MODEL": None,
+    "AGENT_BATCH_MODE": False,
+    "AGENT_SPLIT_SLIDES": True,
+    "AGENT_SLIDE_TOKEN_BUDGET": 1500,
+    "AGENT_PAGINATE_TABLES": False,
+    "AGENT_TABLE_MAX_ROWS": 18,
+    "LAYOUT_CLUSTERING": True,
+    "CODE_HIGHLIGHT": False,
+    "CODE_HIGHLIGHT_STYLE": "default",
+    "CODE_HIGHLIGHT_CACHE_DIR": None,
+    "LATEX_HOIST_MACROS": True,
+    "LATEX_MACRO_MIN_REPEATS": 3,
+    "LATEX_MACRO_PRECISION": 4,
+}
+
+
+@dataclass(frozen=True)
+class ConvertOptions:
+    backend: str = "docling"                 # "docling" oder "native"
+    docling_profile: str = "fast"
+    model: str = "qwen3:8b"
+    use_llm: bool = True                     # False -> nur deterministischer Renderer
+    persist_dir: Optional[Path] = None       # None -> nichts auf die Platte schreiben
+    artifact_format: str = "auto"
+    compile_pdf: bool = False                # nur mit persist_dir
+    tex_filename: str = "document"
+    media_folder: str = "extracted_media"
+    settings: Mapping[str, Any] = field(default_factory=dict)  # weitere Config-Werte (AGENT_*, ROUTER_*, OLLAMA_*)
+
+    def to_settings(self):
+        """Einstellungs-Objekt für die Stufen (ersetzt die Config-Klasse pro Aufruf)."""
+        values = dict(DEFAULT_SETTINGS)
+        values.update(
+            AGENT_LLM_MODEL=self.model,
+            AGENT_ENABLED=self.use_llm,
+            EXTRACTION_BACKEND=self.backend,
+            DOCLING_PROFILE=self.docling_profile,
+            ARTIFACT_FORMAT=self.artifact_format,
+            # LLM-Diagnosen (abgebrochene Streams) nur mit persist_dir
+            JSON_OUTPUT_DIR=Path(self.persist_dir) / "json_data" if self.persist_dir else None,
+        )
+        values.update(self.settings)
+        return SimpleNamespace(**values)
+
+
+@dataclass
+class MediaFile:
+    filename: str
+    data: bytes
+    slide_index: int                         # 0-basiert wie layout_data
+    geometry: Optional[List[float]]          # [left, top, width, height] relativ
+    kind: str                                # "picture", "picture_fill", "video", "audio" oder "poster"
+
+
+@dataclass
+class SlideFrame:
+    slide_number: int
+    latex: str
+
+
+@dataclass
+class Result:
+    latex: str
+    frames: List[SlideFrame]
+    slides: List[Dict[str, Any]]             # gruppierte Slides (Eingabe der Generierung)
+    metadata: Dict[str, Any]
+    media: List[MediaFile]
+    layout_data: Dict[int, List[Dict[str, Any]]]
+    timings: Dict[str, float]
+    output_dir: Optional[Path] = None
+    tex_path: Optional[Path] = None
+    pdf_ok: Optional[bool] = None
+
+
+def _read_source(pptx, filename):
+    if isinstance(pptx, (bytes, bytearray)):
+        return bytes(pptx), filename or "presentation.pptx"
+    path = Path(pptx)
+    return path.read_bytes(), filename or path.name
+
+
+def _extract_slides(data, filename, settings, scan, media_folder):
+    """Stufe 1: Slides im Schema von transform_docling_json_to_slides (+ Raw-Dump bei Docling)."""
+    if settings.EXTRACTION_BACKEND == "native":
+        from extracter.native_from_pptx import extract_slides_native
+        return extract_slides_native(data, scan.alignment_map, media_folder), None
+
+    from converters.pptx_into_JSON import convert_pptx_in_memory, get_docling_profile
+    from extracter.metadata import transform_docling_json_to_slides
+    raw_data = convert_pptx_in_memory(data, filename, get_docling_profile(settings))
+    return transform_docling_json_to_slides(raw_data, scan.alignment_map, scan.tables_by_slide, media_folder), raw_data
+
+
+def _persist(result, options, filename, raw_data, cleaned_slides, media_refs):
+    from converters.artifact_store import ArtifactStore
+    from utils import compile_tex_to_pdf
+
+    output_dir = Path(options.persist_dir)
+    stem = Path(filename).stem
+    json_dir = output_dir / "json_data"
+    store = ArtifactStore(options.artifact_format)
+    if raw_data is not None:
+        store.save(json_dir / f"{stem}.json", raw_data)
+    store.save(json_dir / f"{stem}_cleaned.json", cleaned_slides)
+    store.save(json_dir / f"{stem}_grouped.json", result.slides)
+
+    media_dir = output_dir / options.media_folder
+    media_dir.mkdir(parents=True, exist_ok=True)
+    for media in result.media:
+        (media_dir / media.filename).write_bytes(media.data)
+
+    tex_name = options.tex_filename + ".tex"
+    result.tex_path = output_dir / tex_name
+    result.tex_path.write_text(result.latex, encoding="utf-8")
+    result.output_dir = output_dir
+    if options.compile_pdf:
+        result.pdf_ok = compile_tex_to_pdf(tex_name, output_dir)
+
+
+def convert(pptx: Union[bytes, Path, str], options: Optional[ConvertOptions] = None,
+            filename: Optional[str] = None) -> Result:
+    """Konvertiert eine PPTX (Pfad oder Bytes) komplett im Speicher zu LaTeX Beamer."""
+    from extracter.shape_scanner import bytes_scan_scope
+
+    # Scan, Medien und Metadaten teilen sich einen Scan, der nach dem Aufruf freigegeben wird
+    with bytes_scan_scope():
+        return _convert(pptx, options, filename)
+
+
+def _convert(pptx, options, filename):
+    from converters.code_highlight import get_code_highlighter
+    from converters.llm_warmup import start_model_warmup
+    from extracter.media_from_pptx import collect_media
+    from extracter.shape_scanner import scan_presentation
+    from generator import LATEX_POSTAMBLE, format_slide_block, generate_latex_preamble
+    from pipeline import generate_slide_frames, prepare_slides_for_latex
+    from utils import extract_pptx_metadata, sanitize_latex
+
+    options = options or ConvertOptions()
+    settings = options.to_settings()
+    data, filename = _read_source(pptx, filename)
+    timings = {}
+
+    def timed(stage, func, *args):
+        t0 = time.perf_counter()
+        value = func(*args)
+        timings[stage] = time.perf_counter() - t0
+        return value
+
+    # Modell lädt im Hintergrund, während Scan und Extraktion laufen
+    start_model_warmup(settings)
+    scan = timed("scan", scan_presentation, data)
+    cleaned_slides, raw_data = timed("extract", _extract_slides, data, filename, settings, scan, options.media_folder)
+    layout_data, media_refs = timed("media", collect_media, data, options.media_folder)
+    metadata = timed("metadata", extract_pptx_metadata, data, Path(filename).stem)
+
+    # prepare_slides_for_latex verändert die Elemente -> eigene Kopie, cleaned bleibt erhalten
+    working = [{**slide, "elements": [dict(el) for el in slide.get("elements", [])]} for slide in cleaned_slides]
+    slides, header_text = timed("layout", prepare_slides_for_latex, working, scan.slide_width, scan.slide_height)
+    latex_frames = timed("generate", generate_slide_frames, slides, settings)
+
+    highlighter = get_code_highlighter(settings, slides)
+    if highlighter is not None:
+        latex_frames = [highlighter.apply(latex, slide) for slide, latex in zip(slides, latex_frames)]
+    frames = [
+        SlideFrame(slide.get('slide_number', i + 1), latex)
+        for i, (slide, latex) in enumerate(zip(slides, latex_frames))
+    ]
+    body = "".join(format_slide_block(frame.slide_number, frame.latex) for frame in frames)
+    macros = highlighter.preamble() if highlighter is not None else None
+    if settings.LATEX_HOIST_MACROS:
+        from converters.latex_macros import hoist_layout_macros
+        layout_macros, body, _ = hoist_layout_macros(
+            body, settings.LATEX_MACRO_MIN_REPEATS, settings.LATEX_MACRO_PRECISION
+        )
+        macros = "\n".join(part for part in (macros, layout_macros) if part)
+    latex = sanitize_latex(f"{generate_latex_preamble(metadata, header_text, macros)}\n{body}\n{LATEX_POSTAMBLE}")
+
+    slide_index_by_file = {}
+    for slide_index, entries in layout_data.items():
+        for entry in entries:
+            slide_index_by_file[entry["filename"]] = (slide_index, entry)
+            # Poster-Bilder gehören zum Video/Audio-Eintrag
+            if entry.get("poster"):
+                slide_index_by_file[Path(entry["poster"]).name] = (slide_index, entry)
+    media = [
+        MediaFile(name, ref.blob, slide_index_by_file[name][0], slide_index_by_file[name][1]["geometry"], ref.kind)
+        for name, ref in media_refs.items()
+    ]
+
+    result = Result(latex, frames, slides, metadata, media, layout_data, timings)
+    if options.persist_dir:
+        timed("persist", _persist, result, options, filename, raw_data, cleaned_slides, media_refs)
+    return result
+
+
+async def convert_async(pptx: Union[bytes, Path, str], options: Optional[ConvertOptions] = None,
+                        filename: Optional[str] = None) -> Result:
+    """convert() in einem Worker-Thread, damit der Event-Loop frei bleibt."""
+    return await asyncio.to_thread(convert, pptx, options, filename)
@@ -0,0 +1,425 @@
+"""
+Kleine Benchmarks für einzelne Pipeline-Stufen.
+
+    python benchmark.py extraction-profiles [--input ./input]
+    python benchmark.py native-parity [--input ./input]
+    python benchmark.py shape-scan [--input ./input]
+    python benchmark.py zoning [--dump raw.json] [--pages 100 1000 5000] [--items-per-page 40]
+    python benchmark.py artifacts [--dump raw.json] [--pages 1000]
+    python benchmark.py code-highlight [--slides 40] [--style default]
+    python benchmark.py warmup [--model qwen3:8b] [--host http://localhost:11434] [--repeat 3]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+
+def find_input_decks(input_dir):
+    # "~$..." sind PowerPoint-Lock-Dateien, keine echten Decks
+    return sorted(p for p in Path(input_dir).glob("*.pptx") if not p.name.startswith("~$"))
+
+
+def bench_extraction_profiles(args):
+    """Vergleicht Docling "fast" vs. "full": Laufzeit, JSON-Größe, Slide-Parität."""
+    from converters.pptx_into_JSON import build_document_converter, document_to_final_data
+    from extracter.metadata import transform_docling_json_to_slides
+
+    for deck in find_input_decks(args.input):
+        print(f"\n=== {deck.name} ===")
+        slides_by_profile = {}
+        for profile in ("full", "fast"):
+            t0 = time.perf_counter()
+            converter = build_document_converter(profile)
+            t1 = time.perf_counter()
+            result = converter.convert(deck)
+            data = document_to_final_data(result.document, deck.name, profile)
+            t2 = time.perf_counter()
+            size_kb = len(json.dumps(data, ensure_ascii=False)) / 1024
+
+            slides_by_profile[profile] = transform_docling_json_to_slides(data)
+            print(f"{profile:>5}: init {t1 - t0:6.2f}s | convert+export {t2 - t1:6.2f}s | JSON {size_kb:8.1f} KB")
+
+        parity = slides_by_profile["full"] == slides_by_profile["fast"]
+        print(f"Slide parity (transform_docling_json_to_slides): {'OK' if parity else 'DIFFERENT'}")
+
+
+def _element_signature(el):
+    return (el.get("type"), el.get("text") or el.get("image_path") or str(el.get("table_rows")))
+
+
+def bench_native_parity(args):
+    """Vergleicht den nativen python-pptx-Extraktor mit Docling (Laufzeit + Inhalt in Reihenfolge)."""
+    from converters.pptx_into_JSON import build_document_converter, document_to_final_data
+    from extracter.metadata import transform_docling_json_to_slides
+    from extracter.native_from_pptx import extract_slides_native
+
+    for deck in find_input_decks(args.input):
+        print(f"\n=== {deck.name} ===")
+        t0 = time.perf_counter()
+        converter = build_document_converter("fast")
+        result = converter.convert(deck)
+        docling_slides = transform_docling_json_to_slides(document_to_final_data(result.document, deck.name, "fast"))
+        t1 = time.perf_counter()
+        native_slides = extract_slides_native(str(deck))
+        t2 = time.perf_counter()
+        print(f"docling: {t1 - t0:6.2f}s | native: {t2 - t1:6.2f}s")
+
+        docling_by_page = {s["slide_number"]: s["elements"] for s in docling_slides}
+        native_by_page = {s["slide_number"]: s["elements"] for s in native_slides}
+        mismatches = 0
+        for page in sorted(set(docling_by_page) | set(native_by_page)):
+            # Reihenfolge zählt: sie bestimmt Gruppierung und Prompt
+            expected = [_element_signature(el) for el in docling_by_page.get(page, [])]
+            actual = [_element_signature(el) for el in native_by_page.get(page, [])]
+            if expected != actual:
+                mismatches += 1
+                first = next((i for i, (e, a) in enumerate(zip(expected, actual)) if e != a),
+                             min(len(expected), len(actual)))
+                print(f"  Slide {page}: {len(expected)} docling vs {len(actual)} native elements, "
+                      f"first difference at position {first}")
+        print(f"Content parity: {len(docling_by_page) - mismatches}/{len(docling_by_page)} slides identical")
+
+
+def _legacy_separate_passes(deck):
+    """
+    Die früheren Einzel-Durchläufe über die python-pptx-Proxies (text.py,
+    media_from_pptx, metadata_from_pptx) – ein Presentation()-Load pro Pass.
+    """
+    from pptx import Presentation
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+    from extracter.metadata_from_pptx import get_institute_heuristic
+
+    # Pass 1: Alignment-Hints
+    prs = Presentation(deck)
+    alignment_map = {}
+    for slide_idx, slide in enumerate(prs.slides):
+        for shape in slide.shapes:
+            if not shape.has_text_frame or not shape.text.strip():
+                continue
+            leading = 0
+            for p in shape.text_frame.paragraphs:
+                if p.text.strip():
+                    break
+                leading += 1
+            if leading >= 2:
+                alignment_map.setdefault(slide_idx + 1, {})["".join(shape.text.split()).lower()[:50]] = "b"
+
+    # Pass 2: Bilder (rekursiv durch Gruppen)
+    prs = Presentation(deck)
+    blobs = []
+
+    def visit(shape):
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            for child in shape.shapes:
+                visit(child)
+        elif shape.shape_type in (MSO_SHAPE_TYPE.PICTURE, MSO_SHAPE_TYPE.PLACEHOLDER):
+            try:
+                blobs.append(shape.image.blob)
+            except Exception:
+                pass
+
+    for slide in prs.slides:
+        for shape in slide.shapes:
+            visit(shape)
+
+    # Pass 3: Institut aus dem Slide Master
+    prs = Presentation(deck)
+    institute = get_institute_heuristic(prs, "", "")
+    return alignment_map, blobs, institute
+
+
+def bench_shape_scan(args):
+    """Gemeinsamer Shape-Scan (lxml, ein Durchlauf) vs. die bisherigen Einzel-Passes."""
+    from extracter.metadata_from_pptx import get_institute_heuristic
+    from extracter.shape_scanner import scan_presentation_uncached
+
+    for deck in find_input_decks(args.input):
+        print(f"\n=== {deck.name} ===")
+        t0 = time.perf_counter()
+        legacy_align, legacy_blobs, legacy_institute = _legacy_separate_passes(str(deck))
+        t1 = time.perf_counter()
+        scan = scan_presentation_uncached(str(deck))
+        pictures = [m.blob for slide in scan.media_by_slide.values() for m in slide if m.kind == "picture"]
+        fills = sum(m.kind == "picture_fill" for slide in scan.media_by_slide.values() for m in slide)
+        institute = get_institute_heuristic(None, "", "", scan=scan)
+        t2 = time.perf_counter()
+        print(f"separate passes: {t1 - t0:6.2f}s | fused scan: {t2 - t1:6.2f}s | picture fills found: {fills}")
+
+        checks = {
+            "alignment": legacy_align == scan.alignment_map,
+            "pictures": legacy_blobs == pictures,
+            "institute": legacy_institute == institute,
+        }
+        print("Parity: " + ", ".join(f"{name} {'OK' if ok else 'DIFFERENT'}" for name, ok in checks.items()))
+
+
+def build_synthetic_docling_dump(n_pages, items_per_page, page_size=(12192000.0, 6858000.0)):
+    """Docling-artiger Dump (texts/tables/pages, TOPLEFT-EMU) für Skalierungs-Benchmarks."""
+    width, height = page_size
+    texts, tables = [], []
+    step = height / (items_per_page + 1)
+    for page_no in range(1, n_pages + 1):
+        for i in range(items_per_page):
+            top = i * step
+            texts.append({
+                "label": "paragraph",
+                "text": f"Seite {page_no} Absatz {i}",
+                "prov": [{"page_no": page_no, "bbox": {"l": 0.0, "t": top, "r": width, "b": top + step,
+                                                       "coord_origin": "TOPLEFT"}}],
+            })
+        cells = [{"start_row_offset_idx": r, "start_col_offset_idx": c, "row_span": 1, "col_span": 1,
+                  "text": f"{r}/{c}"} for r in range(3) for c in range(3)]
+        tables.append({
+            "prov": [{"page_no": page_no, "bbox": {"l": 0.0, "t": height / 2, "r": width, "b": height * 0.7,
+                                                   "coord_origin": "TOPLEFT"}}],
+            "data": {"num_rows": 3, "num_cols": 3, "table_cells": cells},
+        })
+    pages = {str(n): {"size": {"width": width, "height": height}, "page_no": n} for n in range(1, n_pages + 1)}
+    return {"structure_analysis": {"texts": texts, "tables": tables, "pictures": [], "pages": pages}}
+
+
+def bench_zoning(args):
+    """Semantic Zoning (raw_JSON_into_cleaned_JSON) auf großen Docling-Dumps."""
+    import contextlib
+    import io
+    from converters.raw_JSON_into_cleaned_JSON import clean_and_map_media_elements
+
+    if args.dump:
+        with open(args.dump, encoding="utf-8") as f:
+            dumps = [(Path(args.dump).name, json.load(f))]
+    else:
+        dumps = [(f"synthetic {n} pages", build_synthetic_docling_dump(n, args.items_per_page)) for n in args.pages]
+
+    for name, dump in dumps:
+        root = dump.get("structure_analysis", dump)
+        n_pages = len(root.get("pages", {}))
+        n_items = len(root.get("texts", [])) + len(root.get("tables", []))
+        # Jede zweite Seite bekommt ein Bild (Medien-Map wie aus extract_media_from_pptx)
+        media = {i: [{"filename": f"image_{i}.png"}] for i in range(0, n_pages, 2)}
+
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            slides = clean_and_map_media_elements(dump, media)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>24}: {n_items:8d} items | {elapsed:7.3f}s | "
+              f"{elapsed / max(n_items, 1) * 1e6:6.2f} µs/item | {len(slides)} slides")
+
+
+def bench_artifacts(args):
+    """Serialisierungszeit und Größe der Artefakt-Formate (converters/artifact_store.py)."""
+    from converters.artifact_store import decode_artifact, encode_artifact, artifact_suffix, msgpack, orjson
+
+    if args.dump:
+        with open(args.dump, encoding="utf-8") as f:
+            name, data = Path(args.dump).name, json.load(f)
+    else:
+        name, data = f"synthetic {args.pages} pages", build_synthetic_docling_dump(args.pages, 40)
+
+    formats = ["json-pretty", "json"]
+    if orjson is not None:
+        formats.append("orjson")
+    if msgpack is not None:
+        formats.append("msgpack")
+
+    print(f"=== {name} ===")
+    for fmt in formats:
+        t0 = time.perf_counter()
+        payload = encode_artifact(data, fmt)
+        t1 = time.perf_counter()
+        decoded = decode_artifact(payload, artifact_suffix(fmt))
+        t2 = time.perf_counter()
+        ok = "OK" if decoded == data else "DIFFERENT"
+        print(f"{fmt:>12}: {len(payload) / 1024:10.1f} KB | write {(t1 - t0) * 1000:8.1f} ms | "
+              f"read {(t2 - t1) * 1000:8.1f} ms | roundtrip {ok}")
+
+
+_CODE_SAMPLES = {
+    "java": "public static int sum(int[] values) {{\n    int total = {n};\n    for (int v : values) {{\n"
+            "        total += v;\n    }}\n    System.out.println(\"sum=\" + total);\n    return total;\n}}",
+    "python": "def fib(n):\n    a, b = 0, {n}\n    for _ in range(n):\n        a, b = b, a + b\n    return a",
+    "c": "#include <stdio.h>\nint main(void) {{\n    int i;\n    for (i = 0; i < {n}; i++)\n"
+         "        printf(\"%d\\n\", i);\n    return 0;\n}}",
+}
+
+
+def build_synthetic_code_slides(n_slides):
+    """Slides mit je einem Codeblock (wie aus utils.group_elements), Code pro Slide leicht variiert."""
+    from converters.code_highlight import listings_language
+
+    slides = []
+    languages = list(_CODE_SAMPLES)
+    for i in range(n_slides):
+        language = languages[i % len(languages)]
+        code = _CODE_SAMPLES[language].format(n=i)
+        slides.append({
+            "slide_number": i + 1,
+            "elements": [{
+                "type": "codeblock",
+                "geometry": {"x": 0.05, "y": 0.2, "w": 0.9, "h": 0.7},
+                "text": f"\\begin{{lstlisting}}[language={listings_language(language)}]\n{code}\n\\end{{lstlisting}}",
+                "code": code,
+                "language": language,
+            }],
+        })
+    return slides
+
+
+def _time_pdflatex(tex_source, runs=1):
+    """Kompiliert das Dokument in einem Temp-Verzeichnis -> (Sekunden, ok)."""
+    import subprocess
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tex_path = Path(tmp) / "bench.tex"
+        tex_path.write_text(tex_source, encoding="utf-8")
+        t0 = time.perf_counter()
+        ok = True
+        for _ in range(runs):
+            proc = subprocess.run(["pdflatex", "-interaction=nonstopmode", "-halt-on-error", tex_path.name],
+                                  cwd=tmp, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            ok = ok and proc.returncode == 0
+        return time.perf_counter() - t0, ok
+
+
+def bench_code_highlight(args):
+    """listings-Tokenisierung in TeX vs. Pygments-Vorab-Highlighting (converters/code_highlight.py)."""
+    import shutil
+    import tempfile
+    from converters.JSON_into_LaTeX_renderer import render_slide_latex
+    from converters.code_highlight import CodeHighlighter, _highlight, code_preamble, pygments
+    from generator import LATEX_POSTAMBLE, format_slide_block, generate_latex_preamble
+
+    if pygments is None:
+        print("Pygments is not installed (pip install pygments).")
+        return
+
+    slides = build_synthetic_code_slides(args.slides)
+    frames = [render_slide_latex(slide) for slide in slides]
+    metadata = {"title": "Code highlighting benchmark"}
+
+    print(f"=== {args.slides} code slides, style {args.style} ===")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        timings = {}
+        for label in ("cold", "disk cache", "memory cache"):
+            if label != "memory cache":
+                _highlight.cache_clear()
+            highlighter = CodeHighlighter(style=args.style, cache_dir=cache_dir)
+            t0 = time.perf_counter()
+            highlighted = [highlighter.apply(frame, slide) for frame, slide in zip(frames, slides)]
+            timings[label] = time.perf_counter() - t0
+            print(f"{label:>12}: {timings[label] * 1000:8.1f} ms | "
+                  f"{timings[label] / max(args.slides, 1) * 1000:6.2f} ms/slide | {highlighter.replaced} blocks")
+
+    documents = {
+        "listings": generate_latex_preamble(metadata),
+        "pygments": generate_latex_preamble(metadata, extra_macros=code_preamble(args.style)),
+    }
+    bodies = {"listings": frames, "pygments": highlighted}
+    for name, preamble in documents.items():
+        documents[name] = preamble + "".join(
+            format_slide_block(slide["slide_number"], frame) for slide, frame in zip(slides, bodies[name])
+        ) + LATEX_POSTAMBLE
+        print(f"{name:>12}: .tex {len(documents[name].encode('utf-8')) / 1024:8.1f} KB")
+
+    if shutil.which("pdflatex") is None:
+        print("pdflatex not found -> compile times skipped.")
+        return
+    for name, source in documents.items():
+        elapsed, ok = _time_pdflatex(source, runs=args.runs)
+        print(f"{name:>12}: pdflatex x{args.runs} {elapsed:7.2f}s | {'OK' if ok else 'FAILED'}")
+
+
+def bench_warmup(args):
+    """Latenz des ersten Slide-Requests: kaltes Modell vs. nach dem Warm-up (converters/llm_warmup.py)."""
+    from types import SimpleNamespace
+    from converters.JSON_into_LaTeX_agent import SYSTEM_PROMPT, prompt_prefix_messages, single_slide_prompt_head
+    from converters.llm_client import LLMClient
+
+    config = SimpleNamespace(AGENT_OUTPUT_MODE="latex")
+    client = LLMClient(host=args.host, timeout=600.0, max_retries=0, keep_alive="30m")
+    slide = {"slide_number": 1, "elements": [
+        {"type": "text", "geometry": {"x": 0.05, "y": 0.1, "w": 0.9, "h": 0.2}, "text": "Benchmark", "fontsize": "small"},
+    ]}
+    messages = [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': single_slide_prompt_head() + f"INPUT DATA (Slide 1):\n    {json.dumps(slide)}\n    "},
+    ]
+    try:
+        client.ping()
+    except Exception as e:
+        print(f"Ollama not reachable ({e}) -> benchmark skipped.")
+        return
+
+    def unload():
+        client._client.chat(model=args.model, messages=[], keep_alive=0)
+
+    def first_request():
+        t0 = time.perf_counter()
+        client._client.chat(model=args.model, messages=messages, keep_alive="30m", options={"num_predict": 64})
+        return time.perf_counter() - t0
+
+    print(f"=== {args.model} ({args.repeat} runs) ===")
+    cold, warm, warmup = [], [], []
+    for _ in range(args.repeat):
+        unload()
+        cold.append(first_request())
+        unload()
+        t0 = time.perf_counter()
+        client.warm_up(args.model, prompt_prefix_messages(config))
+        warmup.append(time.perf_counter() - t0)
+        warm.append(first_request())
+    unload()
+
+    def avg(values):
+        return sum(values) / len(values)
+
+    print(f"{'cold':>12}: first request {avg(cold):7.2f}s")
+    print(f"{'warmed':>12}: first request {avg(warm):7.2f}s | warm-up itself {avg(warmup):7.2f}s (overlaps extraction)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("extraction-profiles", help="Docling fast vs. full profile")
+    p.add_argument("--input", default="./input")
+    p.set_defaults(func=bench_extraction_profiles)
+
+    p = sub.add_parser("native-parity", help="Native python-pptx extractor vs. Docling")
+    p.add_argument("--input", default="./input")
+    p.set_defaults(func=bench_native_parity)
+
+    p = sub.add_parser("shape-scan", help="Fused shape-tree scan vs. separate python-pptx passes")
+    p.add_argument("--input", default="./input")
+    p.set_defaults(func=bench_shape_scan)
+
+    p = sub.add_parser("zoning", help="Semantic zoning on large (synthetic) Docling dumps")
+    p.add_argument("--dump", default=None, help="Raw Docling JSON instead of synthetic dumps")
+    p.add_argument("--pages", type=int, nargs="+", default=[100, 1000, 5000])
+    p.add_argument("--items-per-page", type=int, default=40)
+    p.set_defaults(func=bench_zoning)
+
+    p = sub.add_parser("artifacts", help="Artifact formats: size and (de)serialization time")
+    p.add_argument("--dump", default=None, help="Raw Docling JSON instead of a synthetic dump")
+    p.add_argument("--pages", type=int, default=1000)
+    p.set_defaults(func=bench_artifacts)
+
+    p = sub.add_parser("code-highlight", help="listings vs. Pygments pre-highlighting (Python + pdflatex time)")
+    p.add_argument("--slides", type=int, default=40)
+    p.add_argument("--style", default="default")
+    p.add_argument("--runs", type=int, default=1, help="pdflatex runs per document")
+    p.set_defaults(func=bench_code_highlight)
+
+    p = sub.add_parser("warmup", help="First-request latency with a cold vs. pre-loaded model (needs Ollama)")
+    p.add_argument("--model", default="qwen3:8b")
+    p.add_argument("--host", default=None)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_warmup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
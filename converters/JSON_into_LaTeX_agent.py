@@ -1,10 +1,17 @@
 import json
-import ollama
 import re
+import threading
 import yaml 
 from pathlib import Path
 
-from utils import repair_latex_output
+from converters.JSON_into_LaTeX_renderer import render_slide_latex
+from converters.llm_client import LLMUnavailableError, get_llm_pool
+from converters.structured_output import (
+    build_structured_messages, layout_schema, parse_layout_decisions, render_structured_frame,
+    structured_prefix_messages,
+)
+from extracter.table_from_pptx import table_has_spans
+from utils import repair_latex_output, YELLOW, RESET
 
 def extract_latex_content(text):
     """Entfernt Markdown ```latex Wrapper"""
@@ -56,6 +63,7 @@ OUTPUT FORMAT RULES (STRICTLY FOLLOW):
    - **"table"**:
      - Generate a standard `tabular`.
      - **IMPORTANT:** Wrap the tabular inside `\resizebox{\linewidth}{!}{ ... }` to fit width.
+     - Tables with merged cells come as a "table" object instead of "table_rows": its "rows" list only the origin cells of merged areas: use `\multicolumn{<colspan>}{...}{...}` and `\multirow{<rowspan>}{*}{...}` for cells with "colspan"/"rowspan" > 1, and leave covered positions empty.
    - **"picture"**: `\includegraphics[width=\linewidth, height=\textheight, keepaspectratio]{...}`.
    - **Fontsize**: If "fontsize" exists, apply it INSTANTLY inside the minipage (e.g., `{\tiny ...}`).
 
@@ -173,39 +181,302 @@ Output 5:
 """
 
 # --- 2. WORKER FUNKTION ---
-def generate_single_slide_latex(slide_data, config):
-    slide_num = slide_data.get('slide_number', '?')
-    
-    # KORREKTUR: Wir nutzen strikt den Pfad aus dem Config-Objekt!
-    # Keine Defaults, kein Raten.
-    rules_block = load_conversion_rules()
+SYSTEM_PROMPT = (
+    "You are a strictly constrained LaTeX Beamer generator. "
+    "You do not explain. You only output code."
+)
 
-    # System Prompt
-    system_prompt = (
-        "You are a strictly constrained LaTeX Beamer generator. "
-        "You do not explain. You only output code."
-    )
-
-    # User Prompt
-    user_prompt = f"""
+def single_slide_prompt_head():
+    """Statischer Anfang des User-Prompts (für alle Slides gleich, siehe llm_warmup.py)."""
+    return f"""
     TASK: Convert the following JSON slide data into a LaTeX Beamer Frame using ONLY the syntax shown below.
     
-    {rules_block}
+    {load_conversion_rules()}
     
-    INPUT DATA (Slide {slide_num}):
-    {json.dumps(slide_data, indent=2, ensure_ascii=False)}
+    """
+
+def generate_single_slide_latex(slide_data, config, model=None):
+    if getattr(config, 'AGENT_OUTPUT_MODE', "latex") == "structured":
+        return generate_structured_slide_latex(slide_data, config, model)
+    slide_num = slide_data.get('slide_number', '?')
+
+    # User Prompt: statischer Kopf (Regeln) + Slide-Daten
+    user_prompt = single_slide_prompt_head() + f"""INPUT DATA (Slide {slide_num}):
+    {json.dumps(prompt_payload(slide_data), indent=2, ensure_ascii=False)}
     """
 
     messages = [
-        {'role': 'system', 'content': system_prompt},
+        {'role': 'system', 'content': SYSTEM_PROMPT},
         {'role': 'user', 'content': user_prompt}
     ]
 
+    pool = get_llm_pool(config)
     try:
-        response = ollama.chat(model=config.AGENT_LLM_MODEL, messages=messages)
-        content = response['message']['content']
+        if getattr(config, 'AGENT_STREAMING', False):
+            content, abort_reason = pool.chat(
+                messages, model=model,
+                consumer=lambda stream: collect_streamed_frame(stream, config)
+            )
+            if abort_reason in ("length_limit", "repetition"):
+                save_partial_output(content, slide_num, abort_reason, config)
+                return _fallback_frame(slide_data, pool, f"stream aborted ({abort_reason})")
+        else:
+            content = pool.chat(messages, model=model)
+        pool.count("output_chars", len(content))
         content = repair_latex_output(content)
         return extract_latex_content(content)
+    except LLMUnavailableError as e:
+        return _fallback_frame(slide_data, pool, e)
     except Exception as e:
         print(f"Error generating Slide {slide_num}: {e}")
-        return f"% ERROR Slide {slide_num}\n\\begin{{frame}}{{Error}}\nGeneration failed.\n\\end{{frame}}"
+        return _fallback_frame(slide_data, pool, e)
+
+
+def generate_structured_slide_latex(slide_data, config, model=None):
+    """
+    AGENT_OUTPUT_MODE = "structured": Das LLM liefert nur Layout-Entscheidungen
+    als JSON (Ollama `format` = Schema), der Frame wird lokal gerendert.
+    """
+    slide_num = slide_data.get('slide_number', '?')
+    n_elements = len(slide_data.get("elements", []))
+    pool = get_llm_pool(config)
+    if not n_elements:
+        return render_slide_latex(slide_data)
+    try:
+        content = pool.chat(build_structured_messages(slide_data), model=model, format=layout_schema(n_elements))
+        pool.count("output_chars", len(content))
+        decisions = parse_layout_decisions(_strip_think(content), n_elements)
+        return render_structured_frame(slide_data, decisions)
+    except LLMUnavailableError as e:
+        return _fallback_frame(slide_data, pool, e)
+    except ValueError as e:
+        # json.JSONDecodeError ist ein ValueError
+        print(f"Slide {slide_num}: unusable structured response: {e}")
+        return _fallback_frame(slide_data, pool, e)
+    except Exception as e:
+        print(f"Error generating Slide {slide_num}: {e}")
+        return _fallback_frame(slide_data, pool, e)
+
+
+def prompt_prefix_messages(config):
+    """
+    Nachrichten mit dem statischen Prompt-Anfang des aktiven Modus. Ollama
+    hält den verarbeiteten Prefix im KV-Cache; echte Requests mit demselben
+    Anfang müssen ihn nicht erneut einlesen.
+    """
+    if getattr(config, 'AGENT_OUTPUT_MODE', "latex") == "structured":
+        return structured_prefix_messages()
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': single_slide_prompt_head()}
+    ]
+
+
+_fallback_state = threading.local()
+
+def _fallback_frame(slide_data, pool, reason):
+    """Deterministischer Fallback statt eines leeren "Error"-Frames."""
+    slide_num = slide_data.get('slide_number', '?')
+    print(f"{YELLOW}Slide {slide_num}: using deterministic renderer ({reason}).{RESET}")
+    pool.count("fallbacks")
+    _fallback_state.reason = reason
+    return render_slide_latex(slide_data)
+
+
+def pop_fallback_reason():
+    """
+    Grund des letzten Fallbacks im aktuellen Thread (und zurücksetzen) oder
+    None. Damit markieren die Checkpoints Slides, die beim Resume erneut an
+    das LLM gehen sollen.
+    """
+    reason = getattr(_fallback_state, "reason", None)
+    _fallback_state.reason = None
+    return reason
+
+
+def set_fallback_reason(reason):
+    """Fallback-Grund für den aktuellen Thread setzen (z.B. aus Teil-Requests, siehe slide_splitter.py)."""
+    _fallback_state.reason = reason
+
+
+# --- 3. STREAMING ---
+FRAME_BEGIN = r"\begin{frame}"
+FRAME_END = r"\end{frame}"
+
+def collect_streamed_frame(stream, config):
+    """
+    Liest den Ollama-Stream Chunk für Chunk und bricht ab, sobald
+    - ein vollständiger Frame (\\begin{frame} ... \\end{frame}) vorliegt,
+    - das Längenlimit (AGENT_MAX_OUTPUT_CHARS) erreicht ist oder
+    - das Modell in einer Wiederholungsschleife hängt.
+    Gibt (content, abort_reason) zurück. Bei "frame_complete" ist content
+    genau der Frame, sonst die bisherige (rohe) Teilausgabe.
+    """
+    max_chars = getattr(config, 'AGENT_MAX_OUTPUT_CHARS', 12000)
+    window = getattr(config, 'AGENT_REPETITION_WINDOW', 200)
+    repeat_limit = getattr(config, 'AGENT_REPETITION_LIMIT', 4)
+
+    content = ""
+    frame_start = -1
+    abort_reason = "stream_ended"
+
+    try:
+        for chunk in stream:
+            content += chunk['message']['content']
+
+            # qwen3 & Co. "denken" vorher laut nach -> Frames im <think>-Block zählen nicht
+            scan_from = 0
+            if "<think>" in content:
+                think_end = content.rfind("</think>")
+                if think_end == -1:
+                    if len(content) > max_chars:
+                        abort_reason = "length_limit"
+                        break
+                    continue
+                scan_from = think_end
+
+            if frame_start < scan_from:
+                frame_start = content.find(FRAME_BEGIN, scan_from)
+            if frame_start != -1:
+                frame_end = content.find(FRAME_END, frame_start)
+                if frame_end != -1:
+                    return content[frame_start:frame_end + len(FRAME_END)], "frame_complete"
+
+            if len(content) > max_chars:
+                abort_reason = "length_limit"
+                break
+
+            if len(content) > 2 * window:
+                tail = content[-window:]
+                if content.count(tail, 0, len(content) - window) >= repeat_limit - 1:
+                    abort_reason = "repetition"
+                    break
+    finally:
+        # Schließt die HTTP-Verbindung -> Ollama bricht die Generierung ab
+        if hasattr(stream, 'close'):
+            stream.close()
+
+    return content, abort_reason
+
+def save_partial_output(content, slide_num, abort_reason, config):
+    """Speichert abgebrochene Modellausgaben zur Diagnose im JSON-Ordner."""
+    print(f"Slide {slide_num}: LLM stream aborted ({abort_reason}) after {len(content)} chars.")
+    if getattr(config, 'JSON_OUTPUT_DIR', None) is None:
+        return  # In-Memory-Lauf (api.convert ohne persist_dir)
+    try:
+        diag_dir = Path(config.JSON_OUTPUT_DIR) / "llm_diagnostics"
+        diag_dir.mkdir(parents=True, exist_ok=True)
+        diag_path = diag_dir / f"slide_{slide_num}_{abort_reason}.txt"
+        with open(diag_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"   -> Partial output saved to: {diag_path}")
+    except Exception as e:
+        print(f"   -> Could not save partial output: {e}")
+
+
+# --- 4. BATCHING ---
+BATCH_MARKER = "% === SLIDE {} ==="
+_BATCH_MARKER_PATTERN = re.compile(r"%\s*===\s*SLIDE\s+(\S+?)\s*===")
+_FRAME_PATTERN = re.compile(r"\\begin\{frame\}.*?\\end\{frame\}", re.DOTALL)
+
+def _prompt_element(el):
+    el = {k: v for k, v in el.items() if k != "code"}
+    table = el.get("table")
+    if table is not None:
+        # Tabelle nur einmal: mit verbundenen Zellen die Ursprungszellen, sonst die flachen Zeilen
+        if table_has_spans(table):
+            el.pop("table_rows", None)
+            el["table"] = {k: table[k] for k in ("n_rows", "n_cols", "rows")}
+        else:
+            del el["table"]
+    return el
+
+def prompt_payload(slide_data):
+    """
+    Slide-Daten fürs LLM: ohne das rohe "code"-Feld (steht schon als
+    lstlisting in "text") und mit genau einer Darstellung jeder Tabelle.
+    """
+    elements = slide_data.get("elements", [])
+    if not any("code" in el or "table" in el for el in elements):
+        return slide_data
+    return {**slide_data, "elements": [_prompt_element(el) for el in elements]}
+
+def estimate_tokens(text):
+    """Faustregel: ~4 Zeichen pro Token (JSON/LaTeX eher etwas weniger)."""
+    return len(text) // 4 + 1
+
+def estimate_slide_tokens(slide_data):
+    return estimate_tokens(json.dumps(prompt_payload(slide_data), ensure_ascii=False))
+
+def _strip_think(text):
+    if "</think>" in text:
+        return text[text.rfind("</think>") + len("</think>"):]
+    return text
+
+def split_batch_response(content, slide_nums):
+    """
+    Zerlegt eine Batch-Antwort anhand der SLIDE-Marker in einzelne Frames.
+    Slides ohne erkennbaren, vollständigen Frame fehlen im Ergebnis.
+    Fehlen alle Marker, die Anzahl der Frames passt aber, wird der
+    Reihenfolge nach zugeordnet.
+    """
+    content = _strip_think(content)
+    wanted = {str(n): n for n in slide_nums}
+    frames = {}
+
+    markers = list(_BATCH_MARKER_PATTERN.finditer(content))
+    for idx, marker in enumerate(markers):
+        key = marker.group(1)
+        if key not in wanted or wanted[key] in frames:
+            continue
+        end = markers[idx + 1].start() if idx + 1 < len(markers) else len(content)
+        match = _FRAME_PATTERN.search(content, marker.end(), end)
+        if match:
+            frames[wanted[key]] = match.group(0)
+
+    if not markers:
+        all_frames = _FRAME_PATTERN.findall(content)
+        if len(all_frames) == len(slide_nums):
+            frames = dict(zip(slide_nums, all_frames))
+    return frames
+
+def generate_batch_latex(slides, config, model=None):
+    """
+    Schickt mehrere kleine Slides in EINEM Request an das LLM.
+    Gibt {slide_number: latex} für alle erfolgreich zerlegten Slides zurück;
+    der Aufrufer generiert fehlende Slides einzeln nach.
+    """
+    slide_nums = [s.get('slide_number', i + 1) for i, s in enumerate(slides)]
+    rules_block = load_conversion_rules()
+
+
+    input_blocks = "\n".join(
+        f"{BATCH_MARKER.format(num)}\n{json.dumps(prompt_payload(slide), indent=2, ensure_ascii=False)}"
+        for num, slide in zip(slide_nums, slides)
+    )
+    user_prompt = f"""
+    TASK: Convert EACH of the following {len(slides)} JSON slides into its own LaTeX Beamer Frame using ONLY the syntax shown below.
+    Before each frame, output the marker line exactly as given in the input (e.g. `{BATCH_MARKER.format(slide_nums[0])}`).
+    Output the frames in the same order as the input.
+
+    {rules_block}
+
+    INPUT DATA ({len(slides)} slides):
+    {input_blocks}
+    """
+
+    messages = [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': user_prompt}
+    ]
+
+    pool = get_llm_pool(config)
+    try:
+        content = pool.chat(messages, model=model)
+    except Exception as e:
+        print(f"{YELLOW}Batch request for slides {slide_nums} failed: {e}{RESET}")
+        return {}
+    pool.count("output_chars", len(content))
+
+    frames = split_batch_response(content, slide_nums)
+    return {num: extract_latex_content(repair_latex_output(frame)) for num, frame in frames.items()}
@@ -0,0 +1,207 @@
+import re
+
+# Deterministischer Renderer: setzt die Regeln aus load_conversion_rules()
+# direkt in Python um. Wird genutzt, wenn das LLM nicht erreichbar ist
+# oder keine brauchbare Antwort liefert.
+
+LATEX_SPECIAL_CHARS = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+}
+_ESCAPE_PATTERN = re.compile('|'.join(re.escape(c) for c in LATEX_SPECIAL_CHARS))
+
+FONT_SIZE_COMMANDS = {
+    "3pt": r"\fontsize{3}{3.3}\selectfont",
+}
+
+DEFAULT_GEOMETRY = {"x": 0.05, "y": 0.1, "w": 0.9, "h": 0.8}
+
+
+def escape_latex(text):
+    """Escaped LaTeX-Sonderzeichen in normalem Fließtext."""
+    if not text:
+        return ""
+    return _ESCAPE_PATTERN.sub(lambda m: LATEX_SPECIAL_CHARS[m.group(0)], text)
+
+
+def get_element_alignment(element):
+    """Minipage-Ausrichtung nach Regel 3 (ALIGNMENT LOGIC)."""
+    el_type = element.get("type")
+    if el_type in ("table", "list", "picture", "codeblock"):
+        return "t"
+    if el_type == "footer":
+        return "b"
+    if el_type == "header" or element.get("label") == "title":
+        return "b"
+    return element.get("align", "t")
+
+
+def render_element_content(element):
+    """Rendert nur den Inhalt eines Elements (ohne textblock/minipage)."""
+    el_type = element.get("type")
+
+    if el_type == "codeblock":
+        # Text enthält bereits die lstlisting-Umgebung (siehe utils.group_elements)
+        return element.get("text", "")
+
+    if el_type == "list":
+        items = [escape_latex(it) for it in element.get("items", []) if isinstance(it, str) and it.strip()]
+        if len(items) == 1:
+            return items[0]
+        lines = ["\\begin{itemize}"]
+        lines += [f"  \\item {it}" for it in items]
+        lines.append("\\end{itemize}")
+        return "\n".join(lines)
+
+    if el_type == "table":
+        if element.get("table"):
+            return render_normalized_table(element["table"])
+        return render_table(element.get("table_rows", []))
+
+    if el_type == "picture":
+        image_path = element.get("image_path", "")
+        return f"\\includegraphics[width=\\linewidth, height=\\textheight, keepaspectratio]{{{image_path}}}"
+
+    text = escape_latex(element.get("text", "")).replace("\n", " \\\\\n")
+    if element.get("label") in ("title", "section_header"):
+        return f"\\textbf{{{text}}}"
+    return text
+
+
+def render_table(rows):
+    if not rows:
+        return ""
+    n_cols = max(len(r) for r in rows)
+    lines = ["\\resizebox{\\linewidth}{!}{", f"  \\begin{{tabular}}{{|{'l|' * n_cols}}}", "    \\hline"]
+    for row in rows:
+        cells = [escape_latex(c) for c in row] + [""] * (n_cols - len(row))
+        lines.append("    " + " & ".join(cells) + " \\\\ \\hline")
+    lines += ["  \\end{tabular}", "}"]
+    return "\n".join(lines)
+
+
+def _column_spec(table, col, span=1):
+    """Spaltentyp: p{} mit der relativen Breite aus der PPTX, sonst l."""
+    widths = table.get("col_widths")
+    if not widths:
+        return "l"
+    return f"p{{{sum(widths[col:col + span]):.3f}\\linewidth}}"
+
+
+def _span_cell(table, cell, text):
+    """Zelle mit \\multicolumn/\\multirow (multirow-Paket) für verbundene Bereiche."""
+    if cell["rowspan"] > 1:
+        # "=": Breite der p{}-Spalte übernehmen (Umbruch), "*": natürliche Breite
+        width = "=" if table.get("col_widths") else "*"
+        text = f"\\multirow{{{cell['rowspan']}}}{{{width}}}{{{text}}}"
+    if cell["colspan"] > 1:
+        left = "|" if cell["col"] == 0 else ""
+        spec = _column_spec(table, cell["col"], cell["colspan"])
+        text = f"\\multicolumn{{{cell['colspan']}}}{{{left}{spec}|}}{{{text}}}"
+    return text
+
+
+def _row_rule(covered_below, n_cols):
+    """\\hline, oder \\cline-Stücke, wenn ein \\multirow in die nächste Zeile reicht."""
+    if not any(covered_below):
+        return "\\hline"
+    segments, start = [], None
+    for col in range(n_cols + 1):
+        open_col = col < n_cols and not covered_below[col]
+        if open_col and start is None:
+            start = col
+        elif not open_col and start is not None:
+            segments.append(f"\\cline{{{start + 1}-{col}}}")
+            start = None
+    return " ".join(segments)
+
+
+def render_normalized_table(table):
+    """
+    Rendert die normalisierte Tabelle (extracter/table_from_pptx.py) inkl.
+    verbundener Zellen und Spaltenbreiten.
+    """
+    n_rows, n_cols = table.get("n_rows", 0), table.get("n_cols", 0)
+    if not n_rows or not n_cols:
+        return ""
+
+    # Pro Position: Ursprungszelle, die sie von oben (rowspan) überdeckt
+    covering = [[None] * n_cols for _ in range(n_rows)]
+    for r, row in enumerate(table["rows"]):
+        for cell in row:
+            for dr in range(1, cell["rowspan"]):
+                for dc in range(cell["colspan"]):
+                    covering[r + dr][cell["col"] + dc] = cell
+
+    col_spec = "|" + "".join(f"{_column_spec(table, c)}|" for c in range(n_cols))
+    lines = ["\\resizebox{\\linewidth}{!}{", f"  \\begin{{tabular}}{{{col_spec}}}", "    \\hline"]
+    for r, row in enumerate(table["rows"]):
+        origins = {cell["col"]: cell for cell in row}
+        cells, col = [], 0
+        while col < n_cols:
+            if col in origins:
+                cell = origins[col]
+                cells.append(_span_cell(table, cell, escape_latex(cell["text"]).replace("\n", " ")))
+                col += cell["colspan"]
+            elif covering[r][col] is not None:
+                # Von oben überdeckt: leere Zelle, bei Spaltenspan als \\multicolumn
+                cell = covering[r][col]
+                cells.append(_span_cell(table, {**cell, "rowspan": 1}, ""))
+                col += cell["colspan"]
+            else:
+                cells.append("")
+                col += 1
+        covered_below = [r + 1 < n_rows and covering[r + 1][c] is not None for c in range(n_cols)]
+        lines.append("    " + " & ".join(cells) + " \\\\ " + _row_rule(covered_below, n_cols))
+    lines += ["  \\end{tabular}", "}"]
+    return "\n".join(lines)
+
+
+def wrap_with_fontsize(content, fontsize):
+    if not fontsize or not content:
+        return content
+    if fontsize in FONT_SIZE_COMMANDS:
+        return f"{FONT_SIZE_COMMANDS[fontsize]} {content}"
+    return f"{{\\{fontsize}\n{content}\n}}"
+
+
+def render_textblock(geometry, align, content):
+    """Baut den textblock/minipage-Container aus Regel 2 und 3."""
+    geo = geometry or DEFAULT_GEOMETRY
+    x, y, w, h = geo.get("x", 0), geo.get("y", 0), geo.get("w", 0), geo.get("h", 0)
+    inner = "\n".join("    " + line for line in content.splitlines())
+    return (
+        f"\\begin{{textblock}}{{{w}}}({x}, {y})\n"
+        f"  \\begin{{minipage}}[{align}][{h}\\paperheight]{{\\linewidth}}\n"
+        f"{inner}\n"
+        f"  \\end{{minipage}}\n"
+        f"\\end{{textblock}}"
+    )
+
+
+def render_element(element):
+    content = render_element_content(element)
+    if element.get("type") == "footer":
+        content = "\\raggedright\n" + wrap_with_fontsize(content, element.get("fontsize"))
+    else:
+        content = wrap_with_fontsize(content, element.get("fontsize"))
+    return render_textblock(element.get("geometry"), get_element_alignment(element), content)
+
+
+def render_frame(slide_num, blocks, note="rendered without LLM"):
+    body = "\n".join(blocks)
+    return f"% Slide {slide_num} ({note})\n\\begin{{frame}}[fragile]\n{body}\n\\end{{frame}}"
+
+
+def render_slide_latex(slide_data):
+    """Rendert eine komplette Slide ohne LLM als Beamer-Frame."""
+    slide_num = slide_data.get('slide_number', '?')
+    return render_frame(slide_num, [render_element(el) for el in slide_data.get("elements", [])])
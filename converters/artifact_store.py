@@ -0,0 +1,138 @@
+import json
+import os
+import time
+from pathlib import Path
+
+# Zwischenergebnisse der Pipeline (Raw-Docling, Cleaned, Grouped) laufen über
+# den ArtifactStore statt über json.dump(indent=2). Formate:
+#   "msgpack"    – binär, kompakt (optional: pip install msgpack)
+#   "orjson"     – kompaktes JSON über orjson (optional: pip install orjson)
+#   "json"       – kompaktes JSON über die Standardbibliothek
+#   "json-pretty" – eingerücktes JSON (Debug-Format wie bisher)
+# "auto" nimmt das schnellste verfügbare Format. Die Pfade in der Config
+# bleiben logische Namen (*.json); die Endung richtet sich nach dem Format.
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ARTIFACT_FORMATS = ("auto", "msgpack", "orjson", "json", "json-pretty")
+DEBUG_SUFFIX = ".debug.json"
+
+
+def resolve_artifact_format(name="auto"):
+    if name not in ARTIFACT_FORMATS:
+        raise ValueError(f"Unknown ARTIFACT_FORMAT '{name}' (expected one of {ARTIFACT_FORMATS})")
+    if name == "auto":
+        if msgpack is not None:
+            return "msgpack"
+        return "orjson" if orjson is not None else "json"
+    if name == "msgpack" and msgpack is None:
+        raise ValueError("ARTIFACT_FORMAT 'msgpack' requires the msgpack package")
+    if name == "orjson" and orjson is None:
+        raise ValueError("ARTIFACT_FORMAT 'orjson' requires the orjson package")
+    return name
+
+
+def artifact_suffix(fmt):
+    return ".msgpack" if fmt == "msgpack" else ".json"
+
+
+def encode_artifact(data, fmt):
+    if fmt == "msgpack":
+        return msgpack.packb(data, use_bin_type=True)
+    if fmt == "orjson":
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    if fmt == "json-pretty":
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_artifact(payload, suffix):
+    """Dekodiert nach Dateiendung (.msgpack oder JSON in beliebiger Formatierung)."""
+    if suffix == ".msgpack":
+        if msgpack is None:
+            raise ValueError("Reading .msgpack artifacts requires the msgpack package")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload.decode("utf-8"))
+
+
+class ArtifactStore:
+    """
+    Schreibt/liest Zwischenergebnisse im konfigurierten Format und meldet
+    Serialisierungszeit und Größe. Mit debug_json wird zusätzlich ein
+    eingerücktes <name>.debug.json zum Ansehen abgelegt.
+    """
+
+    def __init__(self, fmt="auto", debug_json=False):
+        self.format = resolve_artifact_format(fmt)
+        self.debug_json = debug_json
+        self.stats = []
+
+    def path_for(self, path):
+        """Physischer Pfad für einen logischen Artefakt-Pfad (z.B. .../foo.json)."""
+        path = Path(path)
+        return path.with_suffix(artifact_suffix(self.format))
+
+    def resolve(self, path):
+        """Existierende Datei zu einem logischen Pfad (aktuelles Format zuerst) oder None."""
+        for candidate in (self.path_for(path), Path(path)):
+            if candidate.exists():
+                return candidate
+        return None
+
+    def exists(self, path):
+        return self.resolve(path) is not None
+
+    def save(self, path, data):
+        target = self.path_for(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        t0 = time.perf_counter()
+        payload = encode_artifact(data, self.format)
+        encode_s = time.perf_counter() - t0
+
+        # Erst in eine Temp-Datei schreiben, dann atomar umbenennen
+        tmp_path = target.with_name(f"{target.name}.tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, target)
+        self._report("write", target, len(payload), encode_s)
+
+        if self.debug_json and self.format != "json-pretty":
+            debug_path = Path(path).with_suffix(DEBUG_SUFFIX)
+            with open(debug_path, "wb") as f:
+                f.write(encode_artifact(data, "json-pretty"))
+            print(f"   -> Debug JSON export: {debug_path}")
+        return target
+
+    def load(self, path):
+        source = self.resolve(path)
+        if source is None:
+            raise FileNotFoundError(f"Artifact not found: {self.path_for(path)}")
+        with open(source, "rb") as f:
+            payload = f.read()
+        t0 = time.perf_counter()
+        data = decode_artifact(payload, source.suffix)
+        self._report("read", source, len(payload), time.perf_counter() - t0)
+        return data
+
+    def _report(self, action, path, size, seconds):
+        self.stats.append({"action": action, "path": str(path), "bytes": size, "seconds": seconds})
+        print(f"   -> Artifact {action}: {path.name} ({self.format if action == 'write' else path.suffix[1:]}, "
+              f"{size / 1024:.1f} KB, {seconds * 1000:.1f} ms)")
+
+
+def get_artifact_store(config=None):
+    return ArtifactStore(
+        getattr(config, 'ARTIFACT_FORMAT', "auto"),
+        debug_json=getattr(config, 'ARTIFACT_DEBUG_JSON', False),
+    )
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    import pygments
+except ImportError:
+    pygments = None
+
+# Optionale Code-Stufe: Codeblöcke werden einmal in Python mit Pygments
+# hervorgehoben (fancyvrb-Verbatim mit commandchars, kein shell-escape) statt
+# bei jedem pdflatex-Lauf von listings tokenisiert. Die Sprache wird per
+# Heuristik erkannt statt immer Java anzunehmen. Ergebnisse werden pro
+# Code-Hash im Speicher und optional auf der Platte gecacht.
+
+DEFAULT_LANGUAGE = "java"
+
+# Sprache -> (Pygments-Lexer, listings-Sprache oder None)
+LANGUAGES = {
+    "java": ("java", "Java"),
+    "python": ("python", "Python"),
+    "c": ("c", "C"),
+    "cpp": ("cpp", "C++"),
+    "javascript": ("javascript", None),
+}
+
+_LANGUAGE_HINTS = {
+    "java": [
+        r"\b(public|private|protected)\s+(static\s+)?[\w<>\[\]]+\s+\w+\s*\(",
+        r"\bSystem\.out\.",
+        r"\b(class|interface)\s+\w+\s*(extends|implements|\{)",
+        r"\b(String|boolean|ArrayList|List<)\b",
+        r"\bnew\s+\w+\s*[\[(<]",
+    ],
+    "python": [
+        r"^\s*def\s+\w+\s*\(.*\)\s*:",
+        r"^\s*(elif|except|with)\b.*:\s*$",
+        r"^\s*(import\s+\w+|from\s+[\w.]+\s+import)\b",
+        r"\bself\.",
+        r"\b(None|True|False)\b",
+        r"^\s*(for|while|if)\b[^;{]*:\s*$",
+    ],
+    "c": [
+        r"#include\s*<\w+\.h>",
+        r"\bprintf\s*\(",
+        r"\b(malloc|free|sizeof)\s*\(",
+    ],
+    "cpp": [
+        r"#include\s*<\w+>",
+        r"\bstd::",
+        r"\b(cout|cin)\s*(<<|>>)",
+        r"\btemplate\s*<",
+    ],
+    "javascript": [
+        r"\bfunction\s+\w*\s*\(",
+        r"\b(const|let|var)\s+\w+\s*=",
+        r"=>",
+        r"\bconsole\.log\s*\(",
+    ],
+}
+_COMPILED_HINTS = {
+    language: [re.compile(pattern, re.MULTILINE) for pattern in patterns]
+    for language, patterns in _LANGUAGE_HINTS.items()
+}
+
+_LSTLISTING_PATTERN = re.compile(r"\\begin\{lstlisting\}(?:\[[^\]]*\])?\n?(.*?)\\end\{lstlisting\}", re.DOTALL)
+
+
+def detect_code_language(code, default=DEFAULT_LANGUAGE):
+    """Sprache mit den meisten Treffern der Heuristiken (Gleichstand/keine Treffer -> default)."""
+    scores = {
+        language: sum(len(pattern.findall(code)) for pattern in patterns)
+        for language, patterns in _COMPILED_HINTS.items()
+    }
+    best = max(scores, key=scores.get)
+    if scores[best] == 0 or scores.get(default, 0) == scores[best]:
+        return default
+    return best
+
+
+def listings_language(language):
+    return LANGUAGES.get(language, LANGUAGES[DEFAULT_LANGUAGE])[1]
+
+
+def _formatter(style):
+    from pygments.formatters import LatexFormatter
+    return LatexFormatter(style=style, verboptions=r"fontsize=\scriptsize")
+
+
+def code_preamble(style="default"):
+    """fancyvrb + \\PY-Makros des Pygments-Stils für die Preamble."""
+    return "\\usepackage{fancyvrb}\n" + _formatter(style).get_style_defs()
+
+
+def _cache_key(code, language, style):
+    payload = "\0".join((pygments.__version__, style, language, code))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1024)
+def _highlight(code, language, style):
+    from pygments import highlight
+    from pygments.lexers import get_lexer_by_name
+    lexer = get_lexer_by_name(LANGUAGES.get(language, LANGUAGES[DEFAULT_LANGUAGE])[0])
+    return highlight(code, lexer, _formatter(style)).rstrip("\n")
+
+
+def highlight_code(code, language=None, style="default", cache_dir=None):
+    """Code -> \\begin{Verbatim}[commandchars=...] ... \\end{Verbatim} (gecacht nach Hash)."""
+    language = language or detect_code_language(code)
+    if cache_dir is None:
+        return _highlight(code, language, style)
+
+    entry = Path(cache_dir) / f"{_cache_key(code, language, style)}.tex"
+    if entry.exists():
+        return entry.read_text(encoding="utf-8")
+    latex = _highlight(code, language, style)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    # Erst in eine Temp-Datei schreiben, dann atomar umbenennen
+    tmp_path = entry.with_name(f"{entry.name}.tmp{os.getpid()}")
+    tmp_path.write_text(latex, encoding="utf-8")
+    os.replace(tmp_path, entry)
+    return latex
+
+
+def _normalize(code):
+    return " ".join(code.split())
+
+
+class CodeHighlighter:
+    """Ersetzt lstlisting-Umgebungen eines Frames durch den vorab hervorgehobenen Code."""
+
+    def __init__(self, style="default", cache_dir=None):
+        self.style = style
+        self.cache_dir = cache_dir
+        self.replaced = 0
+        self.kept = 0
+
+    def preamble(self):
+        return code_preamble(self.style)
+
+    def apply(self, frame, slide):
+        """
+        Sucht für jeden Codeblock der Slide (Feld "code") die lstlisting-Umgebung
+        mit demselben Inhalt und setzt den Pygments-Block ein. Umgebungen, die
+        das LLM verändert hat, bleiben als lstlisting stehen.
+        """
+        codeblocks = [el for el in slide.get("elements", []) if el.get("type") == "codeblock" and el.get("code")]
+        if not codeblocks or "\\begin{lstlisting}" not in frame:
+            return frame
+        by_content = {_normalize(el["code"]): el for el in codeblocks}
+
+        def substitute(match):
+            el = by_content.get(_normalize(match.group(1)))
+            if el is None:
+                self.kept += 1
+                return match.group(0)
+            self.replaced += 1
+            return highlight_code(el["code"], el.get("language"), self.style, self.cache_dir)
+
+        return _LSTLISTING_PATTERN.sub(substitute, frame)
+
+    def print_summary(self):
+        print(f"Code highlighting: {self.replaced} blocks pre-highlighted with Pygments, "
+              f"{self.kept} left as lstlisting")
+
+
+def slides_have_code(slides):
+    return any(el.get("type") == "codeblock" and el.get("code") for slide in slides for el in slide.get("elements", []))
+
+
+def get_code_highlighter(config, slides):
+    """CodeHighlighter, wenn die Stufe aktiv ist und die Slides Code enthalten, sonst None."""
+    if not getattr(config, 'CODE_HIGHLIGHT', False) or not slides_have_code(slides):
+        return None
+    if pygments is None:
+        print("Code highlighting requires Pygments (pip install pygments) -> keeping lstlisting.")
+        return None
+    return CodeHighlighter(
+        style=getattr(config, 'CODE_HIGHLIGHT_STYLE', "default"),
+        cache_dir=getattr(config, 'CODE_HIGHLIGHT_CACHE_DIR', None),
+    )
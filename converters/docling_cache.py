@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import shutil
+from importlib import metadata
+from pathlib import Path
+
+from converters.pptx_into_JSON import get_docling_options
+from utils import YELLOW, RESET
+
+
+DOCLING_DISTRIBUTIONS = ("docling", "docling-slim", "docling-core")
+
+
+def get_docling_version():
+    """
+    Versionen aller installierten Docling-Distributionen (docling oder
+    docling-slim, dazu docling-core), sonst docling.__version__.
+    None, wenn keine Version ermittelbar ist (dann wird nicht gecacht).
+    """
+    versions = {}
+    for name in DOCLING_DISTRIBUTIONS:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            continue
+    if versions:
+        return ",".join(f"{name}={version}" for name, version in versions.items())
+    try:
+        import docling
+        return getattr(docling, "__version__", None)
+    except ImportError:
+        return None
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 über den Dateiinhalt (blockweise, auch für große Decks)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_cache_key(pptx_path, options, docling_version=None):
+    """Key = Inhalt der PPTX + Docling-Version + Konverter-Optionen."""
+    payload = json.dumps({
+        "pptx": hash_file(pptx_path),
+        "docling": docling_version or get_docling_version(),
+        "options": options,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """
+    Ablage der rohen Docling-Artefakte unter <cache_dir>/<key><endung>
+    (.json oder .msgpack, je nach ARTIFACT_FORMAT).
+    Eviction: LRU (mtime wird bei jedem Treffer aktualisiert), begrenzt durch
+    max_entries und max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_entries=20, max_bytes=1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key, suffix=".json"):
+        return self.cache_dir / f"{key}{suffix}"
+
+    def restore(self, key, destination):
+        """
+        Kopiert einen Treffer nach `destination`. Gibt True bei Hit zurück.
+        Nur Einträge im Format von `destination` (gleiche Endung) zählen.
+        """
+        entry = self._entry_path(key, Path(destination).suffix)
+        if not entry.exists():
+            return False
+        Path(destination).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(entry, destination)
+        os.utime(entry)  # LRU: zuletzt benutzt
+        return True
+
+    def store(self, key, source):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry_path(key, Path(source).suffix)
+        # Erst in eine Temp-Datei schreiben, dann atomar umbenennen
+        tmp_path = entry.with_name(f"{entry.name}.tmp{os.getpid()}")
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, entry)
+        self.evict()
+
+    def evict(self):
+        """Löscht die am längsten nicht benutzten Einträge bis die Limits passen."""
+        if not self.cache_dir.is_dir():
+            return
+        entries = sorted(
+            (p for p in self.cache_dir.iterdir() if p.suffix in (".json", ".msgpack")),
+            key=lambda p: p.stat().st_mtime,
+            reverse=True,
+        )
+        total = 0
+        for i, entry in enumerate(entries):
+            size = entry.stat().st_size
+            total += size
+            if i >= self.max_entries or total > self.max_bytes:
+                entry.unlink(missing_ok=True)
+                total -= size
+                print(f"{YELLOW}Extraction cache: evicted {entry.name}{RESET}")
+
+
+def get_extraction_cache(config):
+    """Gibt (cache, key) zurück oder (None, None), wenn der Cache aus ist."""
+    if not getattr(config, 'USE_EXTRACTION_CACHE', True):
+        return None, None
+    docling_version = get_docling_version()
+    if docling_version is None:
+        # Ohne Version würde ein Docling-Update den Cache nie invalidieren
+        print(f"{YELLOW}Extraction cache disabled: Docling version unknown.{RESET}")
+        return None, None
+    cache = ExtractionCache(
+        getattr(config, 'EXTRACTION_CACHE_DIR', Path(".cache/docling")),
+        max_entries=getattr(config, 'EXTRACTION_CACHE_MAX_ENTRIES', 20),
+        max_bytes=getattr(config, 'EXTRACTION_CACHE_MAX_BYTES', 1024 ** 3),
+    )
+    key = compute_cache_key(config.PPTX_INPUT, get_docling_options(config), docling_version)
+    return cache, key
@@ -0,0 +1,143 @@
+import re
+import textwrap
+from collections import Counter
+
+# Nachbearbeitung des fertigen Dokuments: Jeder textblock/minipage-Container
+# wird zu einem Aufruf des Makros \pptxtb (Geometrie gerundet), und Blöcke,
+# die sich auf vielen Frames wiederholen (Footer, Logos, Header), werden
+# einmal in der Preamble als \pptxrepA, \pptxrepB, ... definiert.
+# Verbatim-Inhalte (lstlisting, verbatim, \verb) dürfen nicht in
+# Makro-Argumente -> solche Blöcke bleiben unverändert.
+
+TEXTBLOCK_MACRO = "pptxtb"
+REPEAT_MACRO_PREFIX = "pptxrep"
+
+TEXTBLOCK_MACRO_DEFINITION = (
+    f"\\newcommand{{\\{TEXTBLOCK_MACRO}}}[6]{{%\n"
+    "  \\begin{textblock}{#1}(#2, #3)%\n"
+    "  \\begin{minipage}[#4][#5\\paperheight]{\\linewidth}#6\\end{minipage}%\n"
+    "  \\end{textblock}}"
+)
+
+_TEXTBLOCK_PATTERN = re.compile(
+    r"\\begin\{textblock\}\{(?P<w>[^{}]*)\}\((?P<x>[^,()]*),\s*(?P<y>[^()]*)\)\s*"
+    r"\\begin\{minipage\}\[(?P<align>[tcb])\]\[(?P<h>[^\]]*)\\paperheight\]\{\\linewidth\}"
+    r"(?P<content>.*?)\\end\{minipage\}\s*\\end\{textblock\}",
+    re.DOTALL,
+)
+_VERBATIM_PATTERN = re.compile(
+    r"\\begin\{(lstlisting|verbatim|Verbatim)\}.*?\\end\{\1\}", re.DOTALL
+)
+_VERBATIM_MARKERS = ("\\begin{lstlisting}", "\\begin{verbatim}", "\\begin{Verbatim}", "\\verb", "\\lstinline")
+
+
+def _macro_suffix(n):
+    """0 -> A, 25 -> Z, 26 -> AA (Makronamen dürfen keine Ziffern enthalten)."""
+    letters = ""
+    n += 1
+    while n:
+        n, rest = divmod(n - 1, 26)
+        letters = chr(ord("A") + rest) + letters
+    return letters
+
+
+def _round_number(value, precision):
+    try:
+        number = float(value)
+    except ValueError:
+        return value.strip()
+    text = f"{number:.{precision}f}".rstrip("0").rstrip(".")
+    return text if text not in ("", "-0") else "0"
+
+
+def _balanced(content):
+    """Geschweifte Klammern (ohne \\{ \\}) ausgeglichen und kein rohes # -> als Argument nutzbar."""
+    depth = 0
+    escaped = False
+    for char in content:
+        if escaped:
+            escaped = False
+            continue
+        if char == "\\":
+            escaped = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth < 0:
+                return False
+        elif char == "#":
+            return False
+    return depth == 0
+
+
+def _compact_call(match, precision):
+    """Ein textblock als \\pptxtb-Aufruf oder None, wenn er nicht in ein Makro passt."""
+    content = match.group("content")
+    if any(marker in content for marker in _VERBATIM_MARKERS):
+        return None
+    if "\\begin{minipage}" in content or "\\begin{textblock}" in content or not _balanced(content):
+        return None
+    args = [_round_number(match.group(k), precision) for k in ("w", "x", "y")]
+    args += [match.group("align"), _round_number(match.group("h"), precision)]
+    body = textwrap.dedent(content.strip("\n")).strip()
+    arguments = "".join(f"{{{arg}}}" for arg in args)
+    return f"\\{TEXTBLOCK_MACRO}{arguments}{{\n{body}\n}}"
+
+
+def hoist_layout_macros(body, min_repeats=3, precision=4):
+    """
+    -> (macros, body, stats). `macros` gehört in die Preamble
+    (generate_latex_preamble(..., extra_macros=macros)), `body` ersetzt den
+    Dokumentinhalt. Ohne passende Blöcke ist `macros` leer und `body` unverändert.
+    """
+    verbatim_spans = [m.span() for m in _VERBATIM_PATTERN.finditer(body)]
+
+    def inside_verbatim(start, end):
+        return any(v_start < end and start < v_end for v_start, v_end in verbatim_spans)
+
+    # 1. Container -> \pptxtb-Aufrufe
+    pieces, calls, pos, skipped = [], [], 0, 0
+    for match in _TEXTBLOCK_PATTERN.finditer(body):
+        call = None if inside_verbatim(*match.span()) else _compact_call(match, precision)
+        if call is None:
+            skipped += 1
+            continue
+        pieces.append(body[pos:match.start()])
+        pieces.append(len(calls))
+        calls.append(call)
+        pos = match.end()
+    pieces.append(body[pos:])
+
+    stats = {"textblocks": len(calls), "skipped": skipped, "repeated": 0, "repeat_macros": 0,
+             "bytes_before": len(body.encode("utf-8"))}
+    if not calls:
+        stats["bytes_after"] = stats["bytes_before"]
+        return "", body, stats
+
+    # 2. Wiederkehrende Blöcke einmal als eigenes Makro
+    names = {}
+    for call, count in Counter(calls).most_common():
+        if count < min_repeats:
+            break
+        names[call] = f"{REPEAT_MACRO_PREFIX}{_macro_suffix(len(names))}"
+        stats["repeated"] += count
+
+    definitions = [TEXTBLOCK_MACRO_DEFINITION]
+    definitions += [f"\\newcommand{{\\{name}}}{{{call}}}" for call, name in names.items()]
+    new_body = "".join(
+        piece if isinstance(piece, str) else (f"\\{names[calls[piece]]}" if calls[piece] in names else calls[piece])
+        for piece in pieces
+    )
+
+    macros = "\n".join(definitions)
+    stats["repeat_macros"] = len(names)
+    stats["bytes_after"] = len(new_body.encode("utf-8")) + len(macros.encode("utf-8"))
+    return macros, new_body, stats
+
+
+def print_hoisting_summary(stats):
+    print(f"Macro hoisting: {stats['textblocks']} textblocks -> \\{TEXTBLOCK_MACRO}, "
+          f"{stats['repeated']} repeated blocks -> {stats['repeat_macros']} macros, "
+          f"{stats['skipped']} verbatim/irregular blocks kept; "
+          f"{stats['bytes_before'] / 1024:.1f} KB -> {stats['bytes_after'] / 1024:.1f} KB")
@@ -0,0 +1,302 @@
+import hashlib
+import re
+import textwrap
+import threading
+
+from converters.JSON_into_LaTeX_renderer import (
+    escape_latex,
+    get_element_alignment,
+    render_element_content,
+    render_textblock,
+)
+
+# Layout-Cluster: Slides mit gleicher Layout-Signatur (Elementtypen + auf ein
+# Raster gerundete Geometrie) teilen sich ein LaTeX-Skelett. Die erste Slide
+# eines Clusters geht ans LLM; aus ihrem Frame wird pro Element der
+# textblock/minipage-Rahmen samt Formatierung um den Inhalt herum gelernt.
+# Die übrigen Slides des Clusters werden lokal mit ihrem eigenen Inhalt
+# gefüllt. Tabellen und Codeblöcke werden nie geclustert.
+
+CLUSTERABLE_TYPES = ("text", "list", "header", "footer", "picture")
+DEFAULT_QUANTUM = 0.05
+
+_TEXTBLOCK_PATTERN = re.compile(
+    r"\\begin\{textblock\}\{([^}]*)\}\s*\(([^)]*)\)(.*?)\\end\{textblock\}", re.DOTALL
+)
+_MINIPAGE_PATTERN = re.compile(
+    r"\\begin\{minipage\}((?:\[[^\]]*\])*)\{[^}]*\}(.*)\\end\{minipage\}", re.DOTALL
+)
+_ITEMIZE_PATTERN = re.compile(r"\\begin\{itemize\}.*?\\end\{itemize\}", re.DOTALL)
+_COMMENT_LINE_PATTERN = re.compile(r"^[ \t]*%.*\n?", re.MULTILINE)
+_NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+_MATCH_TOLERANCE = 0.05
+
+
+def _quantize(value, quantum):
+    return round(float(value or 0) / quantum)
+
+
+def _sorted_elements(slide, quantum=DEFAULT_QUANTUM):
+    """Elemente in stabiler Lesereihenfolge (oben links zuerst, auf dem Raster)."""
+    def key(indexed):
+        i, el = indexed
+        geo = el.get("geometry") or {}
+        return _quantize(geo.get("y"), quantum), _quantize(geo.get("x"), quantum), i
+    return [el for _, el in sorted(enumerate(slide.get("elements", [])), key=key)]
+
+
+def layout_signature(slide, quantum=DEFAULT_QUANTUM):
+    """
+    Signatur einer gruppierten Slide (Ausgabe von utils.enrich_and_group_slides)
+    oder None, wenn die Slide nicht clusterbar ist.
+    """
+    signature = []
+    for el in _sorted_elements(slide, quantum):
+        el_type = el.get("type")
+        if el_type not in CLUSTERABLE_TYPES:
+            return None
+        geo = el.get("geometry") or {}
+        signature.append((
+            el_type,
+            el.get("label"),
+            el.get("fontsize"),
+            get_element_alignment(el),
+            tuple(_quantize(geo.get(k), quantum) for k in ("x", "y", "w", "h")),
+        ))
+    return tuple(signature) or None
+
+
+def signature_id(signature):
+    return hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:8]
+
+
+# --- Skelett aus einem Frame lernen ---
+
+def _parse_textblocks(frame):
+    """[(start, end, x, y, align, inner)] aller textblocks eines Frames."""
+    blocks = []
+    for match in _TEXTBLOCK_PATTERN.finditer(frame):
+        coords = _NUMBER_PATTERN.findall(match.group(2))
+        if len(coords) < 2:
+            return None
+        body = match.group(3)
+        minipage = _MINIPAGE_PATTERN.search(body)
+        align, inner = None, body
+        if minipage:
+            options = re.findall(r"\[([^\]]*)\]", minipage.group(1))
+            align = options[0] if options else None
+            inner = minipage.group(2)
+        inner = textwrap.dedent(inner.strip("\n")).strip()
+        blocks.append((match.start(), match.end(), float(coords[0]), float(coords[1]), align, inner))
+    return blocks
+
+
+def _find(inner, needle):
+    """Position von `needle` in `inner`; Whitespace (Einrückung, Umbrüche) ist egal."""
+    tokens = needle.split()
+    if not tokens:
+        return None
+    match = re.search(r"\s+".join(re.escape(t) for t in tokens), inner)
+    return match.span() if match else None
+
+
+def _content_slot(el, inner):
+    """
+    Sucht den Inhalt des Elements im inneren LaTeX. -> (prefix, mode, suffix)
+    oder None. `mode` bestimmt, wie der Inhalt später gefüllt wird.
+    """
+    el_type = el.get("type")
+    if el_type == "picture":
+        needles = [("path", el.get("image_path", ""))]
+    elif el_type == "list":
+        itemize = _ITEMIZE_PATTERN.search(inner)
+        if itemize:
+            return inner[:itemize.start()], "itemize", inner[itemize.end():]
+        needles = [("content", render_element_content(el))]
+    else:
+        text = el.get("text", "")
+        needles = [
+            ("content", render_element_content(el)),
+            ("text", escape_latex(text).replace("\n", " \\\\\n")),
+            ("text", escape_latex(text)),
+        ]
+    for mode, needle in needles:
+        span = _find(inner, needle or "")
+        if span is not None:
+            return inner[:span[0]], mode, inner[span[1]:]
+    return None
+
+
+def _element_texts(el):
+    if el.get("type") == "list":
+        return [it for it in el.get("items", []) if isinstance(it, str)]
+    if el.get("type") == "picture":
+        return [el.get("image_path", "")]
+    return (el.get("text") or "").split("\n")
+
+
+def learn_skeleton(slide, frame):
+    """
+    Skelett aus dem LLM-Frame einer Slide:
+    {"segments": [...], "slots": [{"element", "align", "prefix", "mode", "suffix"}]}
+    mit einem Slot pro textblock (Reihenfolge des Frames, `element` = Index in
+    _sorted_elements). None, wenn sich Frame und Elemente nicht eindeutig
+    zuordnen lassen.
+    """
+    elements = _sorted_elements(slide)
+    blocks = _parse_textblocks(frame)
+    if not blocks or len(blocks) != len(elements):
+        return None
+
+    # Textblock -> Element über die Position (LLM-Reihenfolge kann abweichen);
+    # die Slots bleiben in der Reihenfolge des Frames
+    slots, used = [None] * len(blocks), set()
+    for i, el in enumerate(elements):
+        geo = el.get("geometry") or {}
+        candidates = [
+            (abs(x - geo.get("x", 0)) + abs(y - geo.get("y", 0)), b)
+            for b, (_, _, x, y, _, _) in enumerate(blocks) if b not in used
+        ]
+        if not candidates:
+            return None
+        distance, b = min(candidates)
+        if distance > _MATCH_TOLERANCE:
+            return None
+        used.add(b)
+        slot = _content_slot(el, blocks[b][5])
+        if slot is None:
+            return None
+        prefix, mode, suffix = slot
+        slots[b] = {"element": i, "align": blocks[b][4], "prefix": prefix, "mode": mode, "suffix": suffix}
+
+    # Text zwischen den textblocks ohne Kommentarzeilen (z.B. "% Slide 7")
+    segments, pos = [], 0
+    for start, end, *_ in blocks:
+        segments.append(frame[pos:start])
+        pos = end
+    segments.append(frame[pos:])
+    segments = [_COMMENT_LINE_PATTERN.sub("", segment) for segment in segments]
+
+    # Kein Inhalt der Vorlage darf im Skelett zurückbleiben (z.B. \frametitle)
+    skeleton_text = "".join(segments) + "".join(s["prefix"] + s["suffix"] for s in slots)
+    for el in elements:
+        if el.get("type") in ("header", "footer"):
+            continue
+        for text in _element_texts(el):
+            if len(text.strip()) >= 4 and (text.strip() in skeleton_text or escape_latex(text.strip()) in skeleton_text):
+                return None
+    return {"segments": segments, "slots": slots}
+
+
+def _fill_slot(el, mode):
+    if mode == "path":
+        return el.get("image_path", "")
+    if mode == "itemize":
+        items = [escape_latex(it) for it in el.get("items", []) if isinstance(it, str) and it.strip()]
+        return "\n".join(["\\begin{itemize}"] + [f"  \\item {it}" for it in items] + ["\\end{itemize}"])
+    if mode == "text":
+        return escape_latex(el.get("text", "")).replace("\n", " \\\\\n")
+    return render_element_content(el)
+
+
+def fill_skeleton(skeleton, slide):
+    """Baut den Frame einer Cluster-Slide aus dem Skelett und ihren eigenen Inhalten."""
+    elements = _sorted_elements(slide)
+    segments = skeleton["segments"]
+    parts = [segments[0]]
+    for i, slot in enumerate(skeleton["slots"]):
+        el = elements[slot["element"]]
+        content = f"{slot['prefix']}{_fill_slot(el, slot['mode'])}{slot['suffix']}".strip()
+        align = slot["align"] or get_element_alignment(el)
+        parts.append(render_textblock(el.get("geometry"), align, content))
+        parts.append(segments[i + 1])
+    return "".join(parts)
+
+
+class LayoutClusterIndex:
+    """
+    Signatur -> Cluster (Slide-Indizes in Reihenfolge). Pro Cluster wird ein
+    Vorbild ans LLM geschickt; die restlichen Slides (`followers`) warten auf
+    dessen Skelett. Lässt sich kein Skelett lernen, wird die nächste Slide
+    Vorbild (bis `max_attempts`), danach gehen alle regulär ans LLM.
+    """
+
+    def __init__(self, slides, quantum=DEFAULT_QUANTUM, min_size=2, max_attempts=2, eligible=None):
+        self.slides = slides
+        self.max_attempts = max_attempts
+        self.clusters = {}
+        for i, slide in enumerate(slides):
+            if eligible is not None and i not in eligible:
+                continue
+            signature = layout_signature(slide, quantum)
+            if signature is not None:
+                self.clusters.setdefault(signature, []).append(i)
+        self.clusters = {sig: members for sig, members in self.clusters.items() if len(members) >= min_size}
+        self.cluster_of = {i: sig for sig, members in self.clusters.items() for i in members}
+        self.skeletons = {}
+        self.attempts = {sig: 1 for sig in self.clusters}
+        self.exemplar = {sig: members[0] for sig, members in self.clusters.items()}
+        self.waiting = {sig: list(members[1:]) for sig, members in self.clusters.items()}
+        self.hits = {sig: 0 for sig in self.clusters}
+        self._lock = threading.Lock()
+
+    def followers(self):
+        """Indizes, die zunächst nicht ans LLM gehen."""
+        return {i for waiting in self.waiting.values() for i in waiting}
+
+    def on_generated(self, index, frame, fallback=None):
+        """
+        Frame einer Slide ist fertig. Gibt (filled, release) zurück:
+        filled = {index: frame} lokal gefüllter Cluster-Slides,
+        release = Indizes, die jetzt doch ans LLM müssen.
+        """
+        with self._lock:
+            signature = self.cluster_of.get(index)
+            if signature is None or self.exemplar.get(signature) != index:
+                return {}, []
+            skeleton = None if fallback else learn_skeleton(self.slides[index], frame)
+            waiting = self.waiting[signature]
+            if skeleton is None:
+                if waiting and self.attempts[signature] < self.max_attempts:
+                    # Nächste Slide als neues Vorbild versuchen
+                    self.attempts[signature] += 1
+                    self.exemplar[signature] = waiting.pop(0)
+                    return {}, [self.exemplar[signature]]
+                self.waiting[signature] = []
+                return {}, waiting
+            self.skeletons[signature] = skeleton
+            self.waiting[signature] = []
+
+        filled = {}
+        for i in waiting:
+            filled[i] = fill_skeleton(skeleton, self.slides[i])
+        with self._lock:
+            self.hits[signature] += len(filled)
+        return filled, []
+
+    def print_summary(self):
+        if not self.clusters:
+            print("Layout clusters: none (no repeated layouts)")
+            return
+        members = sum(len(m) for m in self.clusters.values())
+        hits = sum(self.hits.values())
+        print(f"Layout clusters: {len(self.clusters)} clusters, {members} slides, "
+              f"{hits} filled from skeletons ({hits / members:.0%} hit rate)")
+        for signature, cluster in sorted(self.clusters.items(), key=lambda kv: -len(kv[1])):
+            types = "+".join(entry[0] for entry in signature)
+            learned = "skeleton" if signature in self.skeletons else "no skeleton"
+            print(f"   -> {signature_id(signature)} [{types}]: {len(cluster)} slides, "
+                  f"{self.hits[signature]} hits ({self.hits[signature] / len(cluster):.0%}), {learned}")
+
+
+def get_layout_cluster_index(slides, config, eligible=None):
+    """LayoutClusterIndex nach Config oder None (aus bzw. ohne LLM nicht sinnvoll)."""
+    if not getattr(config, 'LAYOUT_CLUSTERING', False) or not getattr(config, 'AGENT_ENABLED', True):
+        return None
+    return LayoutClusterIndex(
+        slides,
+        quantum=getattr(config, 'LAYOUT_QUANTUM', DEFAULT_QUANTUM),
+        min_size=getattr(config, 'LAYOUT_CLUSTER_MIN_SIZE', 2),
+        max_attempts=getattr(config, 'LAYOUT_SKELETON_MAX_ATTEMPTS', 2),
+        eligible=eligible,
+    )
@@ -0,0 +1,370 @@
+import random
+import threading
+import time
+from collections import Counter
+
+import httpx
+import ollama
+
+from utils import YELLOW, RED, RESET
+
+
+class LLMUnavailableError(Exception):
+    """Ollama ist (vorübergehend) nicht nutzbar -> deterministischer Fallback."""
+
+
+class CircuitBreaker:
+    """
+    Klassischer Circuit Breaker:
+    - closed:    Requests laufen normal.
+    - open:      Nach `failure_threshold` Fehlern in Folge wird sofort abgelehnt.
+    - half_open: Nach `reset_timeout` Sekunden darf ein Probe-Request durch.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            if self.state == "half_open":
+                # Nur ein Probe-Request; alle anderen warten auf dessen Ergebnis
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self.state = "closed"
+
+    def half_open(self):
+        """Host antwortet wieder: den nächsten Request als Probe zulassen, ohne Reset-Timeout."""
+        with self._lock:
+            if self.state == "open":
+                self.state = "half_open"
+                self._probe_in_flight = False
+
+    def release_probe(self):
+        """Probe ohne Aussage über den Host beendet (z.B. nicht wiederholbarer Fehler)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"{RED}LLM circuit breaker OPEN after {self._failures} failures.{RESET}")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def is_retryable_error(error):
+    """Timeouts, Verbindungsfehler und 5xx/429 lohnen einen neuen Versuch."""
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500 or error.status_code == 429
+    return False
+
+
+class LLMClient:
+    """
+    Robuster Wrapper um ollama.Client.
+    Der darunterliegende httpx.Client hält einen Keep-Alive-Connection-Pool,
+    daher wird pro Host genau eine Instanz wiederverwendet (get_llm_pool).
+    """
+
+    def __init__(self, host=None, timeout=120.0, max_retries=3,
+                 backoff_base=1.0, backoff_max=20.0, breaker=None, keep_alive=None):
+        self.host = host
+        self.keep_alive = keep_alive    # z.B. "30m": Modell bleibt zwischen den Requests geladen
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = Counter()
+        self._metrics_lock = threading.Lock()
+        self._client = ollama.Client(
+            host=host,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=16),
+        )
+
+    def count(self, key, n=1):
+        with self._metrics_lock:
+            self.metrics[key] += n
+
+    def ping(self):
+        """Leichter Health-Check (listet die installierten Modelle)."""
+        return self._client.list()
+
+    def warm_up(self, model, messages=None):
+        """
+        Lädt `model` (mit keep_alive) und lässt optional `messages` einlesen,
+        ohne eine Antwort zu generieren (num_predict=1). Kein Retry und kein
+        Circuit Breaker: schlägt das Vorwärmen fehl, zahlt der erste echte
+        Request die Ladezeit wie bisher.
+        """
+        self.count("warmups")
+        kwargs = {"keep_alive": self.keep_alive} if self.keep_alive is not None else {}
+        self._client.chat(model=model, messages=messages or [], options={"num_predict": 1}, **kwargs)
+
+    def _backoff(self, attempt):
+        """Exponential Backoff mit "Full Jitter"."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        time.sleep(delay)
+
+    def chat(self, model, messages, consumer=None, **kwargs):
+        """
+        Führt ollama.chat mit Timeout, Retries und Circuit Breaker aus.
+        Ohne `consumer` wird der Antworttext zurückgegeben. Mit `consumer`
+        wird gestreamt und consumer(stream) innerhalb der Retry-Schleife
+        aufgerufen (Timeouts mitten im Stream werden so ebenfalls wiederholt).
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow_request():
+                self.count("short_circuited")
+                raise LLMUnavailableError(f"Circuit open for Ollama host {self.host or 'default'}")
+
+            if attempt > 0:
+                self.count("retries")
+                self._backoff(attempt - 1)
+
+            self.count("requests")
+            if self.keep_alive is not None:
+                kwargs.setdefault("keep_alive", self.keep_alive)
+            try:
+                if consumer is not None:
+                    stream = self._client.chat(model=model, messages=messages, stream=True, **kwargs)
+                    result = consumer(stream)
+                else:
+                    response = self._client.chat(model=model, messages=messages, **kwargs)
+                    result = response['message']['content']
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                last_error = e
+                if isinstance(e, httpx.TimeoutException):
+                    self.count("timeouts")
+                if not is_retryable_error(e):
+                    self.count("failures")
+                    self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                print(f"{YELLOW}LLM request failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}{RESET}")
+
+        self.count("failures")
+        raise LLMUnavailableError(f"Ollama request failed after {self.max_retries + 1} attempts: {last_error}") from last_error
+
+
+class LLMEndpoint:
+    """Ein Ollama-Host im Pool inkl. Standardmodell und Zählern."""
+
+    def __init__(self, client, model, max_concurrency=1):
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.healthy = True
+        self.dispatched = 0
+
+    @property
+    def name(self):
+        return self.client.host or "default"
+
+
+class LLMPool:
+    """
+    Verteilt Requests auf mehrere Ollama-Hosts (Least-Outstanding-Requests).
+    Fällt ein Host aus (Retries erschöpft / Breaker offen), wird er als
+    ungesund markiert und der Request auf einem anderen Host wiederholt.
+    Ein Hintergrund-Thread prüft ungesunde Hosts regelmäßig und nimmt sie
+    wieder auf, sobald sie antworten.
+    """
+
+    def __init__(self, endpoints, health_check_interval=30.0):
+        self.endpoints = endpoints
+        self.health_check_interval = health_check_interval
+        self.metrics = Counter()
+        self.warmed = set()             # (host, model), bereits vorgewärmt oder in Arbeit (llm_warmup)
+        self._lock = threading.Lock()
+        self._health_thread = None
+
+    @property
+    def capacity(self):
+        return sum(ep.max_concurrency for ep in self.endpoints)
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.metrics[key] += n
+
+    def claim_warmup(self, pairs):
+        """Übernimmt die noch nicht vorgewärmten (endpoint, model)-Paare."""
+        with self._lock:
+            fresh = [(ep, model) for ep, model in pairs if (ep.name, model) not in self.warmed]
+            self.warmed.update((ep.name, model) for ep, model in fresh)
+        return fresh
+
+    def release_warmup(self, ep, model):
+        """Vorwärmen fehlgeschlagen -> beim nächsten Lauf erneut versuchen."""
+        with self._lock:
+            self.warmed.discard((ep.name, model))
+
+    def _acquire(self, exclude):
+        with self._lock:
+            candidates = [ep for ep in self.endpoints if ep.healthy and ep not in exclude]
+            if not candidates:
+                return None
+            # Auslastung relativ zur Kapazität des Hosts
+            ep = min(candidates, key=lambda e: e.outstanding / e.max_concurrency)
+            ep.outstanding += 1
+            ep.dispatched += 1
+            return ep
+
+    def _release(self, ep):
+        with self._lock:
+            ep.outstanding -= 1
+
+    def chat(self, messages, model=None, consumer=None, **kwargs):
+        """Wie LLMClient.chat; `model=None` nutzt das Standardmodell des Hosts."""
+        self._ensure_health_thread()
+        tried = set()
+        while True:
+            ep = self._acquire(tried)
+            if ep is None:
+                raise LLMUnavailableError("No healthy Ollama host available")
+            try:
+                return ep.client.chat(model or ep.model, messages, consumer=consumer, **kwargs)
+            except LLMUnavailableError as e:
+                if len(self.endpoints) == 1:
+                    raise
+                tried.add(ep)
+                self.mark_unhealthy(ep, e)
+                self.count("reassigned")
+            finally:
+                self._release(ep)
+
+    def mark_unhealthy(self, ep, reason):
+        with self._lock:
+            was_healthy = ep.healthy
+            ep.healthy = False
+        if was_healthy:
+            print(f"{YELLOW}Ollama host {ep.name} marked unhealthy: {reason}{RESET}")
+
+    def check_health(self):
+        """Pingt alle Hosts (GET /api/tags) und aktualisiert den Status."""
+        for ep in self.endpoints:
+            try:
+                ep.client.ping()
+                with self._lock:
+                    was_healthy = ep.healthy
+                    ep.healthy = True
+                    # Sonst würde _acquire den Host sofort wieder am offenen Breaker scheitern lassen
+                    ep.client.breaker.half_open()
+                if not was_healthy:
+                    print(f"{YELLOW}Ollama host {ep.name} is healthy again.{RESET}")
+            except Exception as e:
+                self.mark_unhealthy(ep, e)
+
+    def _ensure_health_thread(self):
+        if self._health_thread is not None or len(self.endpoints) < 2:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+                self._health_thread.start()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_check_interval)
+            self.check_health()
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+def get_endpoint_specs(config):
+    """
+    OLLAMA_HOSTS: Liste von {"host", "model", "max_concurrency"}.
+    Ohne Liste: ein einzelner Host (OLLAMA_HOST) mit AGENT_LLM_MODEL.
+    """
+    hosts = getattr(config, 'OLLAMA_HOSTS', None) or [{}]
+    specs = []
+    for entry in hosts:
+        specs.append((
+            entry.get("host", getattr(config, 'OLLAMA_HOST', None)),
+            entry.get("model", config.AGENT_LLM_MODEL),
+            entry.get("max_concurrency", 1),
+        ))
+    return tuple(specs)
+
+def get_llm_pool(config):
+    """Liefert den (gecachten) Pool für die in der Config gesetzten Hosts."""
+    specs = get_endpoint_specs(config)
+    with _POOLS_LOCK:
+        if specs not in _POOLS:
+            endpoints = []
+            for host, model, max_concurrency in specs:
+                client = LLMClient(
+                    host=host,
+                    timeout=getattr(config, 'AGENT_REQUEST_TIMEOUT', 120.0),
+                    max_retries=getattr(config, 'AGENT_MAX_RETRIES', 3),
+                    backoff_base=getattr(config, 'AGENT_BACKOFF_BASE', 1.0),
+                    backoff_max=getattr(config, 'AGENT_BACKOFF_MAX', 20.0),
+                    breaker=CircuitBreaker(
+                        failure_threshold=getattr(config, 'AGENT_BREAKER_THRESHOLD', 3),
+                        reset_timeout=getattr(config, 'AGENT_BREAKER_RESET', 60.0),
+                    ),
+                    keep_alive=getattr(config, 'AGENT_KEEP_ALIVE', None),
+                )
+                endpoints.append(LLMEndpoint(client, model, max_concurrency))
+            _POOLS[specs] = LLMPool(
+                endpoints,
+                health_check_interval=getattr(config, 'AGENT_HEALTH_CHECK_INTERVAL', 30.0),
+            )
+        return _POOLS[specs]
+
+
+def llm_metrics_snapshot(config):
+    """Aktueller Zählerstand des (prozessweit geteilten) Pools: (Counter, {host: dispatched})."""
+    pool = get_llm_pool(config)
+    m = Counter(pool.metrics)
+    for ep in pool.endpoints:
+        m.update(ep.client.metrics)
+    return m, {ep.name: ep.dispatched for ep in pool.endpoints}
+
+
+def print_llm_metrics(config, since=None):
+    """
+    Gibt die Zähler aus; mit `since` (llm_metrics_snapshot vom Laufbeginn)
+    nur die Differenz, damit sich mehrere Läufe im selben Prozess nicht addieren.
+    """
+    pool = get_llm_pool(config)
+    m, dispatched = llm_metrics_snapshot(config)
+    if since is not None:
+        m.subtract(since[0])
+        dispatched = {name: n - since[1].get(name, 0) for name, n in dispatched.items()}
+    print(
+        f"LLM metrics: {m['requests']} requests, {m['retries']} retries, "
+        f"{m['timeouts']} timeouts, {m['failures']} failures, "
+        f"{m['short_circuited']} short-circuited, {m['reassigned']} reassigned, "
+        f"{m['fallbacks']} fallbacks, ~{m['output_chars'] // 4} output tokens"
+    )
+    for ep in pool.endpoints:
+        status = "healthy" if ep.healthy else "unhealthy"
+        print(f"   -> {ep.name} ({ep.model}): {dispatched[ep.name]} dispatched, {status}, breaker {ep.client.breaker.state}")
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from converters.llm_client import get_llm_pool
+from utils import GREEN, YELLOW, RESET
+
+# Modell-Warm-up: Sobald der Lauf startet, lädt ein Hintergrund-Thread die
+# Modelle aller Hosts (keep_alive hält sie geladen) und lässt den statischen
+# Prompt-Anfang (Regeln) einlesen. Das Laden überlappt so mit Docling,
+# Medien und Aufbereitung, statt erst beim ersten Slide-Request anzufallen.
+
+
+class ModelWarmup:
+
+    def __init__(self, pool, models, messages=None):
+        self.pool = pool
+        self.models = models            # [(endpoint, model)]
+        self.messages = messages
+        self.results = {}               # (host, model) -> Sekunden oder Exception
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        # Pro Host parallel, auf einem Host nacheinander (dort teilen sich die Modelle den Speicher)
+        by_endpoint = {}
+        for ep, model in self.models:
+            by_endpoint.setdefault(ep, []).append(model)
+        threads = [threading.Thread(target=self._warm_endpoint, args=(ep, models), daemon=True)
+                   for ep, models in by_endpoint.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.finished_at = time.perf_counter()
+
+    def _warm_endpoint(self, ep, models):
+        for model in models:
+            start = time.perf_counter()
+            try:
+                ep.client.warm_up(model, self.messages)
+                self.results[(ep.name, model)] = time.perf_counter() - start
+            except Exception as e:
+                self.results[(ep.name, model)] = e
+                self.pool.release_warmup(ep, model)
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    def print_summary(self):
+        if not self.done:
+            print(f"{YELLOW}Model warm-up still running "
+                  f"({time.perf_counter() - self.started_at:.1f}s) -> first requests wait for the model load.{RESET}")
+            return
+        for (host, model), result in self.results.items():
+            if isinstance(result, Exception):
+                print(f"{YELLOW}Model warm-up failed for {model} on {host}: {result}{RESET}")
+            else:
+                print(f"{GREEN}Model warm-up: {model} on {host} ready after {result:.1f}s{RESET}")
+        idle = time.perf_counter() - self.finished_at
+        print(f"   -> finished {idle:.1f}s before generation started")
+
+
+def warmup_models(config, pool):
+    """Standardmodell jedes Hosts, dazu das kleine Router-Modell (falls gesetzt)."""
+    small_model = getattr(config, 'AGENT_SMALL_LLM_MODEL', None)
+    models = []
+    for ep in pool.endpoints:
+        models.append((ep, ep.model))
+        if small_model and getattr(config, 'ROUTER_ENABLED', False) and small_model != ep.model:
+            models.append((ep, small_model))
+    return models
+
+
+def start_model_warmup(config):
+    """
+    Startet das Vorwärmen im Hintergrund; None, wenn aus, kein LLM im Spiel
+    ist oder alle Modelle des (prozessweit geteilten) Pools schon vorgewärmt
+    wurden (wiederholte api.convert()-Aufrufe).
+    """
+    if not getattr(config, 'AGENT_WARMUP', True) or not getattr(config, 'AGENT_ENABLED', True):
+        return None
+    from converters.JSON_into_LaTeX_agent import prompt_prefix_messages
+    pool = get_llm_pool(config)
+    models = pool.claim_warmup(warmup_models(config, pool))
+    if not models:
+        return None
+    messages = prompt_prefix_messages(config) if getattr(config, 'AGENT_WARMUP_PREFIX', True) else None
+    return ModelWarmup(pool, models, messages).start()
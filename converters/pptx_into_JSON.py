@@ -1,41 +1,233 @@
-import json
+import asyncio
+import io
+import os
+import re
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from docling.document_converter import DocumentConverter
 
-async def convert_pptx_to_json(pptx_path: str, output_dir: str):
+# "full": Docling-Defaults (alle Formate, Markdown-Export, Bilder im JSON)
+# "fast": nur PPTX, keine Enrichment-Modelle, kein Markdown, keine Base64-Bilder
+DOCLING_PROFILES = ("fast", "full")
+
+def get_docling_profile(config=None):
+    profile = getattr(config, 'DOCLING_PROFILE', "full") if config is not None else "full"
+    if profile not in DOCLING_PROFILES:
+        raise ValueError(f"Unknown DOCLING_PROFILE '{profile}' (expected one of {DOCLING_PROFILES})")
+    return profile
+
+def get_docling_options(config=None):
+    """Optionen, die das Docling-Ergebnis beeinflussen (Teil des Cache-Keys)."""
+    return {"converter": "DocumentConverter", "profile": get_docling_profile(config)}
+
+def build_document_converter(profile="full"):
+    """
+    Baut den DocumentConverter für das gewünschte Profil.
+    PPTX läuft in Docling über die SimplePipeline (kein OCR, kein Layout-Modell);
+    das "fast"-Profil legt das explizit fest und schaltet alle optionalen
+    Picture-Enrichments ab.
+    """
+    # Lazy Import: Docling ist schwer und wird bei Cache-Treffern nicht gebraucht
+    from docling.document_converter import DocumentConverter
+    if profile == "full":
+        return DocumentConverter()
+
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import PowerpointFormatOption
+    try:
+        from docling.datamodel.pipeline_options import ConvertPipelineOptions as PptxPipelineOptions
+    except ImportError:  # ältere Docling-Versionen
+        from docling.datamodel.pipeline_options import PipelineOptions as PptxPipelineOptions
+
+    pipeline_options = PptxPipelineOptions()
+    for flag in ("do_picture_classification", "do_picture_description",
+                 "do_chart_extraction", "enable_remote_services"):
+        if hasattr(pipeline_options, flag):
+            setattr(pipeline_options, flag, False)
+
+    format_option = PowerpointFormatOption(pipeline_options=pipeline_options)
+    return DocumentConverter(
+        allowed_formats=[InputFormat.PPTX],
+        format_options={InputFormat.PPTX: format_option},
+    )
+
+_THREAD_CONVERTERS = threading.local()
+
+def get_document_converter(profile="full"):
+    """
+    Wiederverwendbarer Converter pro Thread und Profil (der Aufbau ist teuer;
+    ein Converter wird nie von zwei Threads gleichzeitig benutzt).
+    """
+    converters = getattr(_THREAD_CONVERTERS, "by_profile", None)
+    if converters is None:
+        converters = _THREAD_CONVERTERS.by_profile = {}
+    if profile not in converters:
+        converters[profile] = build_document_converter(profile)
+    return converters[profile]
+
+# Docling liest die PPTX über python-pptx, das jeden Zip-Member komplett in
+# den Speicher lädt. Eingebettete Videos/Audios braucht Docling nicht (sie
+# kommen aus media_from_pptx) -> Docling bekommt eine Kopie mit leeren Membern.
+
+@contextmanager
+def lean_docling_input(input_path, work_dir):
+    """Pfad für Docling: Kopie ohne Video/Audio (gleicher Dateiname) oder das Original."""
+    from extracter.shape_scanner import lean_package
+    lean_dir = Path(work_dir) / f".lean-{os.getpid()}-{threading.get_ident()}"
+    lean_dir.mkdir(parents=True, exist_ok=True)
+    lean_path = lean_dir / Path(input_path).name
+    try:
+        yield lean_path if lean_package(input_path, lean_path) is not None else Path(input_path)
+    finally:
+        shutil.rmtree(lean_dir, ignore_errors=True)
+
+def convert_pptx_in_memory(pptx_bytes, filename, profile="full"):
+    """Docling-Konvertierung direkt aus Bytes, ohne Datei (für api.convert)."""
+    from docling.datamodel.base_models import DocumentStream
+    from extracter.shape_scanner import lean_package
+    stream = DocumentStream(name=filename, stream=lean_package(pptx_bytes) or io.BytesIO(pptx_bytes))
+    result = get_document_converter(profile).convert(stream)
+    return document_to_final_data(result.document, filename, profile)
+
+def strip_picture_images(structured_dict):
+    """Entfernt eingebettete Base64-Bilder (die Medien kommen aus media_from_pptx)."""
+    for picture in structured_dict.get("pictures", []):
+        picture.pop("image", None)
+    return structured_dict
+
+def document_to_final_data(document, filename, profile="full"):
+    structured_dict = document.export_to_dict()
+    if profile == "fast":
+        markdown_content = ""
+        structured_dict = strip_picture_images(structured_dict)
+    else:
+        markdown_content = document.export_to_markdown()
+
+    return {
+        "filename": filename,
+        "type": "docling_converted",
+        "profile": profile,
+        "content_markdown": markdown_content,
+        "structure_analysis": structured_dict
+    }
+
+# --- SHARDING (große Decks) ---
+_REF_PATTERN = re.compile(r"^#/([a-z_]+)/(\d+)(.*)$")
+
+def count_pptx_slides(pptx_path):
+    """Zählt die Slides direkt aus ppt/presentation.xml (ohne python-pptx/Docling)."""
+    with zipfile.ZipFile(pptx_path) as zf:
+        presentation_xml = zf.read("ppt/presentation.xml").decode("utf-8", errors="ignore")
+    return len(re.findall(r"<p:sldId\b", presentation_xml))
+
+def get_page_shards(n_slides, shard_size):
+    """[(1, 50), (51, 100), ...] – 1-basiert und inklusiv wie Doclings page_range."""
+    return [(start, min(start + shard_size - 1, n_slides)) for start in range(1, n_slides + 1, shard_size)]
+
+def _convert_shard(pptx_path, page_range, profile):
+    """Läuft in einem eigenen Prozess: konvertiert nur einen Seitenbereich."""
+    converter = build_document_converter(profile)
+    result = converter.convert(Path(pptx_path), page_range=page_range)
+    return document_to_final_data(result.document, Path(pptx_path).name, profile)
+
+def _shift_refs(node, offsets):
+    """Verschiebt alle "#/<collection>/<index>"-Referenzen um den Offset der Collection."""
+    if isinstance(node, dict):
+        shifted = {}
+        for key, value in node.items():
+            if key in ("$ref", "self_ref", "cref") and isinstance(value, str):
+                match = _REF_PATTERN.match(value)
+                if match and match.group(1) in offsets:
+                    collection, index, rest = match.groups()
+                    value = f"#/{collection}/{int(index) + offsets[collection]}{rest}"
+                shifted[key] = value
+            else:
+                shifted[key] = _shift_refs(value, offsets)
+        return shifted
+    if isinstance(node, list):
+        return [_shift_refs(item, offsets) for item in node]
+    return node
+
+def merge_docling_dicts(shard_dicts):
+    """
+    Fügt mehrere export_to_dict()-Strukturen (disjunkte Seitenbereiche, in
+    Reihenfolge) zu einem Dokument zusammen. Item-Listen werden aneinander-
+    gehängt und alle Referenzen neu nummeriert; prov.page_no bleibt absolut.
+    """
+    if not shard_dicts:
+        return {}
+    merged = _shift_refs(shard_dicts[0], {})
+    for shard in shard_dicts[1:]:
+        offsets = {
+            key: len(merged.get(key, []))
+            for key, value in shard.items()
+            if isinstance(value, list)
+        }
+        shard = _shift_refs(shard, offsets)
+        for key, value in shard.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+        for root in ("body", "furniture"):
+            if root in shard:
+                merged.setdefault(root, {"children": []}).setdefault("children", [])
+                merged[root]["children"].extend(shard[root].get("children", []))
+        merged.setdefault("pages", {}).update(shard.get("pages", {}))
+    return merged
+
+async def convert_pptx_sharded(input_path, profile, shard_size, max_workers=None):
+    """Konvertiert Seitenbereiche parallel in einem Prozess-Pool und merged sie."""
+    shards = get_page_shards(count_pptx_slides(input_path), shard_size)
+    print(f"Docling: Converting {len(shards)} page-range shards in parallel...")
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        shard_results = await asyncio.gather(*[
+            loop.run_in_executor(executor, _convert_shard, str(input_path), shard, profile)
+            for shard in shards
+        ])
+
+    final_data = dict(shard_results[0])
+    final_data["content_markdown"] = "\n\n".join(r["content_markdown"] for r in shard_results if r["content_markdown"])
+    final_data["structure_analysis"] = merge_docling_dicts([r["structure_analysis"] for r in shard_results])
+    return final_data
+
+async def convert_pptx_to_json(pptx_path: str, output_dir: str, profile: str = "full",
+                               shard_size: int = 0, max_workers: int = None, artifact_store=None):
     """
     Uses IBM Docling to convert PPTX to a structured representation.
-    Saves the output as a JSON file containing the Markdown representation
-    and structured dictionary for further processing.
+    Saves the output as an artifact (see converters/artifact_store.py) containing
+    the Markdown representation and structured dictionary for further processing.
+    Decks with more than `shard_size` slides are split into page ranges
+    that are converted in parallel processes and merged afterwards.
+    Returns the path of the written artifact.
     """
+    from converters.artifact_store import ArtifactStore
+    if artifact_store is None:
+        artifact_store = ArtifactStore()
     input_path = Path(pptx_path)
     out_path = Path(output_dir)
     out_path.mkdir(parents=True, exist_ok=True)
-    
+
     json_output_path = out_path / (input_path.stem + ".json")
-    
-    print(f"Docling: Parsing {input_path.name} locally...")
+
+    print(f"Docling: Parsing {input_path.name} locally (profile: {profile})...")
 
     try:
-        converter = DocumentConverter()
-        result = converter.convert(input_path)
-        
-        markdown_content = result.document.export_to_markdown()
-        structured_dict = result.document.export_to_dict()
-        
-        final_data = {
-            "filename": input_path.name,
-            "type": "docling_converted",
-            "content_markdown": markdown_content,
-            "structure_analysis": structured_dict
-        }
+        with lean_docling_input(input_path, out_path) as docling_input:
+            if shard_size and count_pptx_slides(docling_input) > shard_size:
+                final_data = await convert_pptx_sharded(docling_input, profile, shard_size, max_workers)
+            else:
+                converter = build_document_converter(profile)
+                result = converter.convert(docling_input)
+                final_data = document_to_final_data(result.document, input_path.name, profile)
 
-        with open(json_output_path, 'w', encoding='utf-8') as f:
-            json.dump(final_data, f, indent=2, ensure_ascii=False)
+        artifact_path = artifact_store.save(json_output_path, final_data)
 
-        print(f"Docling conversion finished: {json_output_path}")
-        return str(json_output_path)
+        print(f"Docling conversion finished: {artifact_path}")
+        return str(artifact_path)
 
     except Exception as e:
         print(f"Docling Error: {e}")
-        raise e
\ No newline at end of file
+        raise e
@@ -1,7 +1,6 @@
 import json
 from extracter.table_from_pptx import _extract_tables_from_docling
 import utils
-from collections import defaultdict
 
 
 def clean_and_map_media_elements(docling_data, media_geometry_map):
@@ -9,7 +8,6 @@ def clean_and_map_media_elements(docling_data, media_geometry_map):
     
     # 1. SETUP
     data_root = utils._get_data_root(docling_data)
-    page_dimensions = utils._get_page_dimensions(data_root)
     
     # 2. GET CONTENT (TEXT + TABLES)
     text_items = utils._get_text_items(data_root)
@@ -18,45 +16,45 @@ def clean_and_map_media_elements(docling_data, media_geometry_map):
     # Merge them!
     all_items = text_items + table_items 
 
-    # 3. ANALYSE & ZONING
-    slides_data = defaultdict(lambda: {"header": [], "title": [], "content": [], "footer": []})
+    # 3. INDEX: Dimensionen + Items pro Seite (einmal aufgebaut)
+    page_index = utils._build_page_index(data_root, all_items)
 
-    for item in all_items:
-        text_content = item.get("text", "").strip()
-        if not text_content: continue
+    # 4. ANALYSE & ZONING (ein linearer Durchlauf über alle Items)
+    slides_data = {page_no: {zone: [] for zone in utils.ZONES} for page_no in page_index}
 
-        page_no, bbox, origin = utils._extract_prov_data(item)
-        page_height = page_dimensions.get(page_no, {}).get("height", 720)
-        
-        # Determine Zone
-        raw_zone = utils._determine_zone(bbox, origin, page_height)
-        
-        # Assign to slide
-        slides_data[page_no][raw_zone].append(text_content)
+    for page_no, page in page_index.items():
+        page_height = page["size"]["height"]
+        zones = slides_data[page_no]
+        for item, bbox, origin in page["items"]:
+            text_content = item.get("text", "").strip()
+            if not text_content: continue
+
+            # Determine Zone
+            raw_zone = utils._determine_zone(bbox, origin, page_height)
+            zones[raw_zone].append(text_content)
 
 
     print("   -> Injecting Image Placeholders...")
     
-    # Wir iterieren durch die Map (Key ist 0-basierter Index)
-    for page_idx, media_list in media_geometry_map.items():
+    # Wir iterieren durch die Map (Key ist 0-basierter Index; aus JSON geladen als String)
+    media_by_page_idx = {int(k): v for k, v in media_geometry_map.items()}
+    for page_idx, media_list in media_by_page_idx.items():
         if not media_list: 
             continue
             
         # KORREKTUR: Docling Seite = Index + 1
         docling_page_num = page_idx + 1
+
+        # Seiten, die Docling nicht kennt (z.B. nur Bilder), werden angelegt statt verworfen
+        zones = slides_data.setdefault(docling_page_num, {zone: [] for zone in utils.ZONES})
             
         for media in media_list:
             filename = media.get("filename")
             if filename:
-                placeholder = f"\n[[BILD_PLATZHALTER: {filename}]]"
-                
-                # Jetzt landet es auf der richtigen Seite
-                # Wir nutzen einen "Default", falls Docling die Seite gar nicht erkannt hat
-                if docling_page_num in slides_data:
-                    slides_data[docling_page_num]["content"].append(placeholder)
+                zones["content"].append(f"\n[[BILD_PLATZHALTER: {filename}]]")
     # -------------------------------------------------------
 
-    return utils._assemble_final_json(slides_data, media_geometry_map)
+    return utils._assemble_final_json(slides_data, media_by_page_idx)
 
 def _recursive_remove_bits(node):
     """
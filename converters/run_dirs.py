@@ -0,0 +1,264 @@
+import os
+import shutil
+import socket
+import threading
+import time
+from pathlib import Path
+
+from utils import YELLOW, RESET
+
+# Run-Ordner unter Results/: 1, 2, 3, ... plus ein Link "latest" auf den
+# neuesten Lauf. Die Vergabe ist atomar (exklusives mkdir), damit parallel
+# gestartete Konvertierungen nie denselben Ordner bekommen.
+
+LATEST_LINK = "latest"
+LATEST_FILE = "LATEST"          # Fallback, wenn keine Symlinks möglich sind (z.B. Windows ohne Rechte)
+TRASH_PREFIX = ".trash-"
+ACTIVE_MARKER = ".active"       # "<pid> <host>" solange ein Lauf in den Ordner schreibt
+MANIFEST_NAME = "run_manifest.json"
+
+
+def _run_index(name):
+    return int(name) if name.isdigit() else None
+
+
+def list_runs(base_dir):
+    """[(index, path)] aller nummerierten Run-Ordner, aufsteigend (ein scandir)."""
+    runs = []
+    try:
+        with os.scandir(base_dir) as entries:
+            for entry in entries:
+                index = _run_index(entry.name)
+                if index is not None and entry.is_dir(follow_symlinks=False):
+                    runs.append((index, Path(entry.path)))
+    except FileNotFoundError:
+        return []
+    runs.sort()
+    return runs
+
+
+def allocate_run_dir(base_dir):
+    """
+    Legt den nächsten freien Run-Ordner an und gibt ihn zurück.
+    Start = höchster vorhandener Index + 1; kollidiert ein paralleler Lauf
+    (FileExistsError beim exklusiven mkdir), wird einfach weitergezählt.
+    """
+    base_dir = Path(base_dir)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    runs = list_runs(base_dir)
+    index = runs[-1][0] + 1 if runs else 1
+    while True:
+        run_dir = base_dir / str(index)
+        try:
+            os.mkdir(run_dir)
+            mark_run_active(run_dir)
+            return run_dir
+        except FileExistsError:
+            index += 1
+
+
+def _newest_run(base_dir, run_dir):
+    """`run_dir` oder ein inzwischen angelegter neuerer Lauf."""
+    index = _run_index(Path(run_dir).name)
+    runs = list_runs(base_dir)
+    if index is None or not runs or runs[-1][0] <= index:
+        return Path(run_dir)
+    return runs[-1][1]
+
+
+def _write_latest(base_dir, run_dir):
+    target = os.path.relpath(run_dir, base_dir)
+    link = base_dir / LATEST_LINK
+    tmp_link = base_dir / f".{LATEST_LINK}.tmp{os.getpid()}.{threading.get_ident()}"
+    try:
+        os.symlink(target, tmp_link, target_is_directory=True)
+        os.replace(tmp_link, link)
+        return link
+    except (OSError, NotImplementedError):
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+    latest_file = base_dir / LATEST_FILE
+    tmp_file = latest_file.with_name(f"{LATEST_FILE}.tmp{os.getpid()}.{threading.get_ident()}")
+    tmp_file.write_text(target + "\n", encoding="utf-8")
+    os.replace(tmp_file, latest_file)
+    return latest_file
+
+
+def update_latest_link(base_dir, run_dir):
+    """
+    Setzt <base_dir>/latest atomar auf den neuesten Lauf (relativer Symlink,
+    per os.replace getauscht). Ohne Symlink-Unterstützung steht der Name des
+    Laufs stattdessen in <base_dir>/LATEST. Ein paralleler Lauf mit höherem
+    Index gewinnt immer: Nach dem Schreiben wird erneut geprüft, ob inzwischen
+    ein neuerer Lauf existiert, und der Link notfalls nachgezogen.
+    """
+    base_dir = Path(base_dir)
+    target = _newest_run(base_dir, run_dir)
+    while True:
+        written = _write_latest(base_dir, target)
+        newest = _newest_run(base_dir, target)
+        if newest == target:
+            return written
+        target = newest
+
+
+def resolve_latest_run(base_dir):
+    """Pfad des neuesten Laufs (über latest bzw. LATEST) oder None."""
+    base_dir = Path(base_dir)
+    link = base_dir / LATEST_LINK
+    if link.is_symlink() and link.exists():
+        return link.resolve()
+    latest_file = base_dir / LATEST_FILE
+    if latest_file.exists():
+        run_dir = base_dir / latest_file.read_text(encoding="utf-8").strip()
+        if run_dir.is_dir():
+            return run_dir
+    runs = list_runs(base_dir)
+    return runs[-1][1] if runs else None
+
+
+def mark_run_active(run_dir):
+    """Markiert den Lauf als in Arbeit (auch beim Fortsetzen mit --resume)."""
+    marker = Path(run_dir) / ACTIVE_MARKER
+    tmp_marker = marker.with_name(f"{ACTIVE_MARKER}.tmp{os.getpid()}")
+    tmp_marker.write_text(f"{os.getpid()} {socket.gethostname()}\n", encoding="utf-8")
+    os.replace(tmp_marker, marker)
+
+
+def clear_run_active(run_dir):
+    (Path(run_dir) / ACTIVE_MARKER).unlink(missing_ok=True)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def run_in_progress(run_dir, grace_seconds=0):
+    """
+    True, solange ein (anderer) Prozess den Lauf noch schreibt: Marker eines
+    lebenden Prozesses (Marker fremder Hosts zählen immer) oder Ordner bzw.
+    Manifest jünger als `grace_seconds` (deckt Läufe ohne Marker ab).
+    """
+    run_dir = Path(run_dir)
+    try:
+        pid, host = (run_dir / ACTIVE_MARKER).read_text(encoding="utf-8").split()
+        if host != socket.gethostname() or _pid_alive(int(pid)):
+            return True
+    except (FileNotFoundError, ValueError):
+        pass
+    if not grace_seconds:
+        return False
+    mtimes = []
+    for path in (run_dir, run_dir / MANIFEST_NAME):
+        try:
+            mtimes.append(path.stat().st_mtime)
+        except FileNotFoundError:
+            continue
+    return bool(mtimes) and time.time() - max(mtimes) < grace_seconds
+
+
+def _dir_size(path):
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        total += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            continue
+    return total
+
+
+class RunRetention:
+    """
+    Aufräumen alter Läufe unter base_dir. Behalten werden höchstens
+    `keep_last` Läufe, zusammen höchstens `max_bytes`, keiner älter als
+    `max_age_days` (jede Grenze None = aus). Der aktuelle Lauf, das Ziel
+    von latest und Läufe, die noch geschrieben werden (run_in_progress,
+    z.B. parallele Worker oder --resume), werden nie gelöscht. Gelöschte Ordner werden erst atomar nach
+    .trash-<name> umbenannt, damit nie ein halb gelöschter Run sichtbar ist.
+    """
+
+    def __init__(self, base_dir, keep_last=20, max_bytes=None, max_age_days=None, grace_seconds=3600):
+        self.base_dir = Path(base_dir)
+        self.grace_seconds = grace_seconds
+        self.keep_last = keep_last
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+
+    def select_victims(self, protect=()):
+        protected = {Path(p).resolve() for p in protect if p is not None}
+        latest = resolve_latest_run(self.base_dir)
+        if latest is not None:
+            protected.add(Path(latest).resolve())
+
+        now = time.time()
+        # Neueste zuerst: die Grenzen werden von vorne aufgefüllt
+        runs = list(reversed(list_runs(self.base_dir)))
+        victims, kept, total = [], 0, 0
+        for _, run_dir in runs:
+            if run_dir.resolve() in protected or run_in_progress(run_dir, self.grace_seconds):
+                kept += 1
+                if self.max_bytes is not None:
+                    total += _dir_size(run_dir)
+                continue
+            too_many = self.keep_last is not None and kept >= self.keep_last
+            too_old = (
+                self.max_age_days is not None
+                and now - run_dir.stat().st_mtime > self.max_age_days * 86400
+            )
+            size = _dir_size(run_dir) if self.max_bytes is not None else 0
+            too_big = self.max_bytes is not None and total + size > self.max_bytes
+            if too_many or too_old or too_big:
+                victims.append(run_dir)
+                continue
+            kept += 1
+            total += size
+        return victims
+
+    def collect(self, protect=()):
+        """Löscht die überzähligen Läufe (plus Reste abgebrochener Läufe). Gibt die Anzahl zurück."""
+        removed = []
+        for run_dir in self.select_victims(protect):
+            trash = run_dir.with_name(f"{TRASH_PREFIX}{run_dir.name}.{os.getpid()}")
+            try:
+                os.rename(run_dir, trash)
+            except OSError:
+                continue    # parallel schon weg oder gerade in Benutzung
+            shutil.rmtree(trash, ignore_errors=True)
+            removed.append(run_dir.name)
+        for leftover in self.base_dir.glob(f"{TRASH_PREFIX}*"):
+            shutil.rmtree(leftover, ignore_errors=True)
+        if removed:
+            print(f"{YELLOW}Results retention: removed {len(removed)} old run(s) "
+                  f"({', '.join(sorted(removed, key=int))}){RESET}")
+        return len(removed)
+
+    def collect_in_background(self, protect=()):
+        """Startet collect() in einem Daemon-Thread (blockiert die Pipeline nicht)."""
+        thread = threading.Thread(target=self.collect, args=(protect,), name="results-gc", daemon=True)
+        thread.start()
+        return thread
+
+
+def get_run_retention(config):
+    """RunRetention aus der Config oder None, wenn das Aufräumen aus ist."""
+    if not getattr(config, 'RESULTS_GC_ENABLED', True):
+        return None
+    return RunRetention(
+        getattr(config, 'BASE_RESULTS_DIR', Path("Results")),
+        keep_last=getattr(config, 'RESULTS_KEEP_LAST', 20),
+        max_bytes=getattr(config, 'RESULTS_MAX_BYTES', None),
+        max_age_days=getattr(config, 'RESULTS_MAX_AGE_DAYS', None),
+        grace_seconds=getattr(config, 'RESULTS_GC_GRACE_SECONDS', 3600),
+    )
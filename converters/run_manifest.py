@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from utils import YELLOW, RESET
+
+# Checkpoints eines Laufs: <run>/run_manifest.json hält den Status jeder Stufe
+# und jedes fertigen Slide-Blocks, die Blöcke selbst liegen als
+# <run>/checkpoints/slide_NNNN.tex daneben. `main.py --resume <run>` liest das
+# Manifest, überspringt fertige Stufen/Slides und macht dort weiter.
+
+MANIFEST_NAME = "run_manifest.json"
+CHECKPOINT_DIR = "checkpoints"
+MANIFEST_VERSION = 1
+STAGES = ("extract", "media", "process", "generate", "compile")
+
+# Einstellungen, die die Artefakte eines Laufs bestimmen -> beim Resume aus dem
+# Manifest übernommen. Modell, Host, Concurrency usw. dürfen sich ändern.
+RESUME_SETTINGS = (
+    "PPTX_INPUT", "TEX_FILENAME", "EXTRACTION_BACKEND", "DOCLING_PROFILE",
+    "ARTIFACT_FORMAT", "SKIP_EXTRACTION", "EXISTING_JSON_PATH", "SKIP_MEDIA",
+    "CODE_HIGHLIGHT",   # Checkpoints enthalten bereits hervorgehobenen Code
+)
+PATH_SETTINGS = ("PPTX_INPUT", "EXISTING_JSON_PATH")
+
+
+def _sha256_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def slide_fingerprint(slide):
+    """Hash der (gruppierten) Slide-Daten: ändert sich die Eingabe, wird neu generiert."""
+    payload = json.dumps(slide, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class RunManifest:
+
+    def __init__(self, run_dir, data):
+        self.run_dir = Path(run_dir)
+        self.path = self.run_dir / MANIFEST_NAME
+        self.data = data
+
+    @classmethod
+    def create(cls, config):
+        settings = {}
+        for key in RESUME_SETTINGS:
+            value = getattr(config, key, None)
+            if key in PATH_SETTINGS and value is not None:
+                # Absolut, damit --resume aus jedem Arbeitsverzeichnis funktioniert
+                value = Path(value).resolve()
+            settings[key] = str(value) if isinstance(value, Path) else value
+        manifest = cls(config.RESULTS_DIR, {
+            "version": MANIFEST_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "cwd": os.getcwd(),
+            "input_sha256": _sha256_file(config.PPTX_INPUT),
+            "settings": settings,
+            "stages": {},
+            "slides": {},
+        })
+        manifest.save()
+        return manifest
+
+    @classmethod
+    def load(cls, run_dir):
+        path = Path(run_dir) / MANIFEST_NAME
+        if not path.exists():
+            raise FileNotFoundError(f"No run manifest in {run_dir} (expected {path})")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported run manifest version: {data.get('version')}")
+        return cls(run_dir, data)
+
+    def save(self):
+        self.data["updated"] = datetime.now().isoformat(timespec="seconds")
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _resolve_path(self, value):
+        """
+        Relative Pfade älterer Manifeste: gegen das aufgezeichnete cwd, ohne
+        dieses gegen das aktuelle cwd oder den Ordner über Results/ (Standard-Layout).
+        """
+        path = Path(value)
+        if path.is_absolute():
+            return path
+        if self.data.get("cwd"):
+            return Path(self.data["cwd"]) / path
+        bases = (Path.cwd(), self.run_dir.resolve().parent.parent)
+        return next((base / path for base in bases if (base / path).exists()), path)
+
+    def apply_settings(self, config):
+        """Übernimmt die Artefakt-relevanten Einstellungen des ursprünglichen Laufs."""
+        for key, value in self.data.get("settings", {}).items():
+            if key in PATH_SETTINGS and value is not None:
+                value = self._resolve_path(value)
+            setattr(config, key, value)
+
+    def input_changed(self, pptx_path):
+        return _sha256_file(pptx_path) != self.data.get("input_sha256")
+
+    # --- Stufen ---
+    def stage_done(self, stage):
+        return self.data["stages"].get(stage, {}).get("done", False)
+
+    def mark_stage(self, stage, seconds=None):
+        self.data["stages"][stage] = {
+            "done": True,
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "seconds": round(seconds, 3) if seconds is not None else None,
+        }
+        self.save()
+
+    def reset_from(self, stage):
+        """Stufe läuft neu -> sie und alle späteren Stufen gelten als offen."""
+        later = STAGES[STAGES.index(stage):]
+        removed = [self.data["stages"].pop(name, None) for name in later]
+        if any(entry is not None for entry in removed):
+            self.save()
+
+    def fallback_count(self):
+        return sum(1 for entry in self.data["slides"].values() if entry.get("fallback"))
+
+    # --- Slides ---
+    def _checkpoint_path(self, index):
+        return self.run_dir / CHECKPOINT_DIR / f"slide_{index:04d}.tex"
+
+    def load_slide_block(self, index, slide):
+        """Gespeicherter Block, wenn die Slide unverändert und ohne Fallback fertig ist, sonst None."""
+        entry = self.data["slides"].get(str(index))
+        if not entry or entry.get("fallback") or entry.get("fingerprint") != slide_fingerprint(slide):
+            return None
+        path = self._checkpoint_path(index)
+        if not path.exists():
+            return None
+        return path.read_text(encoding="utf-8")
+
+    def save_slide_block(self, index, slide, block, fallback=None):
+        """
+        Block atomar ablegen und im Manifest vermerken. Slides, die nur wegen
+        eines nicht erreichbaren LLM deterministisch gerendert wurden
+        (`fallback`), werden beim Resume erneut generiert.
+        """
+        path = self._checkpoint_path(index)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        tmp_path.write_text(block, encoding="utf-8")
+        os.replace(tmp_path, path)
+        self.data["slides"][str(index)] = {
+            "slide_number": slide.get("slide_number", index + 1),
+            "fingerprint": slide_fingerprint(slide),
+            "fallback": str(fallback) if fallback else None,
+            "at": time.time(),
+        }
+        self.save()
+
+    def summary(self):
+        done = [stage for stage in STAGES if self.stage_done(stage)]
+        return (f"stages done: {', '.join(done) or '-'}; slides checkpointed: "
+                f"{len(self.data['slides'])} ({self.fallback_count()} fallback)")
+
+
+def get_run_manifest(config):
+    """Manifest des Laufs: beim Resume laden (und prüfen), sonst neu anlegen. None = aus."""
+    if not getattr(config, 'CHECKPOINTS_ENABLED', True):
+        return None
+    if getattr(config, 'RESUME_DIR', None) is not None:
+        manifest = RunManifest.load(config.RESULTS_DIR)
+        if manifest.input_changed(config.PPTX_INPUT):
+            print(f"{YELLOW}Warning: {config.PPTX_INPUT} changed since the run started -> "
+                  f"all stages are recomputed.{RESET}")
+            manifest.data["stages"] = {}
+            manifest.data["input_sha256"] = _sha256_file(config.PPTX_INPUT)
+            manifest.save()
+        return manifest
+    return RunManifest.create(config)
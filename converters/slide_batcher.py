@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from converters.JSON_into_LaTeX_agent import estimate_slide_tokens, generate_batch_latex
+from converters.llm_client import get_llm_pool
+from converters.slide_router import ROUTE_BATCH, ROUTE_DETERMINISTIC, ROUTE_LARGE, ROUTE_SMALL, route_slide
+
+
+def build_slide_batches(indexed_slides, token_budget, max_slides):
+    """
+    Packt aufeinanderfolgende kleine Slides greedy in Batches,
+    bis das Token-Budget oder die Maximalzahl erreicht ist.
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for i, slide in indexed_slides:
+        tokens = estimate_slide_tokens(slide)
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_slides):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((i, slide))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def generate_batched_latex(slides, config, stats=None, skip=()):
+    """
+    Generiert alle "kleinen" LLM-Slides in Batches.
+    Gibt {slide_index: latex} zurück; Slides, deren Teil der Antwort nicht
+    zerlegt werden konnte, fehlen und werden vom Aufrufer einzeln generiert.
+    Indizes in `skip` (z.B. Layout-Cluster-Slides) werden nicht gebündelt.
+    """
+    budget = getattr(config, 'AGENT_BATCH_TOKEN_BUDGET', 3000)
+    max_slides = getattr(config, 'AGENT_BATCH_MAX_SLIDES', 6)
+
+    # Batches bleiben innerhalb einer Route: kleine Slides gehen ans kleine
+    # Modell (sofern gesetzt), alles andere ans Standardmodell des Hosts
+    small_model = getattr(config, 'AGENT_SMALL_LLM_MODEL', None)
+    candidates = {}
+    for i, slide in enumerate(slides):
+        if i in skip or estimate_slide_tokens(slide) > budget // 2:
+            continue
+        route = route_slide(slide, config)
+        if route == ROUTE_DETERMINISTIC:
+            continue
+        if route == ROUTE_SMALL and not small_model:
+            route = ROUTE_LARGE
+        candidates.setdefault(route, []).append((i, slide))
+
+    batches = [
+        (route, b)
+        for route, group in candidates.items()
+        for b in build_slide_batches(group, budget, max_slides) if len(b) > 1
+    ]
+    if not batches:
+        return {}
+
+    print(f"Batching {sum(len(b) for _, b in batches)} slides into {len(batches)} requests...")
+
+    def run_batch(route_and_batch):
+        route, batch = route_and_batch
+        model = small_model if route == ROUTE_SMALL else None
+        start = time.perf_counter()
+        frames = generate_batch_latex([slide for _, slide in batch], config, model=model)
+        elapsed = time.perf_counter() - start
+        results = {}
+        for i, slide in batch:
+            num = slide.get('slide_number', i + 1)
+            if num in frames:
+                results[i] = frames[num]
+                if stats is not None:
+                    stats.record(ROUTE_BATCH, elapsed / len(batch))
+        missing = len(batch) - len(results)
+        if missing:
+            print(f"   Batch of {len(batch)} slides: {missing} failed to parse -> single requests")
+        return results
+
+    results = {}
+    workers = getattr(config, 'AGENT_CONCURRENCY', None) or get_llm_pool(config).capacity
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for batch_result in executor.map(run_batch, batches):
+            results.update(batch_result)
+    return results
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import defaultdict
+
+from converters.JSON_into_LaTeX_agent import generate_single_slide_latex
+from converters.JSON_into_LaTeX_renderer import render_slide_latex
+from converters.slide_splitter import generate_split_slide_latex, needs_pagination, needs_split
+
+ROUTE_DETERMINISTIC = "deterministic"
+ROUTE_SMALL = "small"
+ROUTE_LARGE = "large"
+ROUTE_BATCH = "batch"
+ROUTE_SKELETON = "skeleton"     # lokal aus dem Skelett eines Layout-Clusters gefüllt
+
+
+def score_slide(slide):
+    """
+    Grobe Komplexität einer (gruppierten) Slide:
+    +1 pro Element, +3 pro Tabelle/Codeblock, +1 pro Liste, +1 pro 200 Zeichen Text.
+    """
+    score = 0.0
+    text_length = 0
+    for el in slide.get("elements", []):
+        score += 1
+        el_type = el.get("type")
+        if el_type in ("table", "codeblock"):
+            score += 3
+        elif el_type == "list":
+            score += 1
+            text_length += sum(len(it) for it in el.get("items", []) if isinstance(it, str))
+        text_length += len(el.get("text", "") or "")
+    return score + text_length / 200
+
+
+def route_slide(slide, config):
+    """Entscheidet anhand des Scores, wer die Slide rendert."""
+    # Ohne LLM (AGENT_ENABLED = False) rendert alles der deterministische Renderer
+    if not getattr(config, 'AGENT_ENABLED', True):
+        return ROUTE_DETERMINISTIC
+    if not getattr(config, 'ROUTER_ENABLED', False):
+        return ROUTE_LARGE
+
+    has_complex = any(el.get("type") in ("table", "codeblock") for el in slide.get("elements", []))
+    score = score_slide(slide)
+
+    if not has_complex and score <= getattr(config, 'ROUTER_DETERMINISTIC_MAX_SCORE', 3):
+        return ROUTE_DETERMINISTIC
+    if not has_complex and score <= getattr(config, 'ROUTER_SMALL_MAX_SCORE', 6):
+        return ROUTE_SMALL
+    return ROUTE_LARGE
+
+
+class RouteStats:
+    """Thread-sichere Zähler und Latenzen pro Route."""
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds):
+        with self._lock:
+            self.counts[route] += 1
+            self.seconds[route] += seconds
+
+    def print_summary(self):
+        print("Routing summary:")
+        for route in (ROUTE_DETERMINISTIC, ROUTE_SMALL, ROUTE_LARGE, ROUTE_BATCH, ROUTE_SKELETON):
+            n = self.counts.get(route, 0)
+            if not n:
+                continue
+            avg = self.seconds[route] / n
+            print(f"   -> {route}: {n} slides, avg {avg:.2f}s, total {self.seconds[route]:.1f}s")
+
+
+def generate_routed_slide_latex(slide, config, stats=None):
+    """Erzeugt den Frame über die passende Route und misst die Dauer."""
+    route = route_slide(slide, config)
+    small_model = getattr(config, 'AGENT_SMALL_LLM_MODEL', None)
+    if route == ROUTE_SMALL and not small_model:
+        route = ROUTE_LARGE
+
+    start = time.perf_counter()
+    if route == ROUTE_DETERMINISTIC:
+        # Ohne LLM nur für die optionale Tabellen-Paginierung
+        if needs_pagination(slide, config):
+            latex_code = generate_split_slide_latex(slide, config, use_llm=False)
+        else:
+            latex_code = render_slide_latex(slide)
+    elif needs_split(slide, config):
+        # Übergroße Slide: Teil-Requests innerhalb des Token-Budgets
+        latex_code = generate_split_slide_latex(slide, config, model=small_model if route == ROUTE_SMALL else None)
+    elif route == ROUTE_SMALL:
+        latex_code = generate_single_slide_latex(slide, config, model=small_model)
+    else:
+        # model=None -> Standardmodell des jeweiligen Hosts
+        latex_code = generate_single_slide_latex(slide, config)
+    elapsed = time.perf_counter() - start
+
+    if stats is not None:
+        stats.record(route, elapsed)
+    print(f"   Slide {slide.get('slide_number', '?')}: route={route} ({elapsed:.2f}s)")
+    return latex_code
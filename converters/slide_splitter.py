@@ -0,0 +1,200 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from converters.JSON_into_LaTeX_agent import (
+    estimate_slide_tokens, generate_single_slide_latex, pop_fallback_reason, set_fallback_reason,
+)
+from converters.JSON_into_LaTeX_renderer import render_element, render_frame
+from converters.llm_client import get_llm_pool
+from extracter.table_from_pptx import table_to_rows
+
+# Übergroße Slides (lange Tabelle, eine Seite Code) würden als ein riesiger
+# Prompt das Kontextfenster sprengen. Sie werden elementweise auf mehrere
+# Requests innerhalb des Token-Budgets verteilt, parallel generiert und
+# wieder zu einem Frame zusammengesetzt (die textblocks sind absolut
+# positioniert, die Reihenfolge der Teile bleibt erhalten). Einzelne Elemente,
+# die allein schon über dem Budget liegen, rendert der deterministische
+# Renderer. Zu lange Tabellen können optional auf Folge-Frames umbrechen.
+
+PART_LLM = "llm"
+PART_LOCAL = "local"
+
+_BRACED = r"\{(?:[^{}]|\{[^{}]*\})*\}"
+# Optionen <...>/[...] und Titel/Untertitel {..} (nur auf der \begin{frame}-Zeile)
+_FRAME_BODY_PATTERN = re.compile(
+    r"\\begin\{frame\}(?:[ \t]*(?:<[^>\n]*>|\[[^\]]*\]|" + _BRACED + r"))*(.*?)\\end\{frame\}", re.DOTALL
+)
+_FRAMETITLE_PATTERN = re.compile(r"\\frame(?:sub)?title(?:<[^>\n]*>)?(?:\[[^\]]*\])?[ \t]*" + _BRACED + r"[ \t]*\n?")
+
+
+def element_tokens(element):
+    return estimate_slide_tokens({"elements": [element]})
+
+
+def _table_rows_count(element):
+    if element.get("table"):
+        return element["table"].get("n_rows", 0)
+    return len(element.get("table_rows") or [])
+
+
+def _oversized_table(element, config):
+    if element.get("type") != "table" or not getattr(config, 'AGENT_PAGINATE_TABLES', False):
+        return False
+    return _table_rows_count(element) > getattr(config, 'AGENT_TABLE_MAX_ROWS', 18)
+
+
+def needs_pagination(slide, config):
+    return any(_oversized_table(el, config) for el in slide.get("elements", []))
+
+
+def needs_split(slide, config):
+    """Slide über dem Token-Budget oder (mit Paginierung) mit einer zu langen Tabelle."""
+    if not getattr(config, 'AGENT_SPLIT_SLIDES', True):
+        return False
+    if needs_pagination(slide, config):
+        return True
+    return estimate_slide_tokens(slide) > getattr(config, 'AGENT_SLIDE_TOKEN_BUDGET', 1500)
+
+
+def _carried_cells(table, start, header_rows):
+    """Ursprungszellen vor `start`, deren Rowspan in Zeile `start` hineinragt."""
+    carried = []
+    for r in range(header_rows, start):
+        for cell in table["rows"][r]:
+            if r + cell["rowspan"] > start:
+                carried.append({**cell, "rowspan": r + cell["rowspan"] - start})
+    return carried
+
+
+def slice_table(table, start, end, header_rows=1):
+    """
+    Zeilen [start, end) der normalisierten Tabelle, bei Folgeseiten mit
+    wiederholtem Kopf. Rowspans werden an der Seitengrenze abgeschnitten;
+    beginnt die Seite mitten in einem Rowspan, wird die Zelle (Text und
+    restlicher Span) in der ersten Zeile der Seite wiederholt.
+    """
+    header = list(range(header_rows)) if start >= header_rows else []
+    picked = header + list(range(start, end))
+    rows = []
+    for position, r in enumerate(picked):
+        limit = len(header) if r < header_rows and start >= header_rows else len(picked)
+        cells = table["rows"][r] + (_carried_cells(table, start, header_rows) if r == start else [])
+        rows.append(sorted(({**cell, "rowspan": min(cell["rowspan"], limit - position)} for cell in cells),
+                           key=lambda cell: cell["col"]))
+    return {**table, "n_rows": len(rows), "rows": rows}
+
+
+def paginate_table(element, max_rows):
+    """Tabellen-Element -> Liste von Seiten-Elementen mit je höchstens `max_rows` Datenzeilen."""
+    table = element.get("table")
+    if table:
+        # Erste Zeile als Kopf wiederholen, sofern sie nicht in die Daten hineinragt
+        header_rows = 1 if all(cell["rowspan"] == 1 for cell in table["rows"][0]) else 0
+        step = max(1, max_rows - header_rows)
+        pages = []
+        for start in range(header_rows, table["n_rows"], step):
+            page = slice_table(table, start, min(start + step, table["n_rows"]), header_rows)
+            pages.append({**element, "table": page, "table_rows": table_to_rows(page)})
+        return pages or [element]
+
+    rows = element.get("table_rows") or []
+    step = max(1, max_rows - 1)
+    return [{**element, "table_rows": rows[:1] + rows[start:start + step]}
+            for start in range(1, len(rows), step)] or [element]
+
+
+def plan_parts(elements, budget):
+    """
+    Greedy in Elementreihenfolge: [(PART_LLM, [indizes]) | (PART_LOCAL, index)].
+    Ein Element, das allein das Budget überschreitet, wird lokal gerendert.
+    """
+    parts, current, current_tokens = [], [], 0
+    for idx, el in enumerate(elements):
+        tokens = element_tokens(el)
+        if tokens > budget:
+            if current:
+                parts.append((PART_LLM, current))
+                current, current_tokens = [], 0
+            parts.append((PART_LOCAL, idx))
+            continue
+        if current and current_tokens + tokens > budget:
+            parts.append((PART_LLM, current))
+            current, current_tokens = [], 0
+        current.append(idx)
+        current_tokens += tokens
+    if current:
+        parts.append((PART_LLM, current))
+    return parts
+
+
+def frame_body(latex):
+    """
+    Inhalt zwischen \\begin{frame} und \\end{frame} ohne Optionen, Titel und
+    \\frametitle (die Teile werden zu einem Frame zusammengesetzt) oder None.
+    """
+    match = _FRAME_BODY_PATTERN.search(latex or "")
+    return _FRAMETITLE_PATTERN.sub("", match.group(1)).strip("\n") if match else None
+
+
+def generate_split_slide_latex(slide, config, model=None, use_llm=True):
+    """
+    Generiert eine übergroße Slide in Teilen und setzt sie zu einem Frame
+    zusammen (plus Folge-Frames für paginierte Tabellen). Fallbacks einzelner
+    Teile werden an den aufrufenden Thread weitergereicht (pop_fallback_reason).
+    """
+    slide_num = slide.get('slide_number', '?')
+    elements = list(slide.get("elements", []))
+
+    # Zu lange Tabellen: erste Seite bleibt auf der Slide, der Rest kommt auf Folge-Frames
+    continuation = []
+    max_rows = getattr(config, 'AGENT_TABLE_MAX_ROWS', 18)
+    for idx, el in enumerate(elements):
+        if _oversized_table(el, config):
+            pages = paginate_table(el, max_rows)
+            elements[idx] = pages[0]
+            continuation += pages[1:]
+
+    budget = getattr(config, 'AGENT_SLIDE_TOKEN_BUDGET', 1500)
+    parts = plan_parts(elements, budget) if use_llm else [(PART_LOCAL, idx) for idx in range(len(elements))]
+    llm_parts = [indices for kind, indices in parts if kind == PART_LLM]
+
+    def run_part(indices):
+        sub_slide = {**slide, "elements": [elements[idx] for idx in indices]}
+        pop_fallback_reason()
+        latex = generate_single_slide_latex(sub_slide, config, model=model)
+        reason = pop_fallback_reason()
+        body = frame_body(latex)
+        if body is None:
+            reason = reason or "sub-request returned no frame"
+            body = "\n".join(render_element(el) for el in sub_slide["elements"])
+        return body, reason
+
+    results = {}
+    if llm_parts:
+        workers = getattr(config, 'AGENT_CONCURRENCY', None) or get_llm_pool(config).capacity
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(llm_parts)))) as executor:
+            for indices, result in zip(llm_parts, executor.map(run_part, llm_parts)):
+                results[indices[0]] = result
+
+    blocks, failed = [], []
+    for kind, value in parts:
+        if kind == PART_LOCAL:
+            blocks.append(render_element(elements[value]))
+            continue
+        body, reason = results[value[0]]
+        blocks.append(body)
+        if reason:
+            failed.append(reason)
+
+    print(f"   Slide {slide_num}: {len(llm_parts)} requests, "
+          f"{len(parts) - len(llm_parts)} elements rendered locally"
+          + (f", {len(continuation)} continuation frames" if continuation else ""))
+    if failed:
+        set_fallback_reason(f"{len(failed)} of {len(llm_parts)} parts fell back ({failed[0]})")
+
+    note = f"split into {len(parts)} parts" if use_llm else "rendered without LLM"
+    frames = [render_frame(slide_num, blocks, note)]
+    for page, el in enumerate(continuation, start=2):
+        frames.append(render_frame(slide_num, [render_element(el)],
+                                   f"table continued, page {page}/{len(continuation) + 1}"))
+    return "\n".join(frames)
@@ -0,0 +1,166 @@
+import json
+
+from converters.JSON_into_LaTeX_renderer import render_element, render_frame
+
+# Strukturierter Modus (AGENT_OUTPUT_MODE = "structured"): Das LLM schreibt
+# kein LaTeX, sondern nur JSON nach LAYOUT_SCHEMA (Ollama `format`, d.h. per
+# Grammatik erzwungen) mit Platzierung, Ausrichtung und Schriftgröße je
+# Element. Der Inhalt bleibt in Python und wird mit dem deterministischen
+# Renderer gesetzt -> kaputte Frames (\paper, /item, ...) sind ausgeschlossen.
+
+FONT_SIZES = ("3pt", "tiny", "scriptsize", "footnotesize", "small", "normalsize", "large", "Large")
+ALIGNMENTS = ("t", "c", "b")
+PREVIEW_CHARS = 120
+MIN_EXTENT = 0.01
+
+STRUCTURED_RULES = """
+You decide the layout of ONE LaTeX Beamer slide. The content is typeset by a program; you only place it.
+For EVERY element of the input return exactly one entry:
+- "id": the element id from the input
+- "x", "y", "w", "h": final box as fractions of the slide (0.0-1.0, origin top-left)
+- "align": vertical alignment inside the box: "t" (top), "c" (center) or "b" (bottom)
+- "fontsize": one of "3pt", "tiny", "scriptsize", "footnotesize", "small", "normalsize", "large", "Large"
+Keep the source geometry unless boxes overlap, leave the slide or the text clearly does not fit.
+Headers and footers keep "3pt". Output only the JSON object.
+"""
+
+
+def layout_schema(n_elements):
+    """JSON-Schema für Ollamas `format`: genau ein Eintrag pro Element."""
+    number = {"type": "number", "minimum": 0, "maximum": 1}
+    return {
+        "type": "object",
+        "properties": {
+            "elements": {
+                "type": "array",
+                "minItems": n_elements,
+                "maxItems": n_elements,
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer", "minimum": 0, "maximum": max(n_elements - 1, 0)},
+                        "x": number, "y": number, "w": number, "h": number,
+                        "align": {"type": "string", "enum": list(ALIGNMENTS)},
+                        "fontsize": {"type": "string", "enum": list(FONT_SIZES)},
+                    },
+                    "required": ["id", "x", "y", "w", "h", "align", "fontsize"],
+                },
+            },
+        },
+        "required": ["elements"],
+    }
+
+
+def _preview(element):
+    """Kurzer Inhaltsauszug: das LLM braucht Länge und Art des Inhalts, nicht den Volltext."""
+    el_type = element.get("type")
+    if el_type == "list":
+        items = [it for it in element.get("items", []) if isinstance(it, str)]
+        text = " | ".join(items)
+        lines = len(items)
+    elif el_type == "table":
+        rows = element.get("table_rows") or []
+        text = " | ".join(" ; ".join(map(str, row)) for row in rows[:3])
+        lines = len(rows)
+    elif el_type == "picture":
+        return {"content": element.get("image_path", ""), "lines": 0, "chars": 0}
+    else:
+        text = element.get("code") or element.get("text", "") or ""
+        lines = text.count("\n") + 1 if text else 0
+    preview = text if len(text) <= PREVIEW_CHARS else text[:PREVIEW_CHARS] + "..."
+    return {"content": preview, "lines": lines, "chars": len(text)}
+
+
+def structured_prompt_elements(slide_data):
+    """Kompakte Element-Beschreibung für den Prompt (id = Index in slide_data["elements"])."""
+    described = []
+    for idx, el in enumerate(slide_data.get("elements", [])):
+        entry = {"id": idx, "type": el.get("type")}
+        for key in ("label", "geometry", "align", "fontsize"):
+            if el.get(key) is not None:
+                entry[key] = el[key]
+        entry.update(_preview(el))
+        described.append(entry)
+    return described
+
+
+STRUCTURED_SYSTEM_PROMPT = (
+    "You are a strictly constrained slide layout engine. "
+    "You do not explain. You only output JSON."
+)
+STRUCTURED_PROMPT_HEAD = f"""
+    {STRUCTURED_RULES}
+    """
+
+
+def structured_prefix_messages():
+    """Statischer Prompt-Anfang (Vorwärmen des Prompt-Caches, siehe llm_warmup.py)."""
+    return [
+        {'role': 'system', 'content': STRUCTURED_SYSTEM_PROMPT},
+        {'role': 'user', 'content': STRUCTURED_PROMPT_HEAD}
+    ]
+
+
+def build_structured_messages(slide_data):
+    slide_num = slide_data.get('slide_number', '?')
+    user_prompt = STRUCTURED_PROMPT_HEAD + f"""INPUT ELEMENTS (Slide {slide_num}):
+    {json.dumps(structured_prompt_elements(slide_data), ensure_ascii=False)}
+    """
+    return [
+        {'role': 'system', 'content': STRUCTURED_SYSTEM_PROMPT},
+        {'role': 'user', 'content': user_prompt}
+    ]
+
+
+def _clamp(value, low=0.0, high=1.0):
+    return min(high, max(low, float(value)))
+
+
+def parse_layout_decisions(content, n_elements):
+    """
+    Antwort -> {element_index: decision}. Werte werden auf die Slide
+    begrenzt, doppelte/unbekannte ids ignoriert. Ohne ein einziges
+    verwertbares Element -> ValueError (Aufrufer nutzt den Fallback).
+    """
+    data = json.loads(content)
+    entries = data.get("elements") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        raise ValueError("structured response has no 'elements' list")
+
+    decisions = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        idx = entry.get("id")
+        if not isinstance(idx, int) or not 0 <= idx < n_elements or idx in decisions:
+            continue
+        try:
+            x, y = _clamp(entry["x"]), _clamp(entry["y"])
+            w = _clamp(entry["w"], MIN_EXTENT, 1.0 - min(x, 1.0 - MIN_EXTENT))
+            h = _clamp(entry["h"], MIN_EXTENT, 1.0 - min(y, 1.0 - MIN_EXTENT))
+        except (KeyError, TypeError, ValueError):
+            continue
+        decisions[idx] = {
+            "geometry": {"x": round(x, 4), "y": round(y, 4), "w": round(w, 4), "h": round(h, 4)},
+            "align": entry.get("align") if entry.get("align") in ALIGNMENTS else None,
+            "fontsize": entry.get("fontsize") if entry.get("fontsize") in FONT_SIZES else None,
+        }
+    if not decisions:
+        raise ValueError("structured response contains no usable element")
+    return decisions
+
+
+def render_structured_frame(slide_data, decisions):
+    """Frame aus den Layout-Entscheidungen; Elemente ohne Entscheidung behalten ihr Layout."""
+    blocks = []
+    for idx, el in enumerate(slide_data.get("elements", [])):
+        decision = decisions.get(idx)
+        if decision is not None:
+            el = {**el, "geometry": decision["geometry"]}
+            # Feste Ausrichtungen (Tabellen, Listen, Bilder, Code, Footer) setzt der Renderer selbst
+            if decision["align"]:
+                el["align"] = decision["align"]
+            if decision["fontsize"]:
+                el["fontsize"] = decision["fontsize"]
+        blocks.append(render_element(el))
+    return render_frame(slide_data.get('slide_number', '?'), blocks, "LLM layout, rendered locally")
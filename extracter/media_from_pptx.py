@@ -1,116 +1,132 @@
 import os
+import shutil
+import subprocess
 from pathlib import Path
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
+from extracter.shape_scanner import MediaRef, StreamedMediaRef, scan_presentation
 
-def extract_media_from_pptx(pptx_path, output_dir):
+STREAMED_KINDS = ("video", "audio")
+
+def extract_media_from_pptx(pptx_path, output_dir, poster_cache_dir=None):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    prs = Presentation(pptx_path)
-    slide_width = prs.slide_width
-    slide_height = prs.slide_height
+    layout_data_by_slide, media_files = collect_media(pptx_path, Path(output_dir).name)
+    entries = {entry["filename"]: entry for entries in layout_data_by_slide.values() for entry in entries}
+    for filename, media in media_files.items():
+        try:
+            # Save File to Disk (Absolute Path from Config)
+            # output_dir comes from config.MEDIA_OUTPUT_DIR
+            target = os.path.join(output_dir, filename)
+            if isinstance(media, StreamedMediaRef):
+                # Video/Audio blockweise aus dem Zip, nie komplett im Speicher
+                media.stream_to(target)
+                if media.kind == "video" and media.poster_part is None:
+                    _attach_ffmpeg_poster(media, target, entries[filename], output_dir, poster_cache_dir)
+            else:
+                with open(target, "wb") as f:
+                    f.write(media.blob)
+        except Exception as e:
+            print(f"      Warning: Could not extract {filename}: {e}")
+
+    return layout_data_by_slide
+
+def collect_media(pptx_source, relative_folder_name="extracted_media"):
+    """
+    Sammelt alle Bilder, Videos und Audios ohne sie zu schreiben:
+    (layout_data_by_slide, {filename: MediaRef | StreamedMediaRef}).
+    `pptx_source` ist ein Pfad oder die PPTX als Bytes.
+    """
+    # Bilder, Bild-Placeholder, Bildfüllungen und Video/Audio kommen aus dem
+    # gemeinsamen Shape-Scan (Gruppen sind dort bereits aufgelöst, inkl. Geometrie).
+    scan = scan_presentation(pptx_source)
+    slide_width = scan.slide_width
+    slide_height = scan.slide_height
 
     layout_data_by_slide = {}
-    
-    # We use a mutable counter to keep filenames unique across all slides
-    global_image_count = 1 
+    media_files = {}
 
-    print(f"   -> Mining {len(prs.slides)} slides for hidden media...")
+    # We use a mutable counter to keep filenames unique across all slides.
+    # Picture fills, videos and audios get their own counters, so image_N
+    # stays in sync with the picture numbering of the extractors.
+    counters = {"image": 1, "fill": 1, "video": 1, "audio": 1}
 
-    for i, slide in enumerate(prs.slides):
-        slide_index = i
+    print(f"   -> Mining {scan.slide_count} slides for hidden media...")
+
+    for slide_index in range(scan.slide_count):
         slide_media = []
-        
-        # We start the recursion here
-        for shape in slide.shapes:
-            global_image_count = _process_shape_recursive(
-                shape, 
-                slide_media, 
-                output_dir, 
-                global_image_count,
-                slide_width, 
-                slide_height
-            )
+
+        for media in scan.media_by_slide.get(slide_index, []):
+            if media.kind in STREAMED_KINDS:
+                prefix = media.kind
+            else:
+                prefix = "fill" if media.kind == "picture_fill" else "image"
+            filename = f"{prefix}_{counters[prefix]}.{media.ext}"
+            counters[prefix] += 1
+            media_files[filename] = media
+            entry = _layout_entry(media, filename, relative_folder_name, slide_width, slide_height)
+
+            if media.kind in STREAMED_KINDS:
+                entry["size"] = media.info.file_size
+                entry["poster"] = None
+                # Eingebettetes Vorschaubild: wird erst beim Schreiben gelesen
+                if media.poster_part is not None:
+                    poster = MediaRef("poster", media.poster_part, media.geometry, media.name)
+                    poster_name = f"{Path(filename).stem}_poster.{poster.ext}"
+                    media_files[poster_name] = poster
+                    entry["poster"] = f"{relative_folder_name}/{poster_name}"
+
+            slide_media.append(entry)
 
         if slide_media:
             layout_data_by_slide[slide_index] = slide_media
-            print(f"      Slide {i+1}: Found {len(slide_media)} media items")
+            print(f"      Slide {slide_index+1}: Found {len(slide_media)} media items")
 
-    return layout_data_by_slide
+    return layout_data_by_slide, media_files
+
+def _layout_entry(media, filename, relative_folder_name, s_width, s_height):
+    # Relative Path for LaTeX, e.g. "extracted_media/image_1.png"
+    json_relative_path = f"{relative_folder_name}/{filename}"
+
+    # Geometry Calculation (Slide-Koordinaten, auch für Gruppenkinder)
+    if media.geometry is not None:
+        left, top, width, height = media.geometry
+        geometry = [left / s_width, top / s_height, width / s_width, height / s_height]
+    else:
+        geometry = None
 
-def _process_shape_recursive(shape, slide_media, output_dir, count, s_width, s_height):
+    return {
+        "filename": filename,
+        "path": json_relative_path,
+        "geometry": geometry,
+        "kind": media.kind
+    }
+
+def _attach_ffmpeg_poster(media, video_path, entry, output_dir, cache_dir=None):
     """
-    Recursively inspects shapes.
-    - If Group: inspects children.
-    - If Picture: saves it.
+    Video ohne eingebettetes Vorschaubild: erstes Frame per ffmpeg (falls
+    installiert). Gecacht nach CRC + Größe des Zip-Members, d.h. ohne den
+    Inhalt erneut zu lesen.
     """
-    
-    # CASE 1: GROUP (The logic we were missing!)
-    if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
-        for child_shape in shape.shapes:
-            count = _process_shape_recursive(child_shape, slide_media, output_dir, count, s_width, s_height)
-        return count
-
-    # CASE 2: PICTURE (Standard images)
-    if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-        return _save_shape_image(shape, slide_media, output_dir, count, s_width, s_height)
-
-    # CASE 3: PICTURE PLACEHOLDER
-    if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER:
-        if hasattr(shape, 'image') and shape.image:
-            return _save_shape_image(shape, slide_media, output_dir, count, s_width, s_height)
-
-    # CASE 4: SHAPES WITH PICTURE FILL (Advanced/Optional)
-    # Some "Rectangles" are actually photos. This tries to catch them.
-    if shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
-        try:
-            # Type 6 is 'Picture Fill'
-            if shape.fill.type == 6:
-                # Accessing the image from a fill is tricky but this often works
-                if hasattr(shape.fill, 'fore_color') and hasattr(shape.fill.fore_color, 'type'):
-                     # We can't easily extract the blob from a Fill in python-pptx without deep hacking
-                     # So we skip saving the file, but we acknowledge it existed.
-                     pass 
-        except:
-            pass
-
-    return count
-
-def _save_shape_image(shape, slide_media, output_dir, count, s_width, s_height):
-    try:
-        # 1. Get Image Data
-        image = shape.image
-        ext = image.ext
-        filename = f"image_{count}.{ext}"
-        
-        # 2. Save File to Disk (Absolute Path from Config)
-        # output_dir comes from config.MEDIA_OUTPUT_DIR
-        filepath = os.path.join(output_dir, filename)
-        
-        with open(filepath, "wb") as f:
-            f.write(image.blob)
-            
-        # 3. Generate Relative Path for LaTeX (The Fix)
-        # We extract "extracted_media" dynamically from the path provided
-        # This makes it 100% sync'd with your Config
-        relative_folder_name = Path(output_dir).name 
-        json_relative_path = f"{relative_folder_name}/{filename}"
-            
-        # 4. Geometry Calculation
-        left = shape.left / s_width
-        top = shape.top / s_height
-        width = shape.width / s_width
-        height = shape.height / s_height
-        
-        # 5. Append to List
-        slide_media.append({
-            "filename": filename,
-            "path": json_relative_path, # e.g. "extracted_media/image_1.png"
-            "geometry": [left, top, width, height]
-        })
-        
-        return count + 1
-    except Exception as e:
-        print(f"      Warning: Could not extract image {count}: {e}")
-        return count
\ No newline at end of file
+    if shutil.which("ffmpeg") is None:
+        return
+    info = media.info
+    poster_name = f"{Path(entry['filename']).stem}_poster.png"
+    target = Path(output_dir) / poster_name
+    cached = Path(cache_dir) / f"{info.CRC:08x}-{info.file_size}.png" if cache_dir is not None else None
+
+    if cached is None or not cached.exists():
+        frame_path = cached or target
+        frame_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = frame_path.with_name(f"{frame_path.stem}.tmp{os.getpid()}.png")
+        proc = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", str(video_path), "-frames:v", "1", str(tmp_path)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        if proc.returncode != 0 or not tmp_path.exists():
+            tmp_path.unlink(missing_ok=True)
+            return
+        os.replace(tmp_path, frame_path)
+    if cached is not None:
+        shutil.copyfile(cached, target)
+
+    entry["poster"] = f"{Path(output_dir).name}/{poster_name}"
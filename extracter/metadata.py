@@ -2,6 +2,7 @@ import json
 from collections import defaultdict
 from typing import List, Dict, Any
 import re
+from extracter.table_from_pptx import table_from_docling, table_to_rows
 
 def get_bbox_sort_key(item: Dict[str, Any]):
     """Sortiert Elemente vertikal (Top -> Down)."""
@@ -11,19 +12,35 @@ def get_bbox_sort_key(item: Dict[str, Any]):
     return (-bbox.get("t", 0), bbox.get("l", 0))
 
 def simplify_table_data(table_item: Dict[str, Any]) -> List[List[str]]:
-    """Wandelt Grid in Matrix um."""
-    if "data" not in table_item or "grid" not in table_item["data"]:
-        return []
-    simple_rows = []
-    grid = table_item["data"]["grid"]
-    for row in grid:
-        simple_row = [cell.get("text", "").strip() for cell in row]
-        if any(simple_row): 
-            simple_rows.append(simple_row)
-    return simple_rows
+    """Wandelt Grid in Matrix um (verbundene Zellen wiederholen den Text)."""
+    return table_to_rows(table_from_docling(table_item))
 
-def transform_docling_json_to_slides(raw_data: Dict[str, Any], alignment_map=None) -> List[Dict[str, Any]]:
+def match_pptx_table(docling_table, candidates):
+    """
+    Passende Tabelle aus dem PPTX-Scan (gleiche Zeilen-/Spaltenzahl, bevorzugt
+    gleicher Inhalt) oder None. Treffer werden aus `candidates` entfernt.
+    """
+    if docling_table is None:
+        return None
+    same_shape = [c for c in candidates
+                  if (c["table"]["n_rows"], c["table"]["n_cols"]) == (docling_table["n_rows"], docling_table["n_cols"])]
+    if not same_shape:
+        return None
+    rows = table_to_rows(docling_table)
+    match = next((c for c in same_shape if table_to_rows(c["table"]) == rows), same_shape[0])
+    candidates.remove(match)
+    return match["table"]
+
+def transform_docling_json_to_slides(raw_data: Dict[str, Any], alignment_map=None,
+                                     pptx_tables=None, media_folder="extracted_media") -> List[Dict[str, Any]]:
+    """
+    `media_folder`: Ordner der Bilder relativ zum .tex (wie in collect_media).
+    `pptx_tables` ({slide_index: [{"box", "table"}]}, ScanResult.tables_by_slide):
+    Tabellen direkt aus dem graphicFrame (Spaltenbreiten, PPTX-Spans) statt
+    der Docling-Rekonstruktion, soweit sie sich zuordnen lassen.
+    """
     if alignment_map is None: alignment_map = {}
+    remaining_tables = {idx: list(tables) for idx, tables in (pptx_tables or {}).items()}
     # 1. Choose Data Source
     if "structure_analysis" in raw_data:
         source_data = raw_data["structure_analysis"]
@@ -89,11 +106,16 @@ def transform_docling_json_to_slides(raw_data: Dict[str, Any], alignment_map=Non
                         element["align"] = "b" 
                 
                 if key == "tables": 
-                    element["table_rows"] = simplify_table_data(item)
+                    # Normalisierte Tabelle (mit Spans) + flache Zeilen für den Prompt
+                    table = table_from_docling(item)
+                    table = match_pptx_table(table, remaining_tables.get(page_no - 1, [])) or table
+                    if table is not None:
+                        element["table"] = table
+                    element["table_rows"] = table_to_rows(table)
                 
                 if key == "pictures":
                     filename = f"image_{global_image_counter}.png"
-                    element["image_path"] = f"extracted_media/{filename}"
+                    element["image_path"] = f"{media_folder}/{filename}"
                     global_image_counter += 1
                 
                 slides_buckets[page_no].append(element)
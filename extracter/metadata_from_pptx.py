@@ -1,10 +1,15 @@
 from pptx.enum.shapes import PP_PLACEHOLDER
 
-def get_institute_heuristic(prs, known_title, known_author):
+def get_institute_heuristic(prs, known_title, known_author, scan=None):
     """
     Holt den Text direkt aus dem offiziellen Footer-Placeholder des Slide Masters.
     Das ist der sauberste Weg für wiederkehrende Texte wie Institutsnamen.
+    Mit `scan` (Ergebnis von shape_scanner.scan_presentation) wird der Master
+    nicht erneut durchlaufen.
     """
+    if scan is not None:
+        return _pick_institute(scan.master_footers, scan.master_bottom_texts)
+
     try:
         if not prs.slides:
             return ""
@@ -14,30 +19,36 @@ def get_institute_heuristic(prs, known_title, known_author):
         master = first_slide.slide_layout.slide_master
 
         # 2. Durchsuche NUR die offiziellen Platzhalter im Master
-        for shape in master.placeholders:
+        footers = [
+            shape.text.strip() for shape in master.placeholders
             # Wir prüfen exakt auf den Typ FOOTER (Enum ID 15)
-            if shape.placeholder_format.type == PP_PLACEHOLDER.FOOTER:
-                text = shape.text.strip()
-                if text:
-                    return text
+            if shape.placeholder_format.type == PP_PLACEHOLDER.FOOTER
+        ]
 
         # 3. Fallback: Manchmal ist der Footer kein "Placeholder", sondern eine Textbox im Master.
-        # Wir suchen nach einer Textbox ganz unten im Master (untere 10%).
+        # Wir suchen nach einer Textbox ganz unten im Master (untere 15% der Seite).
         slide_height = prs.slide_height
-        for shape in master.shapes:
-            if not shape.has_text_frame: 
-                continue
-            
-            # Ist es weit genug unten? (Untere 15% der Seite)
-            if shape.top > (slide_height * 0.85):
-                text = shape.text.strip()
-                # Filter: Keine Seitenzahlen ("<#>") oder Datum
-                if text and not text.isdigit() and len(text) > 3:
-                     # Filter: Schließe typische Platzhalter-Texte aus
-                    if "datum" not in text.lower() and "date" not in text.lower():
-                         return text
+        bottom_texts = [
+            shape.text.strip() for shape in master.shapes
+            if shape.has_text_frame and shape.top is not None and shape.top > (slide_height * 0.85)
+        ]
+        return _pick_institute(footers, bottom_texts)
 
     except Exception as e:
         print(f"   [WARN] Error reading master footer: {e}")
 
-    return ""
\ No newline at end of file
+    return ""
+
+def _pick_institute(footers, bottom_texts):
+    for text in footers:
+        if text:
+            return text
+
+    for text in bottom_texts:
+        # Filter: Keine Seitenzahlen ("<#>") oder Datum
+        if text and not text.isdigit() and len(text) > 3:
+            # Filter: Schließe typische Platzhalter-Texte aus
+            if "datum" not in text.lower() and "date" not in text.lower():
+                return text
+
+    return ""
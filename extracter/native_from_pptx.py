@@ -0,0 +1,263 @@
+from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
+from pptx.oxml.ns import qn
+from pptx.shapes.picture import Picture
+
+from extracter.shape_scanner import IDENTITY_TRANSFORM, group_child_transform, open_presentation, scan_presentation
+from extracter.table_from_pptx import table_to_rows
+
+# Nativer Extraktor: erzeugt dasselbe Slide-Schema wie
+# metadata.transform_docling_json_to_slides, aber direkt aus dem Shape-Tree
+# (ohne Docling). Koordinaten sind wie bei Docling EMU mit Ursprung oben links.
+
+TITLE_PLACEHOLDERS = (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE)
+LIST_BULLET_TAGS = (qn("a:buChar"), qn("a:buAutoNum"), qn("a:buBlip"))
+
+
+def _group_child_transform(group_shape, parent_transform):
+    """Kind-Koordinaten -> Slide-Koordinaten (siehe shape_scanner.group_child_transform)."""
+    return group_child_transform(group_shape._element.grpSpPr.xfrm, parent_transform)
+
+
+def iter_shapes_absolute(shapes, transform=IDENTITY_TRANSFORM):
+    """
+    Läuft rekursiv durch den Shape-Tree (Gruppen werden aufgelöst) und liefert
+    (shape, (left, top, width, height)) in Slide-EMU. Reihenfolge wie in
+    media_from_pptx, damit die Bildnummern (image_N) übereinstimmen.
+    Placeholder ohne eigene Position erben sie über python-pptx vom Layout.
+    """
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_shapes_absolute(shape.shapes, _group_child_transform(shape, transform))
+            continue
+
+        if None in (shape.left, shape.top, shape.width, shape.height):
+            yield shape, None
+            continue
+
+        sx, sy, tx, ty = transform
+        yield shape, (
+            tx + sx * shape.left,
+            ty + sy * shape.top,
+            sx * shape.width,
+            sy * shape.height,
+        )
+
+
+def _bullet_kind(pPr):
+    """'list', 'none' oder None (nicht festgelegt) für ein pPr/lvlNpPr-Element."""
+    if pPr is None:
+        return None
+    for child in pPr:
+        if child.tag in LIST_BULLET_TAGS:
+            return "list"
+        if child.tag == qn("a:buNone"):
+            return "none"
+    return None
+
+
+def _inherited_list_styles(shape, level):
+    """
+    lvlNpPr-Kandidaten in Vererbungsreihenfolge: Shape-lstStyle,
+    Layout-/Master-Placeholder, Master-txStyles.
+    """
+    tag = qn(f"a:lvl{level + 1}pPr")
+    candidates = []
+
+    def from_shape(sh):
+        lst = sh._element.find(f".//{qn('a:lstStyle')}")
+        if lst is not None:
+            candidates.append(lst.find(tag))
+
+    from_shape(shape)
+    if not shape.is_placeholder:
+        return candidates
+
+    base = shape
+    while True:
+        try:
+            base = base._base_placeholder
+        except (AttributeError, NotImplementedError):
+            base = None
+        if base is None:
+            break
+        from_shape(base)
+
+    try:
+        master = shape.part.slide_layout.slide_master
+    except AttributeError:
+        return candidates
+    tx_styles = master._element.find(f".//{qn('p:txStyles')}")
+    if tx_styles is not None:
+        ph_type = shape.placeholder_format.type
+        if ph_type in (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT):
+            style = tx_styles.find(qn("p:bodyStyle"))
+        elif ph_type in TITLE_PLACEHOLDERS:
+            style = tx_styles.find(qn("p:titleStyle"))
+        else:
+            style = tx_styles.find(qn("p:otherStyle"))
+        if style is not None:
+            candidates.append(style.find(tag))
+    return candidates
+
+
+def is_list_paragraph(shape, paragraph):
+    """Bullet-Erkennung inkl. Vererbung (Paragraph -> Shape -> Layout -> Master)."""
+    kind = _bullet_kind(paragraph._p.pPr)
+    if kind is None:
+        for pPr in _inherited_list_styles(shape, paragraph.level):
+            kind = _bullet_kind(pPr)
+            if kind is not None:
+                break
+    if kind is not None:
+        return kind == "list"
+    return paragraph.level > 0
+
+
+def _to_bbox(box):
+    left, top, width, height = box
+    return {"l": int(left), "t": int(top), "r": int(left + width), "b": int(top + height)}
+
+
+READING_ROW_TOLERANCE = 45720    # EMU (0,05"), wie Doclings _SHAPE_ROW_TOLERANCE_EMU
+
+
+def _shape_position(shape, attr):
+    try:
+        value = getattr(shape, attr)
+    except (AttributeError, ValueError, TypeError):
+        return None
+    return int(value) if value is not None else None
+
+
+def reading_order(shapes, ranks=None):
+    """
+    {shape-Element: Rang} in Doclings Lesereihenfolge: oben nach unten,
+    Shapes mit fast gleichem top (Toleranz zum Vorgänger) als Zeile von
+    links nach rechts; Gruppen rekursiv an ihrer Position. Shapes ohne
+    Position kommen ans Ende.
+    """
+    ranks = {} if ranks is None else ranks
+    fallback = 2 ** 63 - 1
+    entries = []
+    for index, shape in enumerate(shapes):
+        top = _shape_position(shape, "top")
+        left = _shape_position(shape, "left")
+        entries.append((fallback if top is None else top, fallback if left is None else left, index, shape))
+    entries.sort(key=lambda e: (e[0], e[2]))
+
+    rows, prev_top = [], None
+    for entry in entries:
+        if prev_top is None or entry[0] - prev_top > READING_ROW_TOLERANCE:
+            rows.append([])
+        rows[-1].append(entry)
+        prev_top = entry[0]
+
+    for row in rows:
+        for _, _, _, shape in sorted(row, key=lambda e: (e[1], e[2])):
+            if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+                reading_order(shape.shapes, ranks)
+            else:
+                ranks[shape._element] = len(ranks)
+    return ranks
+
+
+def _apply_alignment(element, check_text, slide_map):
+    """Gleiche Logik wie in transform_docling_json_to_slides."""
+    if check_text and slide_map:
+        lookup_key = "".join(check_text.split()).lower()[:50]
+        if lookup_key in slide_map:
+            element["align"] = "b"
+
+
+def _is_picture(shape):
+    if isinstance(shape, Picture):
+        return True
+    return shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER and getattr(shape, "image", None) is not None
+
+
+def extract_slides_native(pptx_path, alignment_map=None, media_folder="extracted_media"):
+    """
+    Liefert die Slide-Liste im Schema von transform_docling_json_to_slides:
+    [{"slide_number": n, "elements": [{"type", "label", "bbox", "text"/"table_rows"/"image_path", "align"?}]}]
+    `pptx_path` darf auch der Inhalt der PPTX als Bytes sein.
+    """
+    if alignment_map is None: alignment_map = {}
+    prs = open_presentation(pptx_path)
+    # Tabellen kommen normalisiert (mit Spans) aus dem gemeinsamen Shape-Scan;
+    # Reihenfolge pro Slide = Reihenfolge im Shape-Tree
+    scan = scan_presentation(pptx_path)
+    final_slides = []
+    global_image_counter = 1
+
+    for slide_idx, slide in enumerate(prs.slides):
+        page_no = slide_idx + 1
+        slide_map = alignment_map.get(page_no, {})
+        texts, tables, pictures = [], [], []
+        scanned_tables = iter(scan.tables_by_slide.get(slide_idx, []))
+
+        # Bildnummern folgen dem Shape-Tree (wie media_from_pptx), die Ausgabe
+        # der Lesereihenfolge von Docling
+        ranks = reading_order(slide.shapes)
+        rank_of = {}
+
+        for shape, box in iter_shapes_absolute(slide.shapes):
+            bbox = _to_bbox(box) if box is not None else {"l": 0, "t": 0, "r": 0, "b": 0}
+            rank = ranks.get(shape._element, len(ranks))
+
+            # Bilder immer zählen, damit image_N zu media_from_pptx passt
+            if _is_picture(shape):
+                pictures.append({
+                    "type": "picture",
+                    "label": "picture",
+                    "bbox": bbox,
+                    "image_path": f"{media_folder}/image_{global_image_counter}.png",
+                })
+                rank_of[id(pictures[-1])] = rank
+                global_image_counter += 1
+                continue
+
+            if getattr(shape, "has_table", False) and shape.has_table:
+                # Immer weiterschalten, damit die Zuordnung zum Scan stimmt
+                table = next(scanned_tables)["table"]
+                if box is None:
+                    continue
+                tables.append({
+                    "type": "table",
+                    "label": "table",
+                    "bbox": bbox,
+                    "table": table,
+                    "table_rows": table_to_rows(table),
+                })
+                rank_of[id(tables[-1])] = rank
+                continue
+
+            if box is None:
+                continue
+
+            if not shape.has_text_frame or not shape.text_frame.text.strip():
+                continue
+
+            is_title = shape.is_placeholder and shape.placeholder_format.type in TITLE_PLACEHOLDERS
+            for paragraph in shape.text_frame.paragraphs:
+                # python-pptx liefert Zeilenumbrüche (<a:br/>) als \v, Docling als Leerzeichen
+                text = paragraph.text.replace("\v", " ").strip()
+                if not text:
+                    continue
+                if is_list_paragraph(shape, paragraph):
+                    label = "list_item"
+                else:
+                    label = "title" if is_title else "paragraph"
+                element = {"type": "text", "label": label, "bbox": bbox, "text": text}
+                _apply_alignment(element, text, slide_map)
+                texts.append(element)
+                rank_of[id(element)] = rank
+
+        # Wie im Docling-Pfad: texts, tables, pictures, jeweils in Lesereihenfolge
+        # (sort ist stabil, Absätze einer Shape bleiben in ihrer Reihenfolge)
+        items = [el for group in (texts, tables, pictures)
+                 for el in sorted(group, key=lambda el: rank_of[id(el)])]
+        if not items:
+            continue
+        final_slides.append({"slide_number": page_no, "elements": items})
+
+    return final_slides
@@ -0,0 +1,537 @@
+import hashlib
+import io
+import os
+import shutil
+import threading
+import zipfile
+from contextlib import contextmanager
+from functools import lru_cache
+from posixpath import splitext
+
+from lxml import etree
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.oxml.ns import qn
+
+from extracter.table_from_pptx import find_table_element, parse_table_element
+
+# Ein einziger Durchlauf über den Shape-Tree aller Slides (plus Slide Master),
+# direkt auf dem Slide-XML (lxml) statt über die python-pptx Shape-Proxies.
+# Die einzelnen Auswertungen hängen als Visitor am Scanner; die Ergebnisse
+# stehen allen Verbrauchern (text, media_from_pptx, metadata_from_pptx,
+# native_from_pptx, testImages.py) über scan_presentation() zur Verfügung.
+
+IDENTITY_TRANSFORM = (1.0, 1.0, 0.0, 0.0)  # (scale_x, scale_y, offset_x, offset_y)
+
+TAG_SP = qn("p:sp")
+TAG_PIC = qn("p:pic")
+TAG_GRP = qn("p:grpSp")
+TAG_FRAME = qn("p:graphicFrame")
+TAG_CXN = qn("p:cxnSp")
+SHAPE_TAGS = (TAG_SP, TAG_PIC, TAG_GRP, TAG_FRAME, TAG_CXN)
+
+VIDEO_FILE_TAGS = (qn("a:videoFile"), qn("a:quickTimeFile"))
+AUDIO_FILE_TAGS = (qn("a:audioFile"), qn("a:wavAudioFile"))
+MEDIA_FILE_TAGS = VIDEO_FILE_TAGS + AUDIO_FILE_TAGS
+TAG_P14_MEDIA = "{http://schemas.microsoft.com/office/powerpoint/2010/main}media"
+R_EMBED = qn("r:embed")
+R_LINK = qn("r:link")
+
+CONTENT_TYPES_MEMBER = "[Content_Types].xml"
+CT_NS = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def group_child_transform(xfrm, parent_transform):
+    """
+    Kinder einer Gruppe liegen im Koordinatensystem chOff/chExt der Gruppe.
+    `xfrm` ist das a:xfrm der Gruppe; liefert die Transformation
+    Kind-Koordinaten -> Slide-Koordinaten.
+    """
+    if xfrm is None or xfrm.off is None or xfrm.ext is None:
+        return parent_transform
+    sx, sy, tx, ty = parent_transform
+
+    ch_off, ch_ext = xfrm.chOff, xfrm.chExt
+    ch_x = ch_off.x if ch_off is not None else xfrm.off.x
+    ch_y = ch_off.y if ch_off is not None else xfrm.off.y
+    ch_cx = ch_ext.cx if ch_ext is not None and ch_ext.cx else xfrm.ext.cx
+    ch_cy = ch_ext.cy if ch_ext is not None and ch_ext.cy else xfrm.ext.cy
+
+    gx = xfrm.ext.cx / ch_cx if ch_cx else 1.0
+    gy = xfrm.ext.cy / ch_cy if ch_cy else 1.0
+    return (
+        sx * gx,
+        sy * gy,
+        tx + sx * (xfrm.off.x - ch_x * gx),
+        ty + sy * (xfrm.off.y - ch_y * gy),
+    )
+
+
+def _find_xfrm(el):
+    """a:xfrm bzw. p:xfrm des Shapes (bei graphicFrame direkt unterhalb)."""
+    if el.tag == TAG_FRAME:
+        return el.find(qn("p:xfrm"))
+    sp_pr = el.find(qn("p:grpSpPr")) if el.tag == TAG_GRP else el.find(qn("p:spPr"))
+    return sp_pr.find(qn("a:xfrm")) if sp_pr is not None else None
+
+
+def _placeholder(el):
+    """p:ph-Element (oder None) aus nvSpPr/nvPicPr/..."""
+    for nv in el:
+        nv_pr = nv.find(qn("p:nvPr"))
+        if nv_pr is not None:
+            return nv_pr.find(qn("p:ph"))
+    return None
+
+
+def _shape_name(el):
+    for nv in el:
+        c_nv_pr = nv.find(qn("p:cNvPr"))
+        if c_nv_pr is not None:
+            return c_nv_pr.get("name", "")
+    return ""
+
+
+def _paragraph_texts(el):
+    tx_body = el.find(qn("p:txBody"))
+    if tx_body is None:
+        return []
+    return ["".join(t.text or "" for t in p.iter(qn("a:t"))) for p in tx_body.iter(qn("a:p"))]
+
+
+class ShapeContext:
+    """Alles, was ein Visitor über ein Shape wissen muss (einmal berechnet)."""
+
+    __slots__ = ("slide_index", "slide_part", "element", "box", "placeholder", "depth")
+
+    def __init__(self, slide_index, slide_part, element, box, placeholder, depth):
+        self.slide_index = slide_index
+        self.slide_part = slide_part
+        self.element = element
+        self.box = box              # (left, top, width, height) in Slide-EMU oder None
+        self.placeholder = placeholder
+        self.depth = depth
+
+
+class ShapeVisitor:
+    def visit_shape(self, ctx):
+        pass
+
+    def visit_master(self, master, slide_height):
+        pass
+
+
+class AlignmentHintVisitor(ShapeVisitor):
+    """Texte mit >= 2 führenden leeren Absätzen ("Fake-Bottom", siehe text.py)."""
+
+    def __init__(self):
+        self.override_map = {}
+
+    def visit_shape(self, ctx):
+        # Wie bisher nur Shapes direkt auf der Slide (keine Gruppenkinder)
+        if ctx.depth > 0:
+            return
+        paragraphs = _paragraph_texts(ctx.element)
+        full_text = "\n".join(paragraphs)
+        if not full_text.strip():
+            return
+        leading_empty = 0
+        for text in paragraphs:
+            if text.strip():
+                break
+            leading_empty += 1
+        if leading_empty >= 2:
+            clean_key = "".join(full_text.split()).lower()[:50]
+            if clean_key:
+                self.override_map.setdefault(ctx.slide_index + 1, {})[clean_key] = "b"
+
+
+class MediaRef:
+    """Verweis auf ein eingebettetes Bild; der Blob wird erst bei Bedarf gelesen."""
+
+    def __init__(self, kind, part, geometry, name):
+        self.kind = kind            # "picture" oder "picture_fill"
+        self.part = part
+        self.geometry = geometry    # (left, top, width, height) in Slide-EMU
+        self.name = name
+
+    @property
+    def ext(self):
+        return self.part.partname.ext
+
+    @property
+    def blob(self):
+        return self.part.blob
+
+
+class StreamedMediaRef:
+    """
+    Video/Audio im PPTX. python-pptx bekommt diese Zip-Member nur als leere
+    Platzhalter (siehe open_presentation); der Inhalt wird direkt aus dem Zip
+    in Blöcken kopiert und liegt nie komplett im Speicher.
+    """
+
+    def __init__(self, kind, member, source, geometry, name, poster_part=None):
+        self.kind = kind            # "video" oder "audio"
+        self.member = member        # Zip-Member, z.B. "ppt/media/media1.mp4"
+        self.source = source        # Pfad oder Bytes der PPTX
+        self.geometry = geometry    # (left, top, width, height) in Slide-EMU
+        self.name = name
+        self.poster_part = poster_part  # eingebettetes Vorschaubild (p:blipFill) oder None
+
+    @property
+    def ext(self):
+        return splitext(self.member)[1].lstrip(".").lower() or "bin"
+
+    def _zip(self):
+        if isinstance(self.source, (bytes, bytearray)):
+            return zipfile.ZipFile(io.BytesIO(self.source))
+        return zipfile.ZipFile(self.source)
+
+    @property
+    def info(self):
+        """ZipInfo (Größe + CRC, ohne den Inhalt zu lesen)."""
+        with self._zip() as zf:
+            return zf.getinfo(self.member)
+
+    def stream_to(self, path, chunk_size=STREAM_CHUNK_SIZE):
+        """Kopiert den Member blockweise nach `path` (über eine Temp-Datei, atomar)."""
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with self._zip() as zf, zf.open(self.member) as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, chunk_size)
+        os.replace(tmp_path, path)
+
+    @property
+    def blob(self):
+        # Nur für die In-Memory-API (api.py); der Pipeline-Pfad nutzt stream_to()
+        with self._zip() as zf:
+            return zf.read(self.member)
+
+
+class MediaVisitor(ShapeVisitor):
+    """Bilder (p:pic inkl. Bild-Placeholder), Bildfüllungen von Shapes sowie Video/Audio."""
+
+    def __init__(self, source=None):
+        self.source = source
+        self.media_by_slide = {}
+
+    def _add(self, ctx, kind, blip):
+        rid = blip.get(R_EMBED) if blip is not None else None
+        if not rid:
+            return
+        try:
+            part = ctx.slide_part.related_part(rid)
+        except KeyError:
+            return
+        self.media_by_slide.setdefault(ctx.slide_index, []).append(
+            MediaRef(kind, part, ctx.box, _shape_name(ctx.element))
+        )
+
+    def _add_streamed(self, ctx, nv_pr):
+        """Video/Audio: Ziel über p14:media (eingebettet) bzw. a:videoFile/a:audioFile."""
+        el = ctx.element
+        kind = "video" if any(nv_pr.find(tag) is not None for tag in VIDEO_FILE_TAGS) else "audio"
+        rids = [media.get(R_EMBED) for media in nv_pr.iter(TAG_P14_MEDIA)]
+        rids += [file_el.get(R_LINK) for tag in MEDIA_FILE_TAGS for file_el in nv_pr.findall(tag)]
+
+        rels = ctx.slide_part.rels
+        for rid in rids:
+            rel = rels.get(rid) if rid else None
+            if rel is None:
+                continue
+            if rel.is_external:
+                print(f"      Slide {ctx.slide_index + 1}: linked {kind} {rel.target_ref} is not embedded -> skipped")
+                return
+            poster_part = None
+            blip = el.find(f"{qn('p:blipFill')}/{qn('a:blip')}")
+            poster_rid = blip.get(R_EMBED) if blip is not None else None
+            if poster_rid:
+                try:
+                    poster_part = ctx.slide_part.related_part(poster_rid)
+                except KeyError:
+                    pass
+            member = str(rel.target_partname).lstrip("/")
+            self.media_by_slide.setdefault(ctx.slide_index, []).append(
+                StreamedMediaRef(kind, member, self.source, ctx.box, _shape_name(el), poster_part)
+            )
+            return
+
+    def visit_shape(self, ctx):
+        el = ctx.element
+        if el.tag == TAG_PIC:
+            nv_pr = el.find(f"{qn('p:nvPicPr')}/{qn('p:nvPr')}")
+            if nv_pr is not None and any(nv_pr.find(tag) is not None for tag in MEDIA_FILE_TAGS):
+                # Video/Audio; das Poster-Bild gehört dazu und ist kein eigenständiges Bild
+                self._add_streamed(ctx, nv_pr)
+                return
+            self._add(ctx, "picture", el.find(f"{qn('p:blipFill')}/{qn('a:blip')}"))
+        elif el.tag == TAG_SP:
+            self._add(ctx, "picture_fill", el.find(f"{qn('p:spPr')}/{qn('a:blipFill')}/{qn('a:blip')}"))
+
+
+class GeometryVisitor(ShapeVisitor):
+    """Gruppen-aufgelöste Geometrie aller Shapes (u.a. für testImages.py)."""
+
+    def __init__(self):
+        self.shapes_by_slide = {}
+
+    def visit_shape(self, ctx):
+        self.shapes_by_slide.setdefault(ctx.slide_index, []).append({
+            "name": _shape_name(ctx.element),
+            "tag": ctx.element.tag.rsplit("}", 1)[-1],
+            "depth": ctx.depth,
+            "box": ctx.box,
+            "placeholder": ctx.placeholder.get("type", "body") if ctx.placeholder is not None else None,
+        })
+
+
+class TableVisitor(ShapeVisitor):
+    """Tabellen (a:tbl in graphicFrames) als normalisierte Tabelle inkl. Spans."""
+
+    def __init__(self):
+        self.tables_by_slide = {}
+
+    def visit_shape(self, ctx):
+        if ctx.element.tag != TAG_FRAME:
+            return
+        tbl = find_table_element(ctx.element)
+        if tbl is not None:
+            self.tables_by_slide.setdefault(ctx.slide_index, []).append({
+                "box": ctx.box,
+                "table": parse_table_element(tbl),
+            })
+
+
+class FooterVisitor(ShapeVisitor):
+    """Footer-Placeholder und Textboxen im unteren Bereich des Slide Masters."""
+
+    def __init__(self):
+        self.master_footers = []
+        self.master_bottom_texts = []
+
+    def visit_master(self, master, slide_height):
+        for shape in master.placeholders:
+            if shape.placeholder_format.type == PP_PLACEHOLDER.FOOTER:
+                text = shape.text.strip()
+                if text:
+                    self.master_footers.append(text)
+        for shape in master.shapes:
+            if shape.has_text_frame and shape.top is not None and shape.top > slide_height * 0.85:
+                text = shape.text.strip()
+                if text:
+                    self.master_bottom_texts.append(text)
+
+
+class ScanResult:
+    def __init__(self, slide_width, slide_height, slide_count, core_properties, visitors):
+        self.slide_width = slide_width
+        self.slide_height = slide_height
+        self.slide_count = slide_count
+        self.core_properties = core_properties
+        self.alignment_map = visitors["alignment"].override_map
+        self.media_by_slide = visitors["media"].media_by_slide
+        self.shapes_by_slide = visitors["geometry"].shapes_by_slide
+        self.tables_by_slide = visitors["tables"].tables_by_slide
+        self.master_footers = visitors["footer"].master_footers
+        self.master_bottom_texts = visitors["footer"].master_bottom_texts
+
+
+# Layout-Placeholder erben ihre Position vom Master-Placeholder dieses Basistyps
+# (gleiche Zuordnung wie LayoutPlaceholder._base_placeholder in python-pptx)
+BASE_PLACEHOLDER_TYPES = {"title": "title", "ctrTitle": "title", "dt": "dt", "ftr": "ftr", "sldNum": "sldNum"}
+
+
+def _own_box(el):
+    xfrm = _find_xfrm(el)
+    if xfrm is None or xfrm.off is None or xfrm.ext is None:
+        return None
+    return (xfrm.off.x, xfrm.off.y, xfrm.ext.cx, xfrm.ext.cy)
+
+
+class PlaceholderResolver:
+    """
+    Positionen von Placeholdern ohne eigenes xfrm (Slide -> Layout über idx,
+    Layout -> Master über den Typ). Die Indizes werden pro Layout/Master einmal
+    aus dem XML gebaut statt für jedes Shape über die python-pptx-Proxies.
+    """
+
+    def __init__(self):
+        self._layouts = {}
+        self._masters = {}
+
+    @staticmethod
+    def _placeholders(sp_tree):
+        for el in sp_tree:
+            if el.tag in SHAPE_TAGS and el.tag != TAG_GRP:
+                ph = _placeholder(el)
+                if ph is not None:
+                    yield el, ph
+
+    def _master_index(self, master):
+        key = master.part.partname
+        if key not in self._masters:
+            index = {}
+            for el, ph in self._placeholders(master.shapes._spTree):
+                index.setdefault(ph.get("type", "obj"), _own_box(el))
+            self._masters[key] = index
+        return self._masters[key]
+
+    def _layout_index(self, layout):
+        key = layout.part.partname
+        if key not in self._layouts:
+            master_index = self._master_index(layout.slide_master)
+            index = {}
+            for el, ph in self._placeholders(layout.shapes._spTree):
+                box = _own_box(el)
+                if box is None:
+                    base_type = BASE_PLACEHOLDER_TYPES.get(ph.get("type", "obj"), "body")
+                    box = master_index.get(base_type)
+                index.setdefault(int(ph.get("idx", 0)), box)
+            self._layouts[key] = index
+        return self._layouts[key]
+
+    def resolve(self, slide, placeholder):
+        return self._layout_index(slide.slide_layout).get(int(placeholder.get("idx", 0)))
+
+
+def _walk(sp_tree, transform, depth, slide, slide_index, visitors, resolver):
+    for el in sp_tree:
+        if el.tag not in SHAPE_TAGS:
+            continue
+        xfrm = _find_xfrm(el)
+
+        if el.tag == TAG_GRP:
+            _walk(el, group_child_transform(xfrm, transform), depth + 1, slide, slide_index, visitors, resolver)
+            continue
+
+        placeholder = _placeholder(el)
+        if xfrm is not None and xfrm.off is not None and xfrm.ext is not None:
+            sx, sy, tx, ty = transform
+            box = (tx + sx * xfrm.off.x, ty + sy * xfrm.off.y, sx * xfrm.ext.cx, sy * xfrm.ext.cy)
+        elif depth == 0 and placeholder is not None:
+            box = resolver.resolve(slide, placeholder)
+        else:
+            box = None
+
+        ctx = ShapeContext(slide_index, slide.part, el, box, placeholder, depth)
+        for visitor in visitors:
+            visitor.visit_shape(ctx)
+
+
+def _streamed_members(zf):
+    """Zip-Member mit Video-/Audio-Content-Type laut [Content_Types].xml."""
+    try:
+        root = etree.fromstring(zf.read(CONTENT_TYPES_MEMBER))
+    except (KeyError, etree.XMLSyntaxError):
+        return set()
+    defaults = {el.get("Extension", "").lower(): el.get("ContentType", "") for el in root.iter(f"{CT_NS}Default")}
+    overrides = {el.get("PartName", ""): el.get("ContentType", "") for el in root.iter(f"{CT_NS}Override")}
+
+    members = set()
+    for name in zf.namelist():
+        content_type = overrides.get(f"/{name}") or defaults.get(splitext(name)[1].lstrip(".").lower(), "")
+        if content_type.startswith(("video/", "audio/")):
+            members.add(name)
+    return members
+
+
+def lean_package(source, target=None):
+    """
+    Kopie der PPTX (Pfad oder Bytes) mit leeren Video-/Audio-Membern nach
+    `target` (Pfad oder Datei-Objekt, Standard: BytesIO). Die übrigen Member
+    werden einzeln kopiert. None, wenn das Deck keine solchen Medien hat.
+    """
+    pkg_file = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    with zipfile.ZipFile(pkg_file) as zf:
+        streamed = _streamed_members(zf)
+        if not streamed:
+            return None
+        target = io.BytesIO() if target is None else target
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_STORED) as out:
+            for info in zf.infolist():
+                if info.filename in streamed:
+                    out.writestr(info.filename, b"")
+                    continue
+                with zf.open(info) as src, out.open(info.filename, "w") as dst:
+                    shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+    if isinstance(target, io.BytesIO):
+        target.seek(0)
+    return target
+
+
+def open_presentation(source):
+    """
+    Presentation aus Pfad oder Bytes (In-Memory-API, siehe api.py).
+    python-pptx liest beim Öffnen jeden Zip-Member komplett in den Speicher;
+    Video/Audio werden deshalb durch leere Member ersetzt (lean_package) und
+    später per StreamedMediaRef.stream_to() direkt aus dem Zip kopiert.
+    """
+    lean = lean_package(source)
+    if lean is not None:
+        return Presentation(lean)
+    return Presentation(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source)
+
+
+def scan_presentation_uncached(source):
+    prs = open_presentation(source)
+    visitors = {
+        "alignment": AlignmentHintVisitor(),
+        "media": MediaVisitor(source),
+        "geometry": GeometryVisitor(),
+        "tables": TableVisitor(),
+        "footer": FooterVisitor(),
+    }
+    visitor_list = list(visitors.values())
+    resolver = PlaceholderResolver()
+
+    for slide_index, slide in enumerate(prs.slides):
+        _walk(slide.shapes._spTree, IDENTITY_TRANSFORM, 0, slide, slide_index, visitor_list, resolver)
+
+    if prs.slides:
+        master = prs.slides[0].slide_layout.slide_master
+        for visitor in visitor_list:
+            visitor.visit_master(master, prs.slide_height)
+
+    return ScanResult(prs.slide_width, prs.slide_height, len(prs.slides), prs.core_properties, visitors)
+
+
+@lru_cache(maxsize=8)
+def _scan_cached(path, mtime_ns, size):
+    return scan_presentation_uncached(path)
+
+
+# Scans von PPTX-Bytes werden nur innerhalb eines bytes_scan_scope() geteilt
+# (ein api.convert()-Aufruf): ein ScanResult hält Package und Quell-Bytes,
+# ein prozessweiter Cache würde ganze Decks dauerhaft im Speicher halten.
+_bytes_scans = threading.local()
+
+
+@contextmanager
+def bytes_scan_scope():
+    previous = getattr(_bytes_scans, "cache", None)
+    _bytes_scans.cache = {}
+    try:
+        yield
+    finally:
+        _bytes_scans.cache = previous
+
+
+def scan_presentation(source):
+    """
+    Gecachter Scan, damit alle Verbraucher ihn teilen.
+    Key: Pfad + mtime + Größe, bzw. SHA-1 des Inhalts bei Bytes
+    (nur innerhalb von bytes_scan_scope(), sonst ungecacht).
+    """
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+        cache = getattr(_bytes_scans, "cache", None)
+        if cache is None:
+            return scan_presentation_uncached(data)
+        digest = hashlib.sha1(data).hexdigest()
+        if digest not in cache:
+            cache[digest] = scan_presentation_uncached(data)
+        return cache[digest]
+    path = os.path.abspath(str(source))
+    stat = os.stat(path)
+    return _scan_cached(path, stat.st_mtime_ns, stat.st_size)
@@ -1,7 +1,160 @@
+from pptx.oxml.ns import qn
+
+# Einheitliche Tabellen-Darstellung für Docling- und PPTX-Tabellen:
+# {
+#   "n_rows": int, "n_cols": int,
+#   "col_widths": [relative Breiten, Summe 1.0] oder None,
+#   "rows": [[{"col", "text", "rowspan", "colspan"}, ...], ...]
+# }
+# "rows" enthält pro Zeile nur die Ursprungszellen; verbundene Bereiche
+# tauchen genau einmal auf (mit ihrem Span). Alle flachen Varianten
+# (table_rows, Pipe-Text) werden daraus abgeleitet.
+
+TABLE_START_MARKER = "DETECTED_TABLE_START"
+TABLE_END_MARKER = "DETECTED_TABLE_END"
+
+
+def normalize_table(n_rows, n_cols, cells, col_widths=None):
+    """
+    Baut die normalisierte Tabelle aus Ursprungszellen
+    ({"row", "col", "rowspan", "colspan", "text"}). Spans werden auf das
+    Grid begrenzt, doppelte Ursprünge ignoriert.
+    """
+    rows = [[] for _ in range(n_rows)]
+    seen = set()
+    for cell in cells:
+        r, c = cell["row"], cell["col"]
+        if not (0 <= r < n_rows and 0 <= c < n_cols) or (r, c) in seen:
+            continue
+        seen.add((r, c))
+        rows[r].append({
+            "col": c,
+            "text": cell.get("text", "").strip(),
+            "rowspan": max(1, min(int(cell.get("rowspan", 1)), n_rows - r)),
+            "colspan": max(1, min(int(cell.get("colspan", 1)), n_cols - c)),
+        })
+    for row in rows:
+        row.sort(key=lambda cell: cell["col"])
+
+    if col_widths is not None:
+        total = sum(col_widths)
+        col_widths = [round(w / total, 4) for w in col_widths] if total and len(col_widths) == n_cols else None
+
+    return {"n_rows": n_rows, "n_cols": n_cols, "col_widths": col_widths, "rows": rows}
+
+
+def table_has_spans(table):
+    return any(cell["rowspan"] > 1 or cell["colspan"] > 1 for row in table["rows"] for cell in row)
+
+
+def table_to_rows(table, drop_empty=True):
+    """
+    Flache Matrix (wie bisher "table_rows"): verbundene Zellen wiederholen
+    den Text in jeder überdeckten Position, leere Zeilen fallen optional weg.
+    """
+    if not table:
+        return []
+    grid = [[""] * table["n_cols"] for _ in range(table["n_rows"])]
+    for r, row in enumerate(table["rows"]):
+        for cell in row:
+            for dr in range(cell["rowspan"]):
+                for dc in range(cell["colspan"]):
+                    grid[r + dr][cell["col"] + dc] = cell["text"]
+    if drop_empty:
+        return [row for row in grid if any(row)]
+    return grid
+
+
+# --- PPTX (a:tbl direkt aus dem graphicFrame) ---
+
+def _paragraph_text(p):
+    parts = []
+    for child in p:
+        if child.tag in (qn("a:r"), qn("a:fld")):
+            t = child.find(qn("a:t"))
+            parts.append((t.text or "") if t is not None else "")
+        elif child.tag == qn("a:br"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def _cell_text(tc):
+    tx_body = tc.find(qn("a:txBody"))
+    if tx_body is None:
+        return ""
+    return "\n".join(_paragraph_text(p) for p in tx_body.findall(qn("a:p"))).strip()
+
+
+def _is_merged_flag(value):
+    return value in ("1", "true")
+
+
+def parse_table_element(tbl):
+    """
+    Liest ein a:tbl-Element: Spaltenbreiten aus a:tblGrid, Spans aus
+    gridSpan/rowSpan; Zellen mit hMerge/vMerge sind überdeckt.
+    """
+    grid = tbl.find(qn("a:tblGrid"))
+    widths = [int(col.get("w", 0)) for col in grid.findall(qn("a:gridCol"))] if grid is not None else []
+    trs = tbl.findall(qn("a:tr"))
+
+    cells = []
+    n_cols = len(widths)
+    for r, tr in enumerate(trs):
+        tcs = tr.findall(qn("a:tc"))
+        n_cols = max(n_cols, len(tcs))
+        for c, tc in enumerate(tcs):
+            if _is_merged_flag(tc.get("hMerge")) or _is_merged_flag(tc.get("vMerge")):
+                continue
+            cells.append({
+                "row": r,
+                "col": c,
+                "rowspan": int(tc.get("rowSpan", 1)),
+                "colspan": int(tc.get("gridSpan", 1)),
+                "text": _cell_text(tc),
+            })
+    return normalize_table(len(trs), n_cols, cells, widths or None)
+
+
+def find_table_element(graphic_frame):
+    """a:tbl eines p:graphicFrame oder None (Charts, SmartArt, OLE, ...)."""
+    return graphic_frame.find(f"{qn('a:graphic')}/{qn('a:graphicData')}/{qn('a:tbl')}")
+
+
+# --- Docling ---
+
+def table_from_docling(table_item):
+    """
+    Normalisierte Tabelle aus einem Docling-Table-Item. Nutzt "table_cells"
+    (mit row_span/col_span); ältere Dumps ohne table_cells über das Grid.
+    """
+    data = table_item.get("data")
+    if not data:
+        return None
+    cells = data.get("table_cells")
+    if not cells:
+        cells = [cell for row in data.get("grid", []) for cell in row]
+    if not cells:
+        return None
+
+    n_rows = data.get("num_rows") or len(data.get("grid", []))
+    n_cols = data.get("num_cols") or max((len(row) for row in data.get("grid", [])), default=0)
+    return normalize_table(n_rows, n_cols, [
+        {
+            "row": cell.get("start_row_offset_idx", 0),
+            "col": cell.get("start_col_offset_idx", 0),
+            "rowspan": cell.get("row_span", 1),
+            "colspan": cell.get("col_span", 1),
+            "text": cell.get("text", ""),
+        }
+        for cell in cells
+    ])
+
+
 def _extract_tables_from_docling(docling_data):
     """
     Extracts table data from the raw JSON 'tables' node.
-    Converts the structured grid into a text representation 
+    Converts the normalized table into a text representation 
     that mimics a Markdown/CSV format.
     """
     items = []
@@ -14,28 +167,21 @@ def _extract_tables_from_docling(docling_data):
         # Safety check: We need provenance to know the page number
         if not tbl.get("prov") or not tbl.get("data"): 
             continue
+
+        table = table_from_docling(tbl)
+        if table is None:
+            continue
             
         # 2. Build the Text Representation
         # We start with a marker so the LLM knows: "STOP! This is a table."
-        lines = ["DETECTED_TABLE_START"]
+        lines = [TABLE_START_MARKER]
         
-        # Access the grid (Rows -> Cells)
-        # Based on your snippet: data -> grid -> [ [cell, cell], [cell, cell] ]
-        grid = tbl["data"].get("grid", [])
-        
-        for row in grid:
-            row_texts = []
-            for cell in row:
-                # Extract text from the cell object
-                # Replace newlines in cells with spaces to keep the row on one line
-                cell_text = cell.get("text", "").strip().replace("\n", " ")
-                row_texts.append(cell_text)
-            
-            # Join columns with a pipe character
-            # Format: "Description | O-Notation | Runtime..."
-            lines.append(" | ".join(row_texts))
+        # Format: "Description | O-Notation | Runtime..."
+        # Replace newlines in cells with spaces to keep the row on one line
+        for row in table_to_rows(table, drop_empty=False):
+            lines.append(" | ".join(cell.replace("\n", " ") for cell in row))
             
-        lines.append("DETECTED_TABLE_END")
+        lines.append(TABLE_END_MARKER)
         
         full_table_text = "\n".join(lines)
 
@@ -47,4 +193,4 @@ def _extract_tables_from_docling(docling_data):
         })
         
     print(f"   -> Extracted {len(items)} tables from raw JSON.")
-    return items
\ No newline at end of file
+    return items
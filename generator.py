@@ -1,7 +1,7 @@
 import re
 
 
-def generate_latex_preamble(metadata, detected_header=None):
+def generate_latex_preamble(metadata, detected_header=None, extra_macros=None):
     # Standardwerte
     date = metadata.get("date", r"\today")
     raw_title = metadata.get("title", "Presentation")
@@ -10,6 +10,8 @@ def generate_latex_preamble(metadata, detected_header=None):
     institute_blob = metadata.get("institute", "") 
     author_line = f"\\author[{author}]{{{author}}}"
     institute_line = f"\\institute{{{institute_blob}}}"
+    # Von converters/latex_macros.py hochgezogene Layout-Makros
+    macro_block = f"% --- LAYOUT MACROS ---\n{extra_macros}\n" if extra_macros else ""
 
 
     return rf"""
@@ -20,6 +22,7 @@ def generate_latex_preamble(metadata, detected_header=None):
 \usepackage[ngerman]{{babel}}
 \usepackage{{graphicx}}
 \usepackage{{booktabs}}
+\usepackage{{multirow}}
 \usepackage{{listings}}
 \usepackage{{xcolor}}
 \usepackage{{textgreek}}
@@ -54,7 +57,7 @@ def generate_latex_preamble(metadata, detected_header=None):
 }}
 \lstset{{style=mystyle}}
 
-
+{macro_block}
 
 % --- METADATA ---
 \title{{{title}}}
@@ -76,6 +79,68 @@ LATEX_POSTAMBLE = r"""
 """
 
 
+def format_slide_block(slide_number, frame_latex):
+    return f"\n% --- Slide {slide_number} ---\n{frame_latex}\n"
+
+
+class LatexStreamWriter:
+    """
+    Schreibt das .tex inkrementell: Preamble sofort, danach jeden Slide-Block,
+    sobald er fertig ist. Nach jedem Flush steht das Postamble am Dateiende,
+    die Datei ist also jederzeit ein vollständiges Dokument (auch nach einem
+    Abbruch mitten im Lauf). Blöcke, die bei paralleler Generierung zu früh
+    kommen, werden gepuffert und in Slide-Reihenfolge geschrieben.
+    """
+
+    def __init__(self, tex_path, preamble, postamble=LATEX_POSTAMBLE):
+        self.tex_path = tex_path
+        self._postamble = f"\n{postamble}".encode("utf-8")
+        self._file = open(tex_path, "w+b")
+        self._file.write(f"{preamble}\n".encode("utf-8"))
+        self._body_end = self._file.tell()
+        self._pending = {}
+        self._next_index = 0
+        self.written = 0
+        self._finish_write()
+
+    def add(self, index, block):
+        """Block für Position `index` (0-basiert) übergeben; schreibt alles, was lückenlos vorliegt."""
+        self._pending[index] = block
+        if self._next_index not in self._pending:
+            return
+        self._file.seek(self._body_end)
+        while self._next_index in self._pending:
+            self._file.write(self._pending.pop(self._next_index).encode("utf-8"))
+            self._next_index += 1
+            self.written += 1
+        self._body_end = self._file.tell()
+        self._finish_write()
+
+    def _finish_write(self):
+        self._file.write(self._postamble)
+        self._file.truncate()
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self._pending:
+            # Lücke (z.B. Abbruch): restliche Blöcke trotzdem in Reihenfolge anhängen
+            self._file.seek(self._body_end)
+            for index in sorted(self._pending):
+                self._file.write(self._pending.pop(index).encode("utf-8"))
+                self.written += 1
+            self._body_end = self._file.tell()
+            self._finish_write()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
 
 def normalize_title(title):
     # Ersetze _ durch Leerzeichen
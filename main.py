@@ -1,18 +1,49 @@
 import sys
+import time
+import argparse
 import asyncio
 from pathlib import Path
 from datetime import datetime
-import pipeline
+from converters.artifact_store import ARTIFACT_FORMATS
 from utils import get_and_create_next_run_dir, RED,GREEN,YELLOW,RESET
 
 class Config:
+    """
+    Standardwerte als Klassenattribute; alles Laufzeitabhängige (Run-Ordner,
+    abgeleitete Pfade, CLI-Overrides) wird erst in resolve() auf einer
+    Instanz gesetzt. Der Import von main hat damit keine Seiteneffekte.
+    """
     PPTX_INPUT = Path('./input/Algorithmik.pptx')
     RULES_FILE = 'converting_rules.yaml'
     TEX_FILENAME = "document"
     
-    TIMESTAMP = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    TIMESTAMP = None
     
     SKIP_EXTRACTION = False 
+    SKIP_MEDIA = False
+    SKIP_COMPILE = False
+
+    # Checkpoints (run_manifest.json + checkpoints/) und Fortsetzen eines Laufs
+    CHECKPOINTS_ENABLED = True
+    RESUME_DIR = None               # Run-Ordner, der fortgesetzt wird (--resume)
+
+    # Extraktions-Backend: "docling" (Standard) oder "native" (python-pptx, ohne Docling)
+    EXTRACTION_BACKEND = "docling"
+
+    # Docling-Profil: "fast" (nur PPTX, keine Enrichments/Bilder im JSON) oder "full"
+    DOCLING_PROFILE = "fast"
+    # Große Decks in Seitenbereiche aufteilen und parallel konvertieren (0 = aus)
+    DOCLING_SHARD_SIZE = 60
+    DOCLING_MAX_WORKERS = None      # None -> Anzahl CPU-Kerne
+
+    # Docling-Cache (Key: PPTX-Hash + Docling-Version + Optionen), LRU-Eviction
+    USE_EXTRACTION_CACHE = True
+    EXTRACTION_CACHE_DIR = Path(".cache/docling")
+    EXTRACTION_CACHE_MAX_ENTRIES = 20
+    EXTRACTION_CACHE_MAX_BYTES = 1024 ** 3
+
+    # Poster-Frames für Videos ohne eingebettetes Vorschaubild (nur mit ffmpeg)
+    MEDIA_POSTER_CACHE_DIR = Path(".cache/posters")
     
     EXISTING_JSON_PATH = Path("./output/2025-12-04_12-06-51/Algorithmik_cleaned.json") 
     
@@ -20,49 +51,226 @@ class Config:
     # DIRECTORY STRUCTURE
     # ---------------------
     BASE_RESULTS_DIR = Path("Results")
-    RESULTS_DIR = get_and_create_next_run_dir(BASE_RESULTS_DIR)
-    OUTPUT_DIR = RESULTS_DIR 
-    MEDIA_OUTPUT_DIR = RESULTS_DIR / 'extracted_media'
-    JSON_OUTPUT_DIR = RESULTS_DIR / 'json_data'
-
-    if SKIP_EXTRACTION:
-        # Lese vom alten Pfad
-        RAW_JSON_INPUT = EXISTING_JSON_PATH
-    else:
-        # Speichere das neue rohe JSON in den neuen JSON-Ordner
-        RAW_JSON_INPUT = JSON_OUTPUT_DIR / (PPTX_INPUT.stem + '.json')
-
-    # Das Cleaned JSON kommt IMMER in den aktuellen Run-Ordner (JSON Subfolder)
-    CLEANED_JSON_OUTPUT = JSON_OUTPUT_DIR / (PPTX_INPUT.stem + "_cleaned.json")
+    RESULTS_DIR = None      # None -> nächster freier Run-Ordner unter BASE_RESULTS_DIR (in resolve())
+
+    # Aufräumen alter Läufe im Hintergrund (None = Grenze aus), siehe converters/run_dirs.py
+    RESULTS_GC_ENABLED = True
+    RESULTS_KEEP_LAST = 20
+    RESULTS_MAX_BYTES = None        # z.B. 5 * 1024 ** 3
+    RESULTS_MAX_AGE_DAYS = None
+    RESULTS_GC_GRACE_SECONDS = 3600     # kürzlich geänderte Läufe gelten als in Arbeit
+
+    # Werden in resolve() aus RESULTS_DIR / PPTX_INPUT abgeleitet
+    OUTPUT_DIR = None
+    MEDIA_OUTPUT_DIR = None
+    JSON_OUTPUT_DIR = None
+    RAW_JSON_INPUT = None
+    CLEANED_JSON_OUTPUT = None
+    GROUPED_JSON_OUTPUT = None
+
+    # Format der Zwischenergebnisse (siehe converters/artifact_store.py):
+    # "auto" (msgpack > orjson > json), "msgpack", "orjson", "json", "json-pretty"
+    ARTIFACT_FORMAT = "auto"
+    ARTIFACT_DEBUG_JSON = False     # zusätzlich eingerücktes *.debug.json ablegen
     
 
+    AGENT_ENABLED = True     # False -> alle Slides ohne LLM (deterministischer Renderer)
     AGENT_MAX_RETRIES = 3    
     AGENT_LLM_MODEL = 'qwen3:8b' 
 
-    @classmethod
-    def setup_directories(cls):
+    # "latex": das LLM schreibt den Frame. "structured": das LLM liefert nur
+    # Layout-Entscheidungen als JSON (Ollama format-Schema), gerendert wird
+    # lokal, siehe converters/structured_output.py
+    AGENT_OUTPUT_MODE = "latex"
+
+    # Streaming: Abbruch, sobald \end{frame} kommt oder das Modell "abdriftet"
+    AGENT_STREAMING = True
+    AGENT_MAX_OUTPUT_CHARS = 12000
+    AGENT_REPETITION_WINDOW = 200
+    AGENT_REPETITION_LIMIT = 4
+
+    # Modelle im Hintergrund laden, während Extraktion/Aufbereitung laufen, und
+    # geladen halten (keep_alive), siehe converters/llm_warmup.py
+    AGENT_WARMUP = True
+    AGENT_WARMUP_PREFIX = True      # statischen Prompt-Anfang (Regeln) gleich mit einlesen
+    AGENT_KEEP_ALIVE = "30m"        # None -> Ollama-Default (5m)
+
+    # Ollama-Client: Timeouts, Retries (AGENT_MAX_RETRIES), Circuit Breaker
+    OLLAMA_HOST = None              # None -> $OLLAMA_HOST bzw. http://localhost:11434
+    AGENT_REQUEST_TIMEOUT = 120.0   # Sekunden pro Request (bzw. pro Stream-Chunk)
+    AGENT_BACKOFF_BASE = 1.0
+    AGENT_BACKOFF_MAX = 20.0
+    AGENT_BREAKER_THRESHOLD = 3     # Fehler in Folge bis der Breaker öffnet
+    AGENT_BREAKER_RESET = 60.0      # Sekunden bis zum nächsten Probe-Request
+
+    # Mehrere Ollama-Hosts (leer -> nur OLLAMA_HOST mit AGENT_LLM_MODEL), z.B.
+    # [{"host": "http://cpu-box-1:11434", "model": "qwen3:8b", "max_concurrency": 2}, ...]
+    OLLAMA_HOSTS = []
+    AGENT_HEALTH_CHECK_INTERVAL = 30.0
+    AGENT_CONCURRENCY = None        # None -> Summe der max_concurrency aller Hosts
+
+    # Routing nach Slide-Komplexität (siehe converters/slide_router.py)
+    ROUTER_ENABLED = True
+    ROUTER_DETERMINISTIC_MAX_SCORE = 3   # darunter: ohne LLM rendern
+    ROUTER_SMALL_MAX_SCORE = 6           # darunter: kleines Modell
+    AGENT_SMALL_LLM_MODEL = None         # z.B. 'qwen3:1.7b'; None -> großes Modell
+
+    # Layout-Cluster: gleiche Layouts (Typen + gerundete Geometrie) teilen sich
+    # ein vom LLM gelerntes Skelett, siehe converters/layout_clusters.py
+    LAYOUT_CLUSTERING = True
+    LAYOUT_QUANTUM = 0.05                # Rastergröße für die Geometrie in der Signatur
+    LAYOUT_CLUSTER_MIN_SIZE = 2
+    LAYOUT_SKELETON_MAX_ATTEMPTS = 2     # Vorbilder pro Cluster, bis alle regulär generiert werden
+
+    # Codeblöcke vorab mit Pygments hervorheben (fancyvrb statt listings), siehe converters/code_highlight.py
+    CODE_HIGHLIGHT = False
+    CODE_HIGHLIGHT_STYLE = "default"     # Pygments-Stil
+    CODE_HIGHLIGHT_CACHE_DIR = Path(".cache/highlight")
+
+    # Nachbearbeitung des .tex: textblock-Container als \pptxtb-Makro, wiederkehrende
+    # Blöcke (Footer, Logos) einmal in der Preamble, siehe converters/latex_macros.py
+    LATEX_HOIST_MACROS = True
+    LATEX_MACRO_MIN_REPEATS = 3
+    LATEX_MACRO_PRECISION = 4            # Nachkommastellen der Geometrie
+
+    # Übergroße Slides in Teil-Requests aufteilen (geschätzte Input-Tokens der
+    # Slide-Daten, ohne die Regeln), siehe converters/slide_splitter.py
+    AGENT_SPLIT_SLIDES = True
+    AGENT_SLIDE_TOKEN_BUDGET = 1500
+    AGENT_PAGINATE_TABLES = False        # zu lange Tabellen auf Folge-Frames umbrechen
+    AGENT_TABLE_MAX_ROWS = 18
+
+    # Mehrere kleine Slides pro Request (spart den festen Overhead pro ollama.chat)
+    AGENT_BATCH_MODE = False
+    AGENT_BATCH_TOKEN_BUDGET = 3000      # geschätzte Input-Tokens pro Batch
+    AGENT_BATCH_MAX_SLIDES = 6
+
+    def __init__(self, **overrides):
+        # Overrides landen auf der Instanz, die Klassen-Defaults bleiben unverändert
+        for key, value in overrides.items():
+            if not hasattr(Config, key):
+                raise AttributeError(f"Unknown config option: {key}")
+            setattr(self, key, value)
+
+    def resolve(self):
+        """Legt den Run-Ordner an und leitet alle Pfade ab (einmal pro Lauf)."""
+        self.TIMESTAMP = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        if self.RESUME_DIR is not None:
+            # Gleicher Ordner, gleiche Eingabe und Artefakt-Einstellungen wie der ursprüngliche Lauf
+            from converters.run_manifest import RunManifest
+            self.RESULTS_DIR = Path(self.RESUME_DIR)
+            manifest = RunManifest.load(self.RESULTS_DIR)
+            manifest.apply_settings(self)
+            # Schutz vor dem Aufräumen paralleler Läufe, solange hier weitergeschrieben wird
+            from converters.run_dirs import mark_run_active
+            mark_run_active(self.RESULTS_DIR)
+            print(f"{GREEN}Resuming run {self.RESULTS_DIR} ({manifest.summary()}){RESET}")
+        self.PPTX_INPUT = Path(self.PPTX_INPUT)
+        if self.RESULTS_DIR is None:
+            self.RESULTS_DIR = get_and_create_next_run_dir(self.BASE_RESULTS_DIR)
+            self.start_results_gc()
+        self.RESULTS_DIR = Path(self.RESULTS_DIR)
+        self.OUTPUT_DIR = self.RESULTS_DIR
+        self.MEDIA_OUTPUT_DIR = self.RESULTS_DIR / 'extracted_media'
+        self.JSON_OUTPUT_DIR = self.RESULTS_DIR / 'json_data'
+
+        if self.SKIP_EXTRACTION:
+            # Lese vom alten Pfad
+            self.RAW_JSON_INPUT = Path(self.EXISTING_JSON_PATH)
+        else:
+            # Speichere das neue rohe JSON in den neuen JSON-Ordner
+            self.RAW_JSON_INPUT = self.JSON_OUTPUT_DIR / (self.PPTX_INPUT.stem + '.json')
+
+        # Das Cleaned JSON kommt IMMER in den aktuellen Run-Ordner (JSON Subfolder)
+        self.CLEANED_JSON_OUTPUT = self.JSON_OUTPUT_DIR / (self.PPTX_INPUT.stem + "_cleaned.json")
+        # Slides nach Geometrie/Gruppierung (Step 4), nur zur Analyse
+        self.GROUPED_JSON_OUTPUT = self.JSON_OUTPUT_DIR / (self.PPTX_INPUT.stem + "_grouped.json")
+        return self
+
+    def start_results_gc(self):
+        """Alte Läufe parallel zur Pipeline aufräumen (der aktuelle bleibt geschützt)."""
+        from converters.run_dirs import get_run_retention
+        retention = get_run_retention(self)
+        if retention is not None:
+            retention.collect_in_background(protect=(self.RESULTS_DIR,))
+
+    def setup_directories(self):
         """Erstellt alle notwendigen Ordner"""
-        cls.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        cls.MEDIA_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        cls.JSON_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        self.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        self.MEDIA_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        self.JSON_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _skip_stage(manifest, stage):
+    if manifest is not None and manifest.stage_done(stage):
+        print(f"{GREEN}Resume: stage '{stage}' already done, skipping.{RESET}")
+        return True
+    if manifest is not None:
+        manifest.reset_from(stage)
+    return False
 
+def _finish_stage(manifest, stage, started):
+    if manifest is not None:
+        manifest.mark_stage(stage, time.perf_counter() - started)
 
-async def run_pipeline():
-    Config.setup_directories()
+async def run_pipeline(config):
+    import pipeline
+    from converters.artifact_store import get_artifact_store
+    from converters.run_manifest import get_run_manifest
+    config.setup_directories()
+    config.RUN_STARTED = time.perf_counter()
 
     try:
+        manifest = get_run_manifest(config)
+        config.RUN_MANIFEST = manifest
+
+        # Modell-Warm-up überlappt mit Extraktion, Medien und Aufbereitung
+        if manifest is None or not manifest.stage_done("generate"):
+            from converters.llm_warmup import start_model_warmup
+            config.MODEL_WARMUP = start_model_warmup(config)
+
         # Step 0: Extraction (Optional)
-        if not Config.SKIP_EXTRACTION:
-            await pipeline.step_extract_structure(Config)
-        else:
-            print(f"Skipping PPTX extraction. Using existing JSON: {Config.RAW_JSON_INPUT}")
+        if not _skip_stage(manifest, "extract"):
+            started = time.perf_counter()
+            if not config.SKIP_EXTRACTION:
+                await pipeline.step_extract_structure(config)
+            else:
+                print(f"Skipping PPTX extraction. Using existing JSON: {config.RAW_JSON_INPUT}")
+            _finish_stage(manifest, "extract", started)
+
+        if not _skip_stage(manifest, "media"):
+            started = time.perf_counter()
+            if not config.SKIP_MEDIA:
+                pipeline.step_extract_media(config)
+            else:
+                print("Skipping media extraction (--skip-media).")
+            _finish_stage(manifest, "media", started)
+
+        if not _skip_stage(manifest, "process"):
+            started = time.perf_counter()
+            pipeline.step_process_and_optimize_data(config)
+            if get_artifact_store(config).exists(config.CLEANED_JSON_OUTPUT):
+                _finish_stage(manifest, "process", started)
 
+        # Generierung: fertige Slides kommen aus den Checkpoints. Die Stufe gilt
+        # erst als fertig, wenn keine Slide mehr auf den Fallback angewiesen war.
+        tex_path = config.OUTPUT_DIR / (config.TEX_FILENAME + ".tex")
+        if not _skip_stage(manifest, "generate"):
+            started = time.perf_counter()
+            tex_path = pipeline.step_generate_latex(config)
+            if tex_path is not None and manifest is not None and manifest.fallback_count() == 0:
+                _finish_stage(manifest, "generate", started)
 
-        pipeline.step_extract_media(Config)
-        pipeline.step_process_and_optimize_data(Config)
-        latex_code = pipeline.step_generate_latex(Config)
-        success = pipeline.step_save_and_compile(Config, latex_code)
+        success = True
+        if not _skip_stage(manifest, "compile"):
+            started = time.perf_counter()
+            success = pipeline.step_save_and_compile(config, tex_path)
+            if success and not config.SKIP_COMPILE and manifest is not None and manifest.stage_done("generate"):
+                _finish_stage(manifest, "compile", started)
 
+        if manifest is not None and manifest.fallback_count():
+            print(f"{YELLOW}{manifest.fallback_count()} slides used the fallback renderer. "
+                  f"Retry them with: python main.py --resume {config.RESULTS_DIR}{RESET}")
         if success:
             print(f"\n{GREEN}SUCCESS: Pipeline finished successfully.{RESET}")
         else:
@@ -77,7 +285,126 @@ async def run_pipeline():
         print(f"{RED}{e}{RESET}")
         import traceback
         traceback.print_exc()
+        if getattr(config, 'RUN_MANIFEST', None) is not None:
+            print(f"{YELLOW}Progress is checkpointed. Continue with: python main.py --resume {config.RESULTS_DIR}{RESET}")
         sys.exit(1)
+    finally:
+        from converters.run_dirs import clear_run_active
+        clear_run_active(config.RESULTS_DIR)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PPTX -> LaTeX Beamer converter")
+    parser.add_argument("input", nargs="?", type=Path,
+                        help=f"PPTX file to convert (default: {Config.PPTX_INPUT})")
+
+    paths = parser.add_argument_group("output")
+    paths.add_argument("--output-dir", type=Path,
+                       help="Write this run into exactly this directory (default: next free Results/<N>)")
+    paths.add_argument("--results-dir", type=Path,
+                       help=f"Base directory for numbered run directories (default: {Config.BASE_RESULTS_DIR})")
+    paths.add_argument("--keep-runs", type=int,
+                       help=f"Keep at most N numbered runs, older ones are removed (default: {Config.RESULTS_KEEP_LAST})")
+    paths.add_argument("--no-gc", action="store_true", help="Do not remove old runs")
+    paths.add_argument("--tex-name", help=f"Name of the .tex file without suffix (default: {Config.TEX_FILENAME})")
+
+    llm = parser.add_argument_group("LLM")
+    llm.add_argument("--model", help=f"Ollama model (default: {Config.AGENT_LLM_MODEL})")
+    llm.add_argument("--small-model", help="Model for simple slides (router 'small' route)")
+    llm.add_argument("--host", help="Ollama host, e.g. http://localhost:11434")
+    llm.add_argument("--concurrency", type=int, help="Parallel slide requests (default: pool capacity)")
+    llm.add_argument("--batch", action="store_true", help="Batch several small slides into one request")
+    llm.add_argument("--slide-token-budget", type=int, metavar="N",
+                     help=f"Split slides above N estimated input tokens into sub-requests "
+                          f"(default: {Config.AGENT_SLIDE_TOKEN_BUDGET})")
+    llm.add_argument("--paginate-tables", action="store_true",
+                     help=f"Continue tables with more than {Config.AGENT_TABLE_MAX_ROWS} rows on extra frames")
+    llm.add_argument("--output-mode", choices=("latex", "structured"),
+                     help=f"'structured': LLM returns layout JSON, frames are rendered locally "
+                          f"(default: {Config.AGENT_OUTPUT_MODE})")
+    llm.add_argument("--no-layout-clusters", action="store_true",
+                     help="Send every slide to the LLM instead of reusing skeletons of repeated layouts")
+    llm.add_argument("--no-warmup", action="store_true",
+                     help="Do not preload the model in the background while extracting")
+    llm.add_argument("--no-llm", action="store_true",
+                     help="Render every slide with the deterministic renderer (no Ollama needed)")
+
+    steps = parser.add_argument_group("steps")
+    steps.add_argument("--skip-extraction", nargs="?", const=Config.EXISTING_JSON_PATH, type=Path,
+                       metavar="RAW_JSON",
+                       help=f"Skip Docling and reuse an existing raw JSON (default: {Config.EXISTING_JSON_PATH})")
+    steps.add_argument("--resume", type=Path, metavar="RUN_DIR",
+                       help="Continue an interrupted run: skip finished stages and checkpointed slides")
+    steps.add_argument("--no-checkpoints", action="store_true", help="Do not write a run manifest / slide checkpoints")
+    steps.add_argument("--skip-media", action="store_true", help="Do not extract images")
+    steps.add_argument("--highlight-code", action="store_true",
+                       help="Pre-highlight code blocks with Pygments (fancyvrb) instead of lstlisting")
+    steps.add_argument("--no-macros", action="store_true",
+                       help="Keep every textblock expanded instead of hoisting layout macros into the preamble")
+    steps.add_argument("--skip-compile", action="store_true", help="Write the .tex file but do not run pdflatex")
+
+    extraction = parser.add_argument_group("extraction")
+    extraction.add_argument("--no-cache", action="store_true",
+                            help="Ignore the Docling extraction cache and always run a fresh extraction")
+    extraction.add_argument("--backend", choices=["docling", "native"],
+                            help="Extraction backend for this run (default: Config.EXTRACTION_BACKEND)")
+    extraction.add_argument("--profile", choices=["fast", "full"],
+                            help=f"Docling profile (default: {Config.DOCLING_PROFILE})")
+    extraction.add_argument("--artifact-format", choices=ARTIFACT_FORMATS,
+                            help="Format of intermediate artifacts (default: Config.ARTIFACT_FORMAT)")
+    extraction.add_argument("--debug-json", action="store_true",
+                            help="Additionally export pretty-printed *.debug.json files for all artifacts")
+    return parser.parse_args(argv)
+
+def build_config(args):
+    """CLI-Argumente -> Config-Instanz (nur gesetzte Optionen überschreiben die Defaults)."""
+    overrides = {
+        "PPTX_INPUT": args.input,
+        "RESULTS_DIR": args.output_dir,
+        "RESUME_DIR": args.resume,
+        "BASE_RESULTS_DIR": args.results_dir,
+        "RESULTS_KEEP_LAST": args.keep_runs,
+        "TEX_FILENAME": args.tex_name,
+        "AGENT_LLM_MODEL": args.model,
+        "AGENT_SMALL_LLM_MODEL": args.small_model,
+        "OLLAMA_HOST": args.host,
+        "AGENT_CONCURRENCY": args.concurrency,
+        "AGENT_OUTPUT_MODE": args.output_mode,
+        "AGENT_SLIDE_TOKEN_BUDGET": args.slide_token_budget,
+        "EXTRACTION_BACKEND": args.backend,
+        "DOCLING_PROFILE": args.profile,
+        "ARTIFACT_FORMAT": args.artifact_format,
+    }
+    config = Config(**{key: value for key, value in overrides.items() if value is not None})
+    if args.skip_extraction is not None:
+        config.SKIP_EXTRACTION = True
+        config.EXISTING_JSON_PATH = args.skip_extraction
+    flags = {
+        "CODE_HIGHLIGHT": args.highlight_code,
+        "SKIP_MEDIA": args.skip_media,
+        "SKIP_COMPILE": args.skip_compile,
+        "AGENT_BATCH_MODE": args.batch,
+        "AGENT_PAGINATE_TABLES": args.paginate_tables,
+        "ARTIFACT_DEBUG_JSON": args.debug_json,
+    }
+    for key, enabled in flags.items():
+        if enabled:
+            setattr(config, key, True)
+    if args.no_macros:
+        config.LATEX_HOIST_MACROS = False
+    if args.no_layout_clusters:
+        config.LAYOUT_CLUSTERING = False
+    if args.no_checkpoints:
+        config.CHECKPOINTS_ENABLED = False
+    if args.no_gc:
+        config.RESULTS_GC_ENABLED = False
+    if args.no_cache:
+        config.USE_EXTRACTION_CACHE = False
+    if args.no_warmup:
+        config.AGENT_WARMUP = False
+    if args.no_llm:
+        config.AGENT_ENABLED = False
+    return config
 
 if __name__ == "__main__":
-    asyncio.run(run_pipeline())
\ No newline at end of file
+    config = build_config(parse_args()).resolve()
+    asyncio.run(run_pipeline(config))
@@ -1,10 +1,7 @@
-import json
-from text import get_text_alignment_map
-from generator import LATEX_POSTAMBLE,generate_latex_preamble
-from converters.JSON_into_LaTeX_agent import generate_single_slide_latex
-from converters.pptx_into_JSON import convert_pptx_to_json
-from extracter.media_from_pptx import extract_media_from_pptx
-from extracter.metadata import transform_docling_json_to_slides
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from generator import LATEX_POSTAMBLE, LatexStreamWriter, format_slide_block, generate_latex_preamble
+from converters.artifact_store import get_artifact_store
 from utils import (
     compile_tex_to_pdf, 
     extract_metadata,
@@ -14,53 +11,88 @@ from utils import (
     get_slide_dimensions,
     load_slides,
     remove_auto_header,
-    sanitize_latex,
-    save_json
+    sanitize_latex
 )
+# Schwere Abhängigkeiten (docling, ollama/httpx, python-pptx) werden erst in
+# den Stufen importiert, die sie brauchen -> schneller Start für --help,
+# Cache-Treffer und Teilläufe.
 LAYOUT_DATA_STORAGE = {}
 async def step_extract_structure(config):
     print(f"{BLUE}Step 1/5: Extracting structure from {config.PPTX_INPUT}...{RESET}")
-    
+    from converters.pptx_into_JSON import convert_pptx_to_json, get_docling_profile
+    from converters.docling_cache import get_extraction_cache
+
+    if getattr(config, 'EXTRACTION_BACKEND', "docling") == "native":
+        print("Native extraction backend selected -> no Docling pass (slides are read in Step 3).")
+        return
+
+    store = get_artifact_store(config)
+    raw_artifact = store.path_for(config.RAW_JSON_INPUT)
+
+    # Cache-Lookup: gleiche PPTX + Docling-Version + Optionen -> kein neuer Docling-Lauf
+    cache, cache_key = get_extraction_cache(config)
+    if cache is not None and cache.restore(cache_key, raw_artifact):
+        print(f"{GREEN}Extraction cache hit ({cache_key[:12]}). Skipping Docling.{RESET}")
+        return
 
     await convert_pptx_to_json(
         pptx_path=str(config.PPTX_INPUT),
-        output_dir=str(config.JSON_OUTPUT_DIR)  
+        output_dir=str(config.JSON_OUTPUT_DIR),
+        profile=get_docling_profile(config),
+        shard_size=getattr(config, 'DOCLING_SHARD_SIZE', 0),
+        max_workers=getattr(config, 'DOCLING_MAX_WORKERS', None),
+        artifact_store=store
     )
 
+    if cache is not None:
+        cache.store(cache_key, raw_artifact)
+
 def step_extract_media(config):
     print(f"{BLUE}Step 2/5: Extracting media (Recursive)...{RESET}")
+    from extracter.media_from_pptx import extract_media_from_pptx
     layout_data = extract_media_from_pptx(
         pptx_path=str(config.PPTX_INPUT),
-        output_dir=str(config.MEDIA_OUTPUT_DIR)
+        output_dir=str(config.MEDIA_OUTPUT_DIR),
+        poster_cache_dir=getattr(config, 'MEDIA_POSTER_CACHE_DIR', None)
     )
     config.LAYOUT_DATA_BY_SLIDE = layout_data
     return layout_data
 
 def step_process_and_optimize_data(config):
     print(f"{BLUE}Step 3/5: Process and Optimize Data...{RESET}")
+    from text import get_text_alignment_map
+    from extracter.metadata import transform_docling_json_to_slides
+    from extracter.native_from_pptx import extract_slides_native
+    from extracter.shape_scanner import scan_presentation
     
+    store = get_artifact_store(config)
     input_path = config.RAW_JSON_INPUT
     output_path = config.CLEANED_JSON_OUTPUT
+    native = getattr(config, 'EXTRACTION_BACKEND', "docling") == "native"
     
     # Check, ob Step 1 erfolgreich war
-    if not input_path.exists():
+    if not native and not store.exists(input_path):
         print(f"Error: Input file not found: {input_path}")
         print(f"(Did Step 1 save to the wrong folder? Checked: {input_path.parent})")
         return
 
     try:
-        print(f"Loading raw JSON from: {input_path}")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            raw_data = json.load(f)
-            
         print("Scanning PPTX for layout overrides...")
         align_map = get_text_alignment_map(str(config.PPTX_INPUT))
         print("align_map:", align_map)
-        slides_data = transform_docling_json_to_slides(raw_data, align_map)
+
+        if native:
+            print(f"Reading slides natively from: {config.PPTX_INPUT}")
+            slides_data = extract_slides_native(str(config.PPTX_INPUT), align_map)
+        else:
+            print(f"Loading raw JSON from: {store.resolve(input_path)}")
+            raw_data = store.load(input_path)
+            # Tabellen aus dem (gecachten) Shape-Scan: Spaltenbreiten und Spans aus der PPTX
+            pptx_tables = scan_presentation(str(config.PPTX_INPUT)).tables_by_slide
+            slides_data = transform_docling_json_to_slides(raw_data, align_map, pptx_tables)
         
-        print(f"Saving {len(slides_data)} slides to: {output_path}")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(slides_data, f, indent=2, ensure_ascii=False)
+        print(f"Saving {len(slides_data)} slides to: {store.path_for(output_path)}")
+        store.save(output_path, slides_data)
             
         print(f"{GREEN}Data optimization complete.{RESET}")
         
@@ -71,8 +103,10 @@ def step_process_and_optimize_data(config):
 
 def step_generate_latex(config):
     print(f"\n{BLUE}Step 4/5: step_generate_latex...{RESET}")
+    from converters.code_highlight import get_code_highlighter
     # Step 1: Lade Slides und extrahiere Metadaten
-    slides = load_slides(config.CLEANED_JSON_OUTPUT)
+    store = get_artifact_store(config)
+    slides = load_slides(config.CLEANED_JSON_OUTPUT, store)
     if slides is None: return None
 
     meta = extract_metadata(config)
@@ -80,60 +114,189 @@ def step_generate_latex(config):
     # Step 2: Hole Slide-Dimensionen (für BoundingBox)
     slide_width, slide_height = get_slide_dimensions(config.PPTX_INPUT)
 
-    # Step 3: Rechne Geometrie und gruppiere Elemente
+    # Step 3 + 4: Geometrie, Gruppierung, Header-Erkennung
+    slides, header_text = prepare_slides_for_latex(slides, slide_width, slide_height)
+    
+    # Gruppierte Slides als eigenes Artefakt (das Cleaned-Artefakt bleibt unverändert)
+    store.save(getattr(config, 'GROUPED_JSON_OUTPUT', config.CLEANED_JSON_OUTPUT), slides)
+
+    # Step 5: Preamble sofort schreiben (mit Subtitle!)
+    tex_path = config.OUTPUT_DIR / (config.TEX_FILENAME + ".tex")
+    # Optional: Codeblöcke vorab mit Pygments hervorheben (\\PY-Makros in der Preamble)
+    highlighter = get_code_highlighter(config, slides)
+    extra_preamble = highlighter.preamble() if highlighter is not None else None
+    latex_preamble_code = sanitize_latex(generate_latex_preamble(meta, header_text, extra_preamble))
+
+    # Step 6: Für jede Slide LaTeX generieren (parallel über den Host-Pool) und
+    # den Block direkt anhängen -> kein Gesamtstring, Teilergebnis bei Abbruch.
+    # Mit Run-Manifest: fertige Slides aus den Checkpoints, neue sofort sichern.
+    manifest = getattr(config, 'RUN_MANIFEST', None)
+    warmup = getattr(config, 'MODEL_WARMUP', None)
+    if warmup is not None:
+        warmup.print_summary()
+    print(f"Streaming slides to: {tex_path}")
+    with LatexStreamWriter(tex_path, latex_preamble_code) as writer:
+        pending = []
+        for i, slide in enumerate(slides):
+            block = manifest.load_slide_block(i, slide) if manifest is not None else None
+            if block is None:
+                pending.append(i)
+            else:
+                writer.add(i, block)
+        if manifest is not None and len(pending) < len(slides):
+            print(f"{GREEN}Resuming: {len(slides) - len(pending)} slides restored from checkpoints, "
+                  f"{len(pending)} to generate.{RESET}")
+
+        generation_started = time.perf_counter()
+        first_slide = True
+        for j, latex_code, fallback in iter_slide_frames([slides[i] for i in pending], config):
+            i = pending[j]
+            if first_slide:
+                first_slide = False
+                print_time_to_first_slide(config, generation_started)
+            if highlighter is not None:
+                latex_code = highlighter.apply(latex_code, slides[i])
+            block = sanitize_latex(format_slide_block(slides[i].get('slide_number', i+1), latex_code))
+            if manifest is not None:
+                manifest.save_slide_block(i, slides[i], block, fallback)
+            writer.add(i, block)
+    print(f"LaTeX saved to: {tex_path} ({writer.written} slides)")
+    if highlighter is not None:
+        highlighter.print_summary()
+
+    # Step 7: Wiederkehrende Layout-Blöcke als Makros in die Preamble
+    if getattr(config, 'LATEX_HOIST_MACROS', False):
+        hoist_tex_file_macros(tex_path, latex_preamble_code, meta, header_text, config, extra_preamble)
+    return tex_path
+
+def print_time_to_first_slide(config, generation_started):
+    """Zeit bis zum ersten fertigen Frame, ab Laufstart und ab Beginn der Generierung."""
+    now = time.perf_counter()
+    run_started = getattr(config, 'RUN_STARTED', None)
+    since_run = f"{now - run_started:.1f}s after run start, " if run_started is not None else ""
+    print(f"Time to first slide: {since_run}{now - generation_started:.1f}s after generation start")
+
+def hoist_tex_file_macros(tex_path, preamble, meta, header_text, config, extra_preamble=None):
+    """Schreibt das fertige .tex mit \\pptxtb-/Wiederholungs-Makros neu (atomar)."""
+    from converters.latex_macros import hoist_layout_macros, print_hoisting_summary
+    text = tex_path.read_text(encoding="utf-8")
+    head, tail = f"{preamble}\n", f"\n{LATEX_POSTAMBLE}"
+    if not (text.startswith(head) and text.endswith(tail)):
+        print(f"{YELLOW}Macro hoisting skipped: unexpected document layout in {tex_path}{RESET}")
+        return
+    macros, body, stats = hoist_layout_macros(
+        text[len(head):-len(tail)],
+        min_repeats=getattr(config, 'LATEX_MACRO_MIN_REPEATS', 3),
+        precision=getattr(config, 'LATEX_MACRO_PRECISION', 4),
+    )
+    if not macros:
+        return
+    extra = "\n".join(part for part in (extra_preamble, macros) if part)
+    new_preamble = sanitize_latex(generate_latex_preamble(meta, header_text, extra))
+    tmp_path = tex_path.with_name(f"{tex_path.name}.tmp")
+    tmp_path.write_text(f"{new_preamble}\n{body}{tail}", encoding="utf-8")
+    tmp_path.replace(tex_path)
+    print_hoisting_summary(stats)
+
+def prepare_slides_for_latex(slides, slide_width, slide_height):
+    """Rechnet Geometrie, gruppiert Elemente und erkennt den Header. -> (slides, header_text)"""
     slides = enrich_and_group_slides(slides, slide_width, slide_height)
 
-    # Step 4: Automatische Header-Erkennung und -Bereinigung
+    # Automatische Header-Erkennung und -Bereinigung
     header_text = None
     header_result = detect_header_candidate(slides)
     if header_result is not None:
         header_text, header_geometry = header_result
         #slides = remove_auto_header(slides, header_text, header_geometry)
         #print(f"[INFO] Detected and removed header: '{header_text}'")
-    
-    # (Optional: JSON für Debugging speichern)
-    save_json(slides, config.CLEANED_JSON_OUTPUT)
+    return slides, header_text
 
-    # Step 5: Generiere die LaTeX-Preamble (mit Subtitle!)
-    latex_preamble_code = generate_latex_preamble(meta, header_text)
+def generate_slide_frames(slides, config):
+    """LaTeX-Frame pro Slide (Routing, optional Batching, parallel über den Host-Pool), in Slide-Reihenfolge."""
+    frames = [None] * len(slides)
+    for i, latex_code, _ in iter_slide_frames(slides, config):
+        frames[i] = latex_code
+    return frames
 
-    # Step 6: Für jede Slide LaTeX generieren (slide by slide)
-    slide_blocks = []
+def iter_slide_frames(slides, config):
+    """
+    Liefert (index, latex, fallback) je Slide, sobald der Frame fertig ist (bei
+    paralleler Generierung also nicht in Slide-Reihenfolge). `fallback` ist
+    der Grund, falls statt des LLM der deterministische Renderer einspringen
+    musste, sonst None.
+    """
+    from converters.slide_batcher import generate_batched_latex
+    from converters.slide_router import ROUTE_DETERMINISTIC, ROUTE_SKELETON, RouteStats, generate_routed_slide_latex, route_slide
+    from converters.llm_client import get_llm_pool, llm_metrics_snapshot, print_llm_metrics
+    from converters.layout_clusters import get_layout_cluster_index
+    from converters.JSON_into_LaTeX_agent import pop_fallback_reason
     total_slides = len(slides)
-    for i, slide in enumerate(slides):
-        slide_num = slide.get('slide_number', i+1)
-        print(f"→ Generiere LaTeX für Slide {slide_num} ({i+1}/{total_slides}) ...")
-        latex_code = generate_single_slide_latex(slide, config)
-        block = f"\n% --- Slide {slide_num} ---\n{latex_code}\n"
-        slide_blocks.append(block)
-
-    # Step 7: Dokument zusammenbauen
-    print("Assembling final document...")
-    full_body_latex = "".join(slide_blocks)
-    final_latex_document = f"{latex_preamble_code}\n{full_body_latex}\n{LATEX_POSTAMBLE}"
-    return final_latex_document
-
-def step_save_and_compile(config, latex_code):
-    print(f"\n{BLUE}Step 5/5: Saving and Compiling...{RESET}")
-
-    if not latex_code:
-        print("Error: No LaTeX code to save.")
-        return False
-    clean_latex = sanitize_latex(latex_code)  
+    route_stats = RouteStats()
+    # Pools sind prozessweit gecacht -> am Ende nur die Zähler dieses Laufs ausgeben
+    metrics_start = llm_metrics_snapshot(config) if getattr(config, 'AGENT_ENABLED', True) else None
 
-    output_dir = config.OUTPUT_DIR 
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    tex_filename = config.TEX_FILENAME + ".tex"
-    tex_path = output_dir / tex_filename
-    
-    try:
-        with open(tex_path, "w", encoding="utf-8") as f:
-            f.write(clean_latex)       
-        print(f"LaTeX saved to: {tex_path}")
-    except Exception as e:
-        print(f"Error saving .tex file: {e}")
+    # Layout-Cluster: pro wiederkehrendem Layout nur ein Vorbild ans LLM,
+    # die übrigen Slides werden lokal aus dessen Skelett gefüllt
+    llm_slides = {i for i, slide in enumerate(slides) if route_slide(slide, config) != ROUTE_DETERMINISTIC}
+    clusters = get_layout_cluster_index(slides, config, eligible=llm_slides)
+    held = clusters.followers() if clusters is not None else set()
+
+    # Optional: kleine Slides gebündelt generieren (Rest fällt auf Einzel-Requests zurück)
+    batched = {}
+    # (nicht im strukturierten Modus: dort ist jede Antwort ohnehin nur ein kleines JSON)
+    if (getattr(config, 'AGENT_BATCH_MODE', False) and getattr(config, 'AGENT_ENABLED', True)
+            and getattr(config, 'AGENT_OUTPUT_MODE', "latex") == "latex"):
+        batched = generate_batched_latex(slides, config, route_stats, skip=held)
+
+    def generate_frame(i, slide):
+        if i in batched:
+            return batched.pop(i), None
+        print(f"→ Generiere LaTeX für Slide {slide.get('slide_number', i+1)} ({i+1}/{total_slides}) ...")
+        pop_fallback_reason()
+        latex_code = generate_routed_slide_latex(slide, config, route_stats)
+        return latex_code, pop_fallback_reason()
+
+    if getattr(config, 'AGENT_ENABLED', True):
+        workers = getattr(config, 'AGENT_CONCURRENCY', None) or get_llm_pool(config).capacity
+    else:
+        workers = 1
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(generate_frame, i, slide): i for i, slide in enumerate(slides) if i not in held}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures.pop(future)
+                latex_code, fallback = future.result()
+                yield i, latex_code, fallback
+                if clusters is None:
+                    continue
+                start = time.perf_counter()
+                filled, release = clusters.on_generated(i, latex_code, fallback)
+                elapsed = time.perf_counter() - start
+                for j, frame in filled.items():
+                    route_stats.record(ROUTE_SKELETON, elapsed / len(filled))
+                    print(f"   Slide {slides[j].get('slide_number', j+1)}: route={ROUTE_SKELETON} "
+                          f"(layout of slide {slides[i].get('slide_number', i+1)})")
+                    yield j, frame, None
+                for j in release:
+                    futures[executor.submit(generate_frame, j, slides[j])] = j
+
+    route_stats.print_summary()
+    if clusters is not None:
+        clusters.print_summary()
+    if getattr(config, 'AGENT_ENABLED', True):
+        print_llm_metrics(config, since=metrics_start)
+
+def step_save_and_compile(config, tex_path):
+    print(f"\n{BLUE}Step 5/5: Compiling...{RESET}")
+
+    if not tex_path or not tex_path.exists():
+        print("Error: No LaTeX file to compile.")
         return False
 
-    success = compile_tex_to_pdf(tex_filename, output_dir)
-    return success
\ No newline at end of file
+    if getattr(config, 'SKIP_COMPILE', False):
+        print("Skipping PDF compilation (--skip-compile).")
+        return True
+
+    success = compile_tex_to_pdf(tex_path.name, tex_path.parent)
+    return success
@@ -1,26 +1,21 @@
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
+from extracter.shape_scanner import scan_presentation
 
 # Replace with your actual path
 PPT_PATH = "./input/Algorithmik.pptx" 
 
-prs = Presentation(PPT_PATH)
-print(f"--- Scanning {len(prs.slides)} slides ---")
+scan = scan_presentation(PPT_PATH)
+print(f"--- Scanning {scan.slide_count} slides ---")
 
-for i, slide in enumerate(prs.slides):
+for i in range(scan.slide_count):
     print(f"\nSlide {i+1}:")
-    for shape in slide.shapes:
-        # Print the Type and Name of every object
-        print(f"  - Shape: '{shape.name}' | Type: {shape.shape_type}")
-        
-        # Check if it has a fill picture (common for fancy slides)
-        if shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
-            try:
-                if hasattr(shape.fill, 'type') and shape.fill.type == 6: # 6 = Picture Fill
-                    print(f"    *** HIDDEN IMAGE FOUND (AutoShape with Picture Fill) ***")
-            except:
-                pass
-                
-        # Check if it is a Group (images often hide inside groups)
-        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
-             print(f"    *** GROUP FOUND (Images might be inside) ***")
\ No newline at end of file
+    for shape in scan.shapes_by_slide.get(i, []):
+        # Print the Type and Name of every object (depth > 0 = inside a group)
+        indent = "  " * (shape["depth"] + 1)
+        print(f"{indent}- Shape: '{shape['name']}' | Tag: {shape['tag']} | Box: {shape['box']}")
+
+    # Pictures and picture fills (images often hide inside groups or fills)
+    for media in scan.media_by_slide.get(i, []):
+        if media.kind == "picture_fill":
+            print(f"    *** HIDDEN IMAGE FOUND (Shape '{media.name}' with Picture Fill) ***")
+        else:
+            print(f"    *** IMAGE FOUND: '{media.name}' ({media.ext}) ***")
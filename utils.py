@@ -3,9 +3,7 @@ import subprocess
 from pathlib import Path
 import sys, re
 from collections import Counter
-from pptx import Presentation
 import json
-from extracter.metadata_from_pptx import get_institute_heuristic
 
 RESET = "\033[0m"
 RED = "\033[31m"
@@ -57,47 +55,44 @@ def compile_tex_to_pdf(tex_filename, working_dir):
     
 def get_and_create_next_run_dir(base_dir: Path) -> Path:
     """
-    Finds the next available indexed directory (e.g., 'Results/19')
-    and creates it.
+    Allocates the next indexed directory (e.g., 'Results/19') atomically
+    and points 'Results/latest' at it (see converters/run_dirs.py).
     Returns the Path to the newly created directory.
     """
-    index = 1
-    if not base_dir.is_dir():
-        print(f"{RED}Error: The base directory '{base_dir}' does not exist.{RESET}")
-        sys.exit(1) 
-
-    while True:
-        new_dir_path = base_dir / str(index) 
-        
-        if not new_dir_path.exists():
-            break 
-        
-        index += 1
+    from converters.run_dirs import allocate_run_dir, update_latest_link
 
     try:
-        new_dir_path.mkdir()
+        new_dir_path = allocate_run_dir(base_dir)
+        update_latest_link(base_dir, new_dir_path)
         print(f"{GREEN}Successfully created new run directory: {new_dir_path}{RESET}")
         return new_dir_path 
     except OSError as e:
-        print(f"{RED}ERROR: Could not create directory: {new_dir_path}{RESET}")
+        print(f"{RED}ERROR: Could not create a run directory in: {base_dir}{RESET}")
         print(f"{RED}Details: {e}{RESET}")
         sys.exit(1)
 
 def extract_metadata(config) -> dict:
     """Extrahiert Metadaten robust aus der PPTX oder nutzt Defaults."""
+    return extract_pptx_metadata(config.PPTX_INPUT, config.PPTX_INPUT.stem)
+
+def extract_pptx_metadata(pptx_source, fallback_title) -> dict:
+    """Wie extract_metadata, aber für Pfad oder PPTX-Bytes (ohne Config)."""
+    # Lazy Import: python-pptx nur laden, wenn die Stufe wirklich läuft
+    from extracter.metadata_from_pptx import get_institute_heuristic
+    from extracter.shape_scanner import scan_presentation
     try:
         print("Extracting PPTX metadata...")
-        prs = Presentation(config.PPTX_INPUT)
-        props = prs.core_properties
+        scan = scan_presentation(pptx_source)
+        props = scan.core_properties
         
-        title_text = props.title if props.title else config.PPTX_INPUT.stem
+        title_text = props.title if props.title else fallback_title
         author_text = props.author if props.author else "AI Converter"
         
         institute_text = props.category if props.category else ""
         
         if not institute_text:
             print("   -> No metadata 'category' found. Trying to guess from Slide Master...")
-            institute_text = get_institute_heuristic(prs, title_text, author_text)
+            institute_text = get_institute_heuristic(None, title_text, author_text, scan=scan)
             
         if institute_text:
             institute_text = institute_text.replace('\n', r' \\ ')
@@ -163,6 +158,7 @@ def build_geo_dict(elements):
     return geos
 
 def group_elements(elements):
+    from converters.code_highlight import detect_code_language, listings_language
     grouped = []
     used = set()
     geos = build_geo_dict(elements)
@@ -218,10 +214,16 @@ def group_elements(elements):
                 code_text = "\n".join(el['text'] for idx, el in subset if 'text' in el)
                 union_geo = get_union_geometry([el for idx, el in subset])
                 
+                language = detect_code_language(code_text)
+                lst_language = listings_language(language)
+                lst_options = f"[language={lst_language}]" if lst_language else ""
                 grouped.append({
                     "type": "codeblock",
                     "geometry": union_geo,
-                    "text": f"\\begin{{lstlisting}}[language=Java]\n{code_text}\n\\end{{lstlisting}}"
+                    "text": f"\\begin{{lstlisting}}{lst_options}\n{code_text}\n\\end{{lstlisting}}",
+                    # Roher Code + Sprache für die optionale Pygments-Stufe (converters/code_highlight.py)
+                    "code": code_text,
+                    "language": language,
                 })
                 for idx, el in subset: used.add(idx)
 
@@ -335,10 +337,20 @@ def inject_header_to_title_slide(slides, header_text):
     return slides
 
 
-def load_slides(json_path):
+def load_slides(json_path, store=None):
+    """Lädt die Slides (JSON oder, mit `store`, ein Artefakt in dessen Format)."""
     from pathlib import Path
     if isinstance(json_path, str):
         json_path = Path(json_path)
+    if store is not None:
+        if not store.exists(json_path):
+            print(f"[ERROR] Artifact not found at {store.path_for(json_path)}")
+            return None
+        try:
+            return store.load(json_path)
+        except ValueError as e:
+            print(f"[ERROR] Artifact is corrupted: {e}")
+            return None
     if not json_path.exists():
         print(f"[ERROR] JSON not found at {json_path}")
         return None
@@ -350,10 +362,10 @@ def load_slides(json_path):
         return None
     
 def get_slide_dimensions(pptx_path):
+    from extracter.shape_scanner import scan_presentation
     try:
-        from pptx import Presentation
-        prs = Presentation(pptx_path)
-        return prs.slide_width, prs.slide_height
+        scan = scan_presentation(pptx_path)
+        return scan.slide_width, scan.slide_height
     except Exception as e:
         print(f"[WARN] Could not load PPTX dimensions: {e}")
         return 0, 0
@@ -452,4 +464,92 @@ def repair_latex_output(latex_code):
     # Wenn eine Zeile mit \begin{minipage} anfängt, aber am Ende kaputt aussieht
     # (Das ist komplexer, aber der \paper Fix löst meistens 99% der Probleme)
     
-    return latex_code
\ No newline at end of file
+    return latex_code
+
+# --- SEMANTIC ZONING (converters/raw_JSON_into_cleaned_JSON.py) ---
+# Vertikale Zonen relativ zur Seitenhöhe (Oberkante des Elements),
+# gleiche Schwellen wie group_elements für header/footer.
+ZONE_HEADER_MAX_Y = 0.03
+ZONE_TITLE_MAX_Y = 0.2
+ZONE_FOOTER_MIN_Y = 0.87
+ZONES = ("header", "title", "content", "footer")
+DEFAULT_PAGE_SIZE = {"width": 960, "height": 720}
+
+def _get_data_root(docling_data):
+    """Docling-Struktur aus dem gespeicherten Raw-JSON (oder schon die Struktur selbst)."""
+    return docling_data.get("structure_analysis", docling_data)
+
+def _get_page_dimensions(data_root):
+    """{page_no: {"width", "height"}} aus dem "pages"-Block von Docling."""
+    dimensions = {}
+    for key, page in data_root.get("pages", {}).items():
+        size = page.get("size", {})
+        page_no = page.get("page_no", int(key))
+        dimensions[page_no] = {
+            "width": size.get("width", DEFAULT_PAGE_SIZE["width"]),
+            "height": size.get("height", DEFAULT_PAGE_SIZE["height"]),
+        }
+    return dimensions
+
+def _get_text_items(data_root):
+    """Alle Text-Items mit Inhalt und Provenance."""
+    return [
+        item for item in data_root.get("texts", [])
+        if item.get("prov") and item.get("text", "").strip()
+    ]
+
+def _extract_prov_data(item):
+    """(page_no, bbox, coord_origin) aus dem ersten prov-Eintrag."""
+    prov = item.get("prov", [{}])[0]
+    bbox = prov.get("bbox", {})
+    return prov.get("page_no"), bbox, bbox.get("coord_origin", "TOPLEFT")
+
+def _determine_zone(bbox, origin, page_height):
+    """header / title / content / footer anhand der Oberkante des Elements."""
+    if not bbox or not page_height:
+        return "content"
+    if origin == "BOTTOMLEFT":
+        # t ist hier der Abstand der Oberkante vom unteren Rand
+        top = page_height - max(bbox.get("t", 0), bbox.get("b", 0))
+    else:
+        top = min(bbox.get("t", 0), bbox.get("b", 0))
+    rel_y = top / page_height
+
+    if rel_y < ZONE_HEADER_MAX_Y:
+        return "header"
+    if rel_y > ZONE_FOOTER_MIN_Y:
+        return "footer"
+    if rel_y < ZONE_TITLE_MAX_Y:
+        return "title"
+    return "content"
+
+def _build_page_index(data_root, items):
+    """
+    Einmaliger Index pro Seite: Dimensionen + zugehörige Items (in
+    Lesereihenfolge). Seiten aus "pages" bleiben auch ohne Items erhalten.
+    """
+    dimensions = _get_page_dimensions(data_root)
+    fallback = next(iter(dimensions.values()), DEFAULT_PAGE_SIZE)
+    index = {page_no: {"size": size, "items": []} for page_no, size in dimensions.items()}
+
+    for item in items:
+        page_no, bbox, origin = _extract_prov_data(item)
+        if page_no is None:
+            continue
+        page = index.get(page_no)
+        if page is None:
+            page = index[page_no] = {"size": fallback, "items": []}
+        page["items"].append((item, bbox, origin))
+    return index
+
+def _assemble_final_json(slides_data, media_geometry_map):
+    """Slides nach Seitenzahl sortiert, inkl. Medien (Geometrie aus media_from_pptx)."""
+    final_slides = []
+    for page_no in sorted(slides_data):
+        zones = slides_data[page_no]
+        final_slides.append({
+            "slide_number": page_no,
+            **{zone: zones[zone] for zone in ZONES},
+            "media": media_geometry_map.get(page_no - 1, []),
+        })
+    return final_slides